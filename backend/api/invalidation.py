@@ -0,0 +1,256 @@
+import json
+import select
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from .utils import _get_env_bool, _get_env_float, _get_env_int
+
+# Ingest-driven cache invalidation. scripts/init_data_load.py publishes a NOTIFY
+# on DATA_CHANGED_CHANNEL for every table (and season) a transaction touched;
+# each API worker keeps one LISTEN connection in a daemon thread and drops the
+# cached entries that depend on that table as soon as the loader commits.
+#
+# Caches trust entries for CACHE_TTL_SECONDS while the listener is connected and
+# fall back to CACHE_FALLBACK_TTL_SECONDS whenever it is not (not started yet,
+# disabled, or reconnecting), so a lost connection degrades to short-TTL caching
+# rather than serving stale data.
+#
+# When reads go to replicas, a notification from the primary can arrive before a
+# replica has replayed the change, and a reload in between would cache old rows.
+# The listener then dispatches every notification a second time once the
+# largest tolerated replica lag has passed (redispatch_seconds).
+
+# Must match DATA_CHANGED_CHANNEL in scripts/init_data_load.py
+DATA_CHANGED_CHANNEL = "data_changed"
+
+
+def parse_payload(payload: str) -> Tuple[Optional[str], Optional[int]]:
+    """(table, season_id) from a NOTIFY payload; (None, None) means "anything may have changed"."""
+    try:
+        message = json.loads(payload)
+        season_id = message.get("season_id")
+        return str(message["table"]), int(season_id) if season_id is not None else None
+    except Exception:
+        return None, None
+
+
+# Subscribers are called with (table, season_id); table None invalidates everything
+_subscribers: List[Tuple[Optional[frozenset], Callable[[Optional[str], Optional[int]], None]]] = []
+_subscribers_lock = threading.Lock()
+
+
+def subscribe(tables: Optional[Iterable[str]], callback: Callable[[Optional[str], Optional[int]], None]):
+    """Call callback for changes to any of tables (None = every table)."""
+    with _subscribers_lock:
+        _subscribers.append((frozenset(tables) if tables is not None else None, callback))
+
+
+def dispatch(table: Optional[str], season_id: Optional[int] = None):
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for tables, callback in subscribers:
+        if table is None or tables is None or table in tables:
+            try:
+                callback(table, season_id)
+            except Exception as e:
+                print(f"Cache invalidation callback failed for {table}: {e}")
+
+
+def invalidate_all():
+    """Drop every cached entry, e.g. after missing notifications while disconnected."""
+    dispatch(None)
+
+
+class TTLCache:
+    """Thread-safe keyed cache whose entries are dropped when any of its tables change."""
+
+    __slots__ = ("name", "tables", "ttl", "fallback_ttl", "max_entries",
+                 "_entries", "_generation", "_lock")
+
+    def __init__(self, name: str, tables: Iterable[str], ttl: Optional[float] = None,
+                 fallback_ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.name = name
+        self.tables = frozenset(tables)
+        self.ttl = ttl
+        self.fallback_ttl = fallback_ttl
+        self.max_entries = max_entries if max_entries is not None else _get_env_int("CACHE_MAX_ENTRIES", 10000)
+        self._entries: Dict[Hashable, Tuple[float, object]] = {}
+        # Bumped on every invalidation, so a load that raced one is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        subscribe(self.tables, self._on_change)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"TTLCache({self.name!r}, tables={sorted(self.tables)}, entries={len(self)})"
+
+    def _on_change(self, table: Optional[str], season_id: Optional[int]):
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def get(self, key: Hashable, load: Callable[[], object]):
+        """The cached value for key, or load()'s result (cached unless an invalidation raced it)."""
+        return self.get_many([key], lambda missing: [load()])[0]
+
+    def get_many(self, keys: Sequence[Hashable], load_missing: Callable[[List[Hashable]], Sequence[object]]) -> List[object]:
+        """Values for keys, loading every miss with one load_missing(missing_keys) call."""
+        now = time.monotonic()
+        max_age = effective_ttl(self.fallback_ttl, self.ttl)
+        values: List[object] = [None] * len(keys)
+        missing: Dict[Hashable, List[int]] = {}
+        with self._lock:
+            for position, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] < max_age:
+                    values[position] = entry[1]
+                else:
+                    missing.setdefault(key, []).append(position)
+            generation = self._generation
+        if not missing:
+            return values
+        loaded = load_missing(list(missing))
+        with self._lock:
+            store = generation == self._generation
+            for (key, positions), value in zip(missing.items(), loaded):
+                for position in positions:
+                    values[position] = value
+                if store:
+                    self._entries.pop(key, None)
+                    while self._entries and len(self._entries) >= self.max_entries:
+                        # Dicts keep insertion order, so this evicts the oldest entry
+                        self._entries.pop(next(iter(self._entries)))
+                    self._entries[key] = (now, value)
+        return values
+
+
+class NotificationListener(threading.Thread):
+    """Daemon thread holding a LISTEN connection and dispatching its notifications."""
+
+    def __init__(self, connect: Callable[[], object], channel: str = DATA_CHANGED_CHANNEL,
+                 poll_seconds: float = 30.0, max_backoff_seconds: float = 60.0,
+                 redispatch_seconds: float = 0.0):
+        super().__init__(name=f"listen-{channel}", daemon=True)
+        self.connect = connect
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.redispatch_seconds = redispatch_seconds
+        self.connected = threading.Event()
+        self.stopping = threading.Event()
+        self.conn = None
+
+    def _listen(self):
+        conn = self.connect()
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(f'LISTEN "{self.channel}";')
+        cur.close()
+        self.conn = conn
+        self.connected.set()
+        # Whatever was committed while we were not listening went unannounced
+        invalidate_all()
+        print(f"Listening for {self.channel} notifications")
+
+    def _drain(self):
+        ready, _, _ = select.select([self.conn], [], [], self.poll_seconds)
+        if not ready:
+            # Quiet period; make sure the connection is still alive
+            cur = self.conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+        self.conn.poll()
+        while self.conn.notifies:
+            notify = self.conn.notifies.pop(0)
+            table, season_id = parse_payload(notify.payload)
+            dispatch(table, season_id)
+            if self.redispatch_seconds > 0:
+                # Catch reloads that read a replica which had not replayed the change yet
+                timer = threading.Timer(self.redispatch_seconds, dispatch, (table, season_id))
+                timer.daemon = True
+                timer.start()
+
+    def _disconnect(self):
+        self.connected.clear()
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def run(self):
+        backoff = 1.0
+        while not self.stopping.is_set():
+            try:
+                if self.conn is None:
+                    self._listen()
+                    backoff = 1.0
+                self._drain()
+            except Exception as e:
+                if self.stopping.is_set():
+                    break
+                print(f"{self.channel} listener disconnected ({e}); retrying in {backoff:.0f}s")
+                self._disconnect()
+                self.stopping.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff_seconds)
+        self._disconnect()
+
+    def stop(self):
+        self.stopping.set()
+        conn = self.conn
+        if conn is not None:
+            try:
+                # The run loop notices at its next poll and exits
+                conn.close()
+            except Exception:
+                pass
+
+
+_listener: Optional[NotificationListener] = None
+_listener_lock = threading.Lock()
+
+
+def start_listener(connect: Callable[[], object], redispatch_seconds: float = 0.0) -> Optional[NotificationListener]:
+    """Start this worker's listener once; cheap to call on every request.
+
+    connect must reach the primary: NOTIFY is not delivered on replicas.
+    """
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return _listener
+    if not _get_env_bool("CACHE_LISTEN", True):
+        return None
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = NotificationListener(
+                connect, poll_seconds=_get_env_float("CACHE_LISTEN_POLL_SECONDS", 30.0),
+                redispatch_seconds=redispatch_seconds)
+            _listener.start()
+        return _listener
+
+
+def stop_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.join(timeout=5)
+        _listener = None
+
+
+def listening() -> bool:
+    return _listener is not None and _listener.connected.is_set()
+
+
+def effective_ttl(fallback_ttl: Optional[float] = None, ttl: Optional[float] = None) -> float:
+    """Long TTL while notifications are flowing, the short fallback otherwise."""
+    if listening():
+        return ttl if ttl is not None else _get_env_float("CACHE_TTL_SECONDS", 3600.0)
+    return fallback_ttl if fallback_ttl is not None else _get_env_float("CACHE_FALLBACK_TTL_SECONDS", 30.0)
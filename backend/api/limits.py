@@ -0,0 +1,121 @@
+import functools
+import threading
+import traceback
+from typing import Dict, Tuple
+
+from flask import jsonify
+from psycopg2 import errors as pg_errors
+
+from .utils import PoolTimeout, _get_env_int, pooled_connection
+
+# Per-endpoint time budgets and bounded concurrency. Each endpoint gets a
+# Postgres statement_timeout for its queries and a cap on the requests a worker
+# runs for it at once; past the cap a request is turned away immediately with
+# 503 + Retry-After instead of queueing behind the others, and a pool checkout
+# that cannot get a connection in time does the same. Failures are reported as
+# errors (503/504/500 with an "error" field), never as empty results.
+
+# endpoint -> (max concurrent requests per worker, statement_timeout in ms).
+# Overridable with <ENDPOINT>_MAX_CONCURRENCY and <ENDPOINT>_STATEMENT_TIMEOUT_MS.
+ENDPOINT_BUDGETS: Dict[str, Tuple[int, int]] = {
+    "teams": (8, 2000),
+    "players": (8, 2000),
+    "player_search": (16, 2000),
+    "player_stats": (8, 3000),
+    "head_to_head": (8, 2000),
+    "team_games": (8, 3000),
+    "team_season": (8, 2000),
+    "leaders": (8, 2000),
+    "predict": (16, 1500),
+    "props": (4, 5000),
+    "simulate": (2, 5000),
+}
+
+
+def retry_after_seconds() -> int:
+    return _get_env_int("RETRY_AFTER_SECONDS", 1)
+
+
+def statement_timeout_ms(endpoint: str) -> int:
+    return _get_env_int(f"{endpoint.upper()}_STATEMENT_TIMEOUT_MS", ENDPOINT_BUDGETS[endpoint][1])
+
+
+def connection(endpoint: str):
+    """Pooled connection with the endpoint's statement_timeout (a context manager)."""
+    return pooled_connection(statement_timeout_ms(endpoint))
+
+
+class EndpointLimiter:
+    """Non-blocking concurrency cap for one endpoint; the cap is read on first use."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.limit = None
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.limit is None:
+                self.limit = _get_env_int(f"{self.endpoint.upper()}_MAX_CONCURRENCY",
+                                          ENDPOINT_BUDGETS[self.endpoint][0])
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self.in_flight,
+                    "admitted": self.admitted, "rejected": self.rejected}
+
+
+_limiters: Dict[str, EndpointLimiter] = {}
+
+
+def overloaded(message: str):
+    response = jsonify({"error": message})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after_seconds())
+    return response
+
+
+def limited(endpoint: str):
+    """Route decorator: admit at most the endpoint's concurrency cap, 503 the rest."""
+    limiter = _limiters.setdefault(endpoint, EndpointLimiter(endpoint))
+
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not limiter.try_acquire():
+                return overloaded(f"{endpoint} is at capacity; retry shortly")
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorate
+
+
+def error_response(e: Exception, action: str):
+    """Map a failure to an error response: 503 for saturation, 504 for timeouts, else 500."""
+    if isinstance(e, PoolTimeout):
+        return overloaded(f"No database capacity while {action}; retry shortly")
+    if isinstance(e, pg_errors.QueryCanceled):
+        print(f"Statement timeout while {action}")
+        return jsonify({"error": f"Timed out while {action}"}), 504
+    print(f"Error while {action}")
+    traceback.print_exc()
+    return jsonify({"error": f"An error occurred while {action}."}), 500
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {endpoint: limiter.stats() for endpoint, limiter in _limiters.items()}
@@ -0,0 +1,276 @@
+import bisect
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import invalidation
+from .utils import _get_env_float
+
+# In-memory player name index behind /api/v1/players/search. Each worker builds
+# it once from the players table and rebuilds it when the table's signature
+# changes (i.e. after player ingest has run), so lookups never touch the DB.
+# A players notification from the loader forces the signature check right away.
+
+PLAYER_INDEX_ROWS_QUERY = """
+        SELECT id, full_name, first_name, last_name, is_active
+        FROM players
+        ORDER BY id;
+    """
+
+# Cheap change detector for the players table; the table is a few thousand rows
+PLAYER_INDEX_SIGNATURE_QUERY = """
+        SELECT COUNT(*), md5(COALESCE(string_agg(
+            id::text || ':' || COALESCE(full_name, '') || ':' || COALESCE(is_active::text, ''),
+            ',' ORDER BY id), ''))
+        FROM players;
+    """
+
+MAX_SEARCH_LIMIT = 50
+# Match tiers, best first
+EXACT, PREFIX, TOKEN_PREFIX, FUZZY = range(4)
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lower-case, accent-free, alphanumerics and single spaces ("Nikola Jokić" -> "nikola jokic")."""
+    if not name:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+    cleaned = "".join(ch if ch.isalnum() else " " for ch in stripped)
+    return " ".join(cleaned.split())
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _bigrams(token: str) -> set:
+    padded = "^" + token
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class PlayerSearchIndex:
+    """Sorted name keys with parallel player positions, searched with bisect."""
+
+    __slots__ = ("ids", "names", "active", "full_keys", "full_owners",
+                 "token_keys", "token_owners", "token_grams", "signature")
+
+    def __init__(self, rows: Sequence[Tuple], signature=None):
+        # rows: (id, full_name, first_name, last_name, is_active)
+        self.ids: List[int] = []
+        self.names: List[str] = []
+        self.active: List[bool] = []
+        full_entries = []
+        token_entries = set()
+        for player_id, full_name, first_name, last_name, is_active in rows:
+            position = len(self.ids)
+            self.ids.append(int(player_id))
+            self.names.append(full_name or "")
+            self.active.append(is_active is not False)
+            full_entries.append((normalize_name(full_name), position))
+            for part in (full_name, first_name, last_name):
+                for token in normalize_name(part).split():
+                    token_entries.add((token, position))
+        full_entries.sort()
+        self.full_keys = [key for key, _ in full_entries]
+        self.full_owners = [position for _, position in full_entries]
+        # Distinct tokens, each with the players that carry it
+        owners_by_token: Dict[str, List[int]] = {}
+        for token, position in sorted(token_entries):
+            owners_by_token.setdefault(token, []).append(position)
+        self.token_keys = list(owners_by_token)
+        self.token_owners = [tuple(owners) for owners in owners_by_token.values()]
+        # Bigram -> token indices, to shortlist fuzzy candidates before edit distance
+        grams: Dict[str, List[int]] = {}
+        for k, token in enumerate(self.token_keys):
+            for gram in _bigrams(token):
+                grams.setdefault(gram, []).append(k)
+        self.token_grams = grams
+        self.signature = signature
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _prefix_range(keys: List[str], prefix: str) -> range:
+        start = bisect.bisect_left(keys, prefix)
+        # "\uffff" sorts after every character that survives normalize_name
+        end = bisect.bisect_left(keys, prefix + "\uffff", lo=start)
+        return range(start, end)
+
+    def _token_prefix_matches(self, word: str) -> set:
+        return {p for k in self._prefix_range(self.token_keys, word) for p in self.token_owners[k]}
+
+    def _fuzzy_matches(self, words: List[str]) -> Dict[int, int]:
+        """Players whose tokens are within a small edit distance of every query word."""
+        matches: Optional[Dict[int, int]] = None
+        for word in words:
+            limit = 1 if len(word) <= 5 else 2
+            found: Dict[int, int] = {}
+            # Each edit breaks at most two of the word's bigrams, so a token within
+            # limit edits shares at least len(grams) - 2 * limit of them
+            grams = _bigrams(word)
+            needed = len(grams) - 2 * limit
+            if needed <= 0:
+                # Too short (or repetitive) to bound; such words must match as a prefix
+                found = dict.fromkeys(self._token_prefix_matches(word), 0)
+                shortlist = ()
+            else:
+                shared = Counter(k for gram in grams for k in self.token_grams.get(gram, ()))
+                shortlist = [k for k, n in shared.items() if n >= needed]
+            for k in shortlist:
+                key, owners = self.token_keys[k], self.token_owners[k]
+                # Compare against the whole token and against a same-length prefix,
+                # so misspelled partial input ("jokc") still finds "jokic"
+                distance = bounded_edit_distance(word, key[:len(word)], limit)
+                if distance > 0 and len(key) != len(word):
+                    distance = min(distance, bounded_edit_distance(word, key, limit))
+                if distance > limit:
+                    continue
+                for position in owners:
+                    if distance < found.get(position, limit + 1):
+                        found[position] = distance
+            if matches is None:
+                matches = found
+            else:
+                matches = {p: matches[p] + d for p, d in found.items() if p in matches}
+            if not matches:
+                return {}
+        return matches or {}
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[Dict[str, object]]:
+        normalized = normalize_name(query)
+        if not normalized or limit <= 0:
+            return []
+        words = normalized.split()
+
+        ranked: Dict[int, Tuple[int, int]] = {}
+
+        def add(position: int, tier: int, distance: int = 0):
+            if position not in ranked or (tier, distance) < ranked[position]:
+                ranked[position] = (tier, distance)
+
+        for k in self._prefix_range(self.full_keys, normalized):
+            add(self.full_owners[k], EXACT if self.full_keys[k] == normalized else PREFIX)
+
+        # Every word must prefix some name token ("james leb" finds "LeBron James")
+        candidates = None
+        for word in words:
+            owners = self._token_prefix_matches(word)
+            candidates = owners if candidates is None else candidates & owners
+            if not candidates:
+                break
+        for position in candidates or ():
+            add(position, TOKEN_PREFIX)
+
+        if fuzzy and len(ranked) < limit and len(normalized) >= 3:
+            for position, distance in self._fuzzy_matches(words).items():
+                add(position, FUZZY, distance)
+
+        order = sorted(
+            ranked,
+            key=lambda p: (ranked[p], not self.active[p], self.names[p]),
+        )
+        return [
+            {"id": self.ids[p], "full_name": self.names[p], "is_active": self.active[p]}
+            for p in order[:limit]
+        ]
+
+
+# Per-process cache; the signature is re-checked at most every PLAYER_INDEX_REFRESH_SECONDS,
+# or every CACHE_TTL_SECONDS while the invalidation listener is connected
+_index: Optional[PlayerSearchIndex] = None
+_checked_at = 0.0
+_invalidations = 0
+_lock = threading.Lock()
+# Held by the one caller running a signature check; the others keep serving _index
+_refresh_lock = threading.Lock()
+
+
+def fetch_signature(cur):
+    cur.execute(PLAYER_INDEX_SIGNATURE_QUERY)
+    return tuple(cur.fetchone())
+
+
+def build_index(cur, signature=None) -> PlayerSearchIndex:
+    cur.execute(PLAYER_INDEX_ROWS_QUERY)
+    index = PlayerSearchIndex(cur.fetchall(), signature=signature)
+    print(f"Built player search index ({len(index)} players)")
+    return index
+
+
+def _fresh_index(refresh_seconds: float) -> Optional[PlayerSearchIndex]:
+    with _lock:
+        if _index is not None and time.monotonic() - _checked_at < refresh_seconds:
+            return _index
+        return None
+
+
+def get_index(connection) -> PlayerSearchIndex:
+    """The worker's index, rebuilt if the players table changed since the last check.
+
+    connection is a zero-argument factory of connection context managers (e.g.
+    limits.connection for the endpoint); it is only called when a signature check
+    is due, so most lookups never touch the pool. One caller runs the check while
+    the others keep serving the current index, which is also kept (and logged)
+    when the check fails. Only the first build makes callers wait.
+    """
+    global _index, _checked_at
+    refresh_seconds = invalidation.effective_ttl(_get_env_float("PLAYER_INDEX_REFRESH_SECONDS", 60.0))
+    index = _fresh_index(refresh_seconds)
+    if index is not None:
+        return index
+    current = _index
+    if not _refresh_lock.acquire(blocking=current is None):
+        return current
+    try:
+        index = _fresh_index(refresh_seconds)
+        if index is not None:
+            return index
+        with _lock:
+            current, invalidations = _index, _invalidations
+        started = time.monotonic()
+        try:
+            with connection() as conn:
+                cur = conn.cursor()
+                signature = fetch_signature(cur)
+                if current is None or current.signature != signature:
+                    current = build_index(cur, signature)
+                cur.close()
+        except Exception as e:
+            if current is None:
+                raise
+            print(f"Player index refresh failed, serving the previous index: {e}")
+            return current
+        with _lock:
+            _index = current
+            # An invalidation that arrived during the check leaves the index due
+            if _invalidations == invalidations:
+                _checked_at = started
+        return current
+    finally:
+        _refresh_lock.release()
+
+
+def invalidate(table=None, season_id=None):
+    """Force a signature check on the next lookup."""
+    global _checked_at, _invalidations
+    with _lock:
+        _checked_at = float("-inf")
+        _invalidations += 1
+
+
+invalidation.subscribe(("players",), invalidate)
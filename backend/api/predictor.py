@@ -0,0 +1,212 @@
+import threading
+from datetime import date, datetime, timezone
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.ml.compiled_trees import compile_ensemble
+from backend.ml.feature_matrix import FeatureMatrix
+from backend.ml.simulation import SlateCopula, SlateSimulation, simulate_slate
+from backend.ml.online_features import (
+    build_feature_mapping,
+    injury_features,
+    line_features,
+    opponent_features,
+    player_form_features,
+)
+
+from . import invalidation
+from .utils import _get_env_int, load_env
+from .queries import (
+    INJURY_STATUS_QUERY,
+    OPPONENT_RECENT_GAMES_QUERY,
+    PLAYER_RECENT_GAMES_QUERY,
+    UPCOMING_LINE_QUERY,
+)
+
+# Model artifact and the serve-time feature/inference path shared by the
+# prediction routes. The artifact is loaded on first use (load_model), not at
+# import, so importing the API does no file I/O.
+
+# Features the original two-column model was trained on, for bare estimator pickles
+LEGACY_FEATURES = ["player_points_last_10", "opponent_avg_points_allowed_last_10"]
+
+# Multi-stat artifact first, then the points-only one
+MODEL_PATHS = ["../player_stats_predictor.pkl", "../player_points_predictor.pkl"]
+
+# Training column per stat key, mirroring STAT_TARGETS in backend/ml/train_model.py
+STAT_COLUMNS = {
+    "pts": "player_points",
+    "reb": "player_rebounds",
+    "ast": "player_assists",
+    "fg3m": "player_fg3m",
+    "stl": "player_steals",
+    "blk": "player_blocks",
+}
+DERIVED_STATS = {"pra": ("pts", "reb", "ast")}
+
+# Tables the serve-time feature queries read; a loader NOTIFY for any of them
+# drops the cached features and predictions
+FEATURE_TABLES = ("player_game_stats", "games", "injury_reports", "game_lines")
+
+
+# Batches up to COMPILED_PREDICT_MAX_ROWS rows go through the compiled tree
+# evaluator, which skips predict()'s per-call overhead but loses to the
+# estimator's own C loops on large batches (see backend/ml/compiled_trees.py).
+# 0 disables it. Read when the model loads.
+COMPILED_PREDICT_MAX_ROWS = 32
+
+model = None
+compiled_model = None
+model_features: List[str] = []
+model_stats: List[str] = []
+distributions: Dict[str, object] = {}
+copula = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def load_model() -> bool:
+    """Load the model artifact once per worker; True if a model is available."""
+    global model, compiled_model, model_features, model_stats, distributions, copula, _loaded
+    global COMPILED_PREDICT_MAX_ROWS
+    if _loaded:
+        return model is not None
+    with _load_lock:
+        if _loaded:
+            return model is not None
+        import joblib
+
+        load_env()
+        COMPILED_PREDICT_MAX_ROWS = _get_env_int("COMPILED_PREDICT_MAX_ROWS", 32)
+        for model_path in MODEL_PATHS:
+            try:
+                # train_model saves {"model", "features", "stats", "distributions", "copula"}; features fixes the column order
+                artifact = joblib.load(model_path)
+            except FileNotFoundError:
+                continue
+            if isinstance(artifact, dict):
+                model, model_features = artifact["model"], list(artifact["features"])
+                model_stats = list(artifact.get("stats", ["pts"]))
+                distributions = dict(artifact.get("distributions", {}))
+                copula = artifact.get("copula")
+            else:
+                model, model_features, model_stats = artifact, LEGACY_FEATURES, ["pts"]
+            print(f"Model loaded successfully from {model_path} (stats: {model_stats})")
+            break
+        else:
+            print("Model not found")
+
+        if copula is None and distributions:
+            # Artifacts from before the copula was saved simulate players independently
+            copula = SlateCopula.independent([stat for stat in model_stats if stat in distributions])
+
+        if model is not None and COMPILED_PREDICT_MAX_ROWS > 0:
+            try:
+                compiled_model = compile_ensemble(model)
+                print(f"Compiled {compiled_model} for batches of up to {COMPILED_PREDICT_MAX_ROWS} rows")
+            except ValueError as e:
+                print(f"Serving with {type(model).__name__}.predict: {e}")
+        _loaded = True
+    return model is not None
+
+
+# Keyed by _matchup_key; predictions hold one float per stat in available_stats()
+feature_cache = invalidation.TTLCache("features", FEATURE_TABLES)
+prediction_cache = invalidation.TTLCache("predictions", FEATURE_TABLES)
+
+
+def available_stats() -> List[str]:
+    derived = [name for name, parts in DERIVED_STATS.items() if set(parts) <= set(model_stats)]
+    return sorted(set(model_stats) | set(derived))
+
+
+def fetch_feature_mapping(cur, player_id: int, opponent_team_id: int, is_home: int = 0,
+                          as_of: Optional[date] = None) -> Dict[str, float]:
+    """Serve-time feature values for one (player, opponent) pair."""
+    cur.execute(PLAYER_RECENT_GAMES_QUERY, (player_id,))
+    player_rows = cur.fetchall()
+    cur.execute(OPPONENT_RECENT_GAMES_QUERY, (opponent_team_id,))
+    opponent_rows = cur.fetchall()
+
+    now = datetime.now(timezone.utc)
+    params = {"player_id": player_id, "opponent_team_id": opponent_team_id, "as_of": now}
+    cur.execute(INJURY_STATUS_QUERY, params)
+    status_rows = cur.fetchall()
+    player_status = next((status for pid, _, status in status_rows if pid == player_id), None)
+    teammates = [(minutes, status) for pid, minutes, status in status_rows if pid != player_id]
+    cur.execute(UPCOMING_LINE_QUERY, params)
+    line_row = cur.fetchone()
+
+    stat_values = {
+        column: [row[2 + k] for row in player_rows]
+        for k, column in enumerate(STAT_COLUMNS.values())
+    }
+    return build_feature_mapping(
+        player_form_features(
+            stat_values,
+            [row[0] for row in player_rows],
+            [row[1] for row in player_rows],
+            as_of=as_of or now.date(),
+        ),
+        opponent_features(*zip(*opponent_rows)) if opponent_rows else {},
+        {"is_home": is_home},
+        injury_features(player_status, teammates),
+        line_features(line_row[1], line_row[2], bool(line_row[0])) if line_row else {},
+    )
+
+
+def _matchup_key(player_id: int, opponent_team_id: int, is_home: int = 0) -> Tuple:
+    # Rest days and the injury/line windows move with the (UTC) calendar date
+    return int(player_id), int(opponent_team_id), int(is_home), datetime.now(timezone.utc).date()
+
+
+def cached_feature_mapping(cur, player_id: int, opponent_team_id: int, is_home: int = 0) -> Dict[str, float]:
+    """fetch_feature_mapping through the worker's feature cache."""
+    return feature_cache.get(
+        _matchup_key(player_id, opponent_team_id, is_home),
+        lambda: fetch_feature_mapping(cur, player_id, opponent_team_id, is_home),
+    )
+
+
+def predict_matchups(cur, matchups: Sequence[Tuple[int, int, int]]) -> Dict[str, np.ndarray]:
+    """predict_stats for (player_id, opponent_team_id, is_home) triples, predicting only cache misses."""
+
+    def load_missing(keys):
+        mappings = [cached_feature_mapping(cur, *key[:3]) for key in keys]
+        by_stat = predict_stats(mappings)
+        return [{stat: float(values[k]) for stat, values in by_stat.items()} for k in range(len(keys))]
+
+    rows = prediction_cache.get_many([_matchup_key(*matchup) for matchup in matchups], load_missing)
+    return {stat: np.array([row[stat] for row in rows], dtype=np.float64) for stat in available_stats()}
+
+
+def predict_stats(mappings: Sequence[Mapping[str, float]]) -> Dict[str, np.ndarray]:
+    """One model call for a batch of feature rows; returns stat -> predictions (incl. derived stats)."""
+    feature_matrix = FeatureMatrix.from_mappings(model_features, mappings, default=0.0)
+    if compiled_model is not None and len(mappings) <= COMPILED_PREDICT_MAX_ROWS:
+        prediction = compiled_model.predict(feature_matrix.values)
+    else:
+        prediction = model.predict(feature_matrix.values)
+    prediction = np.asarray(prediction, dtype=np.float64).reshape(len(mappings), -1)
+    by_stat = {stat: prediction[:, k] for k, stat in enumerate(model_stats)}
+    for name, parts in DERIVED_STATS.items():
+        if set(parts) <= set(by_stat):
+            by_stat[name] = sum(by_stat[part] for part in parts)
+    return by_stat
+
+
+def over_probabilities(stat: str, preds: np.ndarray, lines: np.ndarray) -> Optional[np.ndarray]:
+    """P(stat > line) per prediction row and line, or None without a fitted distribution."""
+    distribution = distributions.get(stat)
+    if distribution is None:
+        return None
+    return distribution.prob_over(preds, lines)
+
+
+def simulate(games: Sequence[Sequence[Sequence[int]]], mappings: Sequence[Mapping[str, float]],
+             n_sims: int, seed: int) -> SlateSimulation:
+    """Joint outcomes for a slate; mappings follow the players in game order (home, then away)."""
+    by_stat = predict_stats(mappings)
+    return simulate_slate(games, by_stat, distributions, copula, derived=DERIVED_STATS,
+                          n_sims=n_sims, seed=seed)
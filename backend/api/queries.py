@@ -0,0 +1,188 @@
+# Hot serve-time SQL. Each query is shaped for a covering index in
+# backend/schema.sql, and tests/test_query_plans.py EXPLAINs every entry of
+# HOT_QUERIES against a seeded database so a schema or query change that
+# falls back to sequential scans fails CI.
+
+# Enough history for the 10-game windows and for the span-10 EWM to converge
+PLAYER_RECENT_GAMES_QUERY = """
+        SELECT minutes, game_date, points, rebounds,
+               assists, fg3m, steals, blocks
+        FROM player_game_stats
+        WHERE player_id = %s AND minutes > 0
+        ORDER BY game_date DESC
+        LIMIT 30;
+    """
+
+# opponent_points is the other side's score, so no self-join on games is needed
+OPPONENT_RECENT_GAMES_QUERY = """
+        SELECT opponent_points AS points_allowed, fga, oreb, tov, fta
+        FROM games
+        WHERE team_id = %s
+        ORDER BY game_date DESC
+        LIMIT 10;
+    """
+
+# Latest status of the player and of every teammate on the player's current team
+# this season, with teammates' season-to-date minutes (see asof_features.py)
+INJURY_STATUS_QUERY = """
+        WITH current_team AS (
+            SELECT team_id, season_id
+            FROM player_game_stats
+            WHERE player_id = %(player_id)s
+            ORDER BY game_date DESC
+            LIMIT 1
+        ), roster AS (
+            SELECT pgs.player_id, AVG(pgs.minutes) AS avg_minutes
+            FROM player_game_stats pgs
+            JOIN current_team ct ON pgs.team_id = ct.team_id AND pgs.season_id = ct.season_id
+            GROUP BY pgs.player_id
+            UNION
+            SELECT %(player_id)s, NULL
+        ), latest_status AS (
+            SELECT DISTINCT ON (ir.player_id) ir.player_id, ir.status
+            FROM injury_reports ir
+            JOIN roster r ON ir.player_id = r.player_id
+            WHERE ir.report_time < %(as_of)s AND ir.report_time >= %(as_of)s - INTERVAL '14 days'
+            ORDER BY ir.player_id, ir.report_time DESC
+        )
+        SELECT r.player_id, MAX(r.avg_minutes), MAX(ls.status)
+        FROM roster r LEFT JOIN latest_status ls ON ls.player_id = r.player_id
+        GROUP BY r.player_id;
+    """
+
+# Latest line published for the next scheduled meeting of the two teams
+UPCOMING_LINE_QUERY = """
+        SELECT g.is_home, gl.home_spread, gl.total
+        FROM games g
+        JOIN LATERAL (
+            SELECT home_spread, total
+            FROM game_lines
+            WHERE game_id = g.game_id AND retrieved_at < %(as_of)s
+            ORDER BY retrieved_at DESC
+            LIMIT 1
+        ) gl ON TRUE
+        WHERE g.team_id = (
+                SELECT team_id
+                FROM player_game_stats
+                WHERE player_id = %(player_id)s
+                ORDER BY game_date DESC
+                LIMIT 1
+            )
+          AND g.opponent_team_id = %(opponent_team_id)s
+          AND g.game_date >= %(as_of)s::date
+        ORDER BY g.game_date
+        LIMIT 1;
+    """
+
+PLAYER_VS_OPPONENT_SUMMARY_QUERY = """
+        SELECT games, minutes, points, rebounds, assists, steals, blocks, turnovers,
+               fgm, fga, fg3m, fg3a, ftm, fta, first_game_date, last_game_date
+        FROM
+            player_vs_opponent
+        WHERE
+            player_id = %s AND opponent_team_id = %s;
+    """
+
+# Walks the player's games newest first and probes games by primary key
+PLAYER_VS_OPPONENT_GAMES_QUERY = """
+        SELECT g.game_id, g.game_date, g.matchup, g.win_loss, pgs.minutes, pgs.points,
+               pgs.rebounds, pgs.assists, pgs.steals, pgs.blocks, pgs.turnovers,
+               pgs.fgm, pgs.fga, pgs.fg3m, pgs.fg3a, pgs.ftm, pgs.fta
+        FROM
+            player_game_stats pgs
+            JOIN games g ON g.season_id = pgs.season_id AND g.game_id = pgs.game_id
+                AND g.team_id = pgs.team_id
+        WHERE
+            pgs.player_id = %s AND g.opponent_team_id = %s AND pgs.minutes > 0
+        ORDER BY
+            pgs.game_date DESC
+        LIMIT %s;
+    """
+
+# Season aggregates (player_season_stats / team_season_stats, maintained by ingest).
+# Without an explicit season_id, the team's latest regular season (2xxxx) is used.
+TEAM_SEASON_STATS_QUERY = """
+        SELECT s.team_id, t.full_name, t.abbreviation, s.season_id, s.games, s.wins, s.losses,
+               s.minutes, s.points, s.opponent_points, s.fgm, s.fga, s.fg3m, s.fg3a, s.ftm,
+               s.fta, s.oreb, s.dreb, s.reb, s.ast, s.stl, s.blk, s.tov, s.plus_minus,
+               s.first_game_date, s.last_game_date, s.updated_at
+        FROM
+            team_season_stats s
+            JOIN teams t ON t.id = s.team_id
+        WHERE
+            s.team_id = %(team_id)s
+            AND s.season_id BETWEEN COALESCE(%(season_id)s::integer, 20000)
+                                AND COALESCE(%(season_id)s::integer, 29999)
+        ORDER BY
+            s.season_id DESC
+        LIMIT 1;
+    """
+
+LATEST_PLAYER_SEASON_QUERY = """
+        SELECT MAX(season_id)
+        FROM player_season_stats
+        WHERE season_id BETWEEN 20000 AND 29999;
+    """
+
+# Leaderboard stats: counting stats ranked per game, per 36 minutes or in total,
+# and shooting percentages as made / attempted over the season
+LEADER_COUNTING_STATS = ("points", "rebounds", "oreb", "dreb", "assists", "steals", "blocks",
+                         "turnovers", "fg3m", "minutes")
+LEADER_PCT_STATS = {"fg_pct": ("fgm", "fga"), "fg3_pct": ("fg3m", "fg3a"), "ft_pct": ("ftm", "fta")}
+LEADER_PER = ("game", "36", "total")
+
+
+def leader_value_sql(stat: str, per: str = "game"):
+    """SQL for the ranked value over player_season_stats s, or None for an unknown stat/per."""
+    if stat in LEADER_PCT_STATS:
+        made, attempted = LEADER_PCT_STATS[stat]
+        return f"s.{made}::float8 / NULLIF(s.{attempted}, 0)"
+    if stat not in LEADER_COUNTING_STATS or per not in LEADER_PER:
+        return None
+    if per == "game":
+        return f"s.{stat}::float8 / s.games"
+    if per == "36":
+        return f"36.0 * s.{stat} / NULLIF(s.minutes, 0)"
+    return f"s.{stat}::float8"
+
+
+# One season's rows (a few hundred) via idx_player_season_stats_season, whatever the history size
+LEADERS_QUERY_TEMPLATE = """
+        SELECT s.player_id, p.full_name, s.team_id, t.abbreviation AS team_abbreviation,
+               s.games, s.minutes, {value} AS value
+        FROM
+            player_season_stats s
+            JOIN players p ON p.id = s.player_id
+            LEFT JOIN teams t ON t.id = s.team_id
+        WHERE
+            s.season_id = %(season_id)s AND s.games >= %(min_games)s
+            AND s.minutes >= %(min_minutes)s AND {value} IS NOT NULL
+        ORDER BY
+            value DESC, s.player_id
+        LIMIT %(limit)s;
+    """
+
+
+def leaders_query(stat: str, per: str = "game"):
+    value = leader_value_sql(stat, per)
+    return None if value is None else LEADERS_QUERY_TEMPLATE.format(value=value)
+
+
+# Query name -> (SQL, example parameters builder) for the plan regression tests;
+# builders take a dict of seeded ids (player_id, team_id, opponent_team_id, as_of)
+HOT_QUERIES = {
+    "player_recent_games": (PLAYER_RECENT_GAMES_QUERY, lambda ids: (ids["player_id"],)),
+    "opponent_recent_games": (OPPONENT_RECENT_GAMES_QUERY, lambda ids: (ids["opponent_team_id"],)),
+    "injury_status": (INJURY_STATUS_QUERY, lambda ids: ids),
+    "upcoming_line": (UPCOMING_LINE_QUERY, lambda ids: ids),
+    "player_vs_opponent_summary": (
+        PLAYER_VS_OPPONENT_SUMMARY_QUERY, lambda ids: (ids["player_id"], ids["opponent_team_id"])),
+    "player_vs_opponent_games": (
+        PLAYER_VS_OPPONENT_GAMES_QUERY, lambda ids: (ids["player_id"], ids["opponent_team_id"], 20)),
+    "team_season_stats": (
+        TEAM_SEASON_STATS_QUERY, lambda ids: {"team_id": ids["team_id"], "season_id": None}),
+    "latest_player_season": (LATEST_PLAYER_SEASON_QUERY, lambda ids: ()),
+    "leaders_points_per_game": (
+        leaders_query("points", "game"),
+        lambda ids: {"season_id": ids["season_id"], "min_games": 1, "min_minutes": 0, "limit": 10}),
+}
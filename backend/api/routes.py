@@ -1,35 +1,63 @@
-import os
-import psycopg2
-import joblib
-import pandas as pd
-import traceback
-from flask import Flask, jsonify, request
-from dotenv import load_dotenv
+import numpy as np
+from flask import jsonify, request
 
-from . import app
-from .utils import get_db_connection
+from backend.ml.simulation import DEFAULT_SIMS, MAX_SIMS
 
-try:
-    model = joblib.load("../player_points_predictor.pkl")
-    print("Model loaded successfully")
-except FileNotFoundError:
-    print("Model not found")
-    model = None
+from . import app
+from . import invalidation
+from . import limits
+from . import player_search
+from . import predictor
+from . import queries
+from . import singleflight
+from . import utils
+from .utils import get_db_connection, load_env
+
+# Whole-table lists, dropped by the loader's teams/players notifications
+teams_cache = invalidation.TTLCache("teams", ("teams",))
+players_cache = invalidation.TTLCache("players", ("players",))
+# Season aggregates, dropped when ingest refreshes them
+team_season_cache = invalidation.TTLCache("team_season", ("team_season_stats", "teams"))
+leaders_cache = invalidation.TTLCache("leaders", ("player_season_stats", "players", "teams"))
+
+# Concurrent identical requests share one DB read / model call (see singleflight.py)
+predict_flight = singleflight.SingleFlight("predict")
+player_stats_flight = singleflight.SingleFlight("player_stats")
+team_games_flight = singleflight.SingleFlight("team_games")
+
+
+@app.before_request
+def start_worker():
+    # Per-worker startup that must not run at import: .env and the LISTEN thread.
+    # LISTEN stays on the primary; with replicas, notifications are replayed once
+    # more after the tolerated lag so reloads cannot cache pre-change rows.
+    load_env()
+    redispatch_seconds = utils.reader_max_lag_seconds() if utils.get_router() is not None else 0.0
+    invalidation.start_listener(get_db_connection, redispatch_seconds)
 
 @app.route('/api/v1/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "ok", "message": "API is healthy"}), 200
 
+@app.route('/api/v1/metrics', methods=['GET'])
+def get_metrics():
+    """This worker's request-coalescing, load-shedding, pool and reader counters."""
+    metrics = {"singleflight": singleflight.stats(), "endpoints": limits.stats()}
+    if utils._pool is not None:
+        metrics["pool"] = utils._pool.stats()
+    if utils._router is not None:
+        metrics["readers"] = utils._router.stats()
+    return jsonify(metrics)
+
 @app.route('/api/v1/teams', methods=['GET'])
+@limits.limited("teams")
 def get_teams():
-    team_list = []
-    conn = None
 
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+    def load():
+        with limits.connection("teams") as conn:
+            cur = conn.cursor()
 
-        cur.execute("""
+            cur.execute("""
                     SELECT id, 
                         full_name, abbreviation, nickname, city, state, year_founded 
                     FROM 
@@ -37,217 +65,535 @@ def get_teams():
                     ORDER BY
                         full_name;
                     """)
-        result = cur.fetchall()
+            result = cur.fetchall()
 
-        if result and cur.description:
-            columns = [desc[0] for desc in cur.description]
-            team_list = [dict(zip(columns, row)) for row in result]
+            rows = []
+            if result and cur.description:
+                columns = [desc[0] for desc in cur.description]
+                rows = [dict(zip(columns, row)) for row in result]
 
-        cur.close()
+            cur.close()
+            return rows
 
-    except Exception as e:
-        print(e)
-        team_list = []
+    try:
+        team_list = teams_cache.get("all", load)
 
-    finally:
-        if conn is not None:
-            conn.close()
+    except Exception as e:
+        return limits.error_response(e, "loading teams")
 
     return jsonify(team_list)
 
 @app.route('/api/v1/players', methods= ['GET'])
+@limits.limited("players")
 def get_player():
-    player_list = []
-    conn = None
+
+    def load():
+        with limits.connection("players") as conn:
+            cur = conn.cursor()
+
+            cur.execute("""
+                        SELECT
+                            id, full_name, first_name, last_name, is_active,
+                            position, height_inches, weight_lbs, age
+                        FROM
+                            players
+                        ORDER BY
+                            full_name
+                        """)
+
+            result = cur.fetchall()
+
+            rows = []
+            if result and cur.description:
+                columns = [desc[0] for desc in cur.description]
+                rows = [dict(zip(columns, row)) for row in result]
+
+            cur.close()
+            return rows
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        player_list = players_cache.get("all", load)
 
-        cur.execute("""
-                    SELECT 
-                        id, full_name, first_name, last_name, is_active,
-                        position, height_inches, weight_lbs, age
-                    FROM 
-                        players 
-                    ORDER BY 
-                        full_name
-                    """)
-        
-        result = cur.fetchall()
-        
-        if result and cur.description:
-            columns = [desc[0] for desc in cur.description]
-            player_list = [dict(zip(columns, row)) for row in result]
+    except Exception as e:
+        return limits.error_response(e, "loading players")
 
-        cur.close()
+    return jsonify(player_list)
+
+@app.route('/api/v1/players/search', methods=['GET'])
+@limits.limited("player_search")
+def search_players():
+    """Prefix/fuzzy name search served from the worker's in-memory index."""
+    query = request.args.get('q', default='', type=str)
+    limit = request.args.get('limit', default=10, type=int)
+    limit = max(1, min(limit, player_search.MAX_SEARCH_LIMIT))
+    fuzzy = request.args.get('fuzzy', default=1, type=int) != 0
+    if not query.strip():
+        return jsonify([])
+
+    try:
+        index = player_search.get_index(lambda: limits.connection("player_search"))
+        results = index.search(query, limit=limit, fuzzy=fuzzy)
 
     except Exception as e:
-        print(e)
-        player_list = []
+        return limits.error_response(e, "searching players")
 
-    finally:
-        if conn is not None:
-            conn.close()
-        
-        return jsonify(player_list)
+    return jsonify(results)
 
 @app.route("/api/v1/players/<int:player_id>/stats", methods = ["GET"])
+@limits.limited("player_stats")
 def get_player_stats(player_id):
-    
-    player_stats = []
-    conn = None
 
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        sql_query = ( """
-            SELECT 
-                id, player_id, game_id, team_id, minutes, points, 
-                rebounds, assists, steals, blocks, turnovers, fgm, 
-                fga, fg_pct, fg3m, fg3a, fg3_pct, ftm, fta, ft_pct
-            FROM 
-                player_game_stats
-            WHERE 
-                player_id = %s
-            ORDER BY 
-                game_date;
-            """)
-        
-        cur.execute(sql_query, (player_id,))
+    def load():
+        with limits.connection("player_stats") as conn:
+            cur = conn.cursor()
+
+            sql_query = ( """
+                SELECT 
+                    id, player_id, game_id, team_id, minutes, points, 
+                    rebounds, assists, steals, blocks, turnovers, fgm, 
+                    fga, fg_pct, fg3m, fg3a, fg3_pct, ftm, fta, ft_pct
+                FROM 
+                    player_game_stats
+                WHERE 
+                    player_id = %s
+                ORDER BY 
+                    game_date;
+                """)
             
-        result = cur.fetchall()
+            cur.execute(sql_query, (player_id,))
+                
+            result = cur.fetchall()
 
-        if result and cur.description:
-            columns = [desc[0] for desc in cur.description]
-            player_stats = [dict(zip(columns,row)) for row in result]
+            rows = []
+            if result and cur.description:
+                columns = [desc[0] for desc in cur.description]
+                rows = [dict(zip(columns,row)) for row in result]
 
-        cur.close()
+            cur.close()
+            return rows
 
-    except Exception as e:
-        print(e)
-        player_stats = []
+    try:
+        player_stats = player_stats_flight.do(player_id, load)
 
-    finally: 
-        if conn is not None:
-            conn.close()
+    except Exception as e:
+        return limits.error_response(e, "loading player stats")
 
-        return jsonify(player_stats)
+    return jsonify(player_stats)
     
+@app.route("/api/v1/players/<int:player_id>/vs/<int:team_id>", methods=["GET"])
+@limits.limited("head_to_head")
+def get_player_vs_team(player_id, team_id):
+    """Head-to-head history: summary from player_vs_opponent plus the per-game rows."""
+    limit = request.args.get('limit', default=20, type=int)
+    limit = max(1, min(limit, 200))
+    response = {"player_id": player_id, "opponent_team_id": team_id, "summary": None, "games": []}
+
+    try:
+        with limits.connection("head_to_head") as conn:
+            cur = conn.cursor()
+
+            cur.execute(queries.PLAYER_VS_OPPONENT_SUMMARY_QUERY, (player_id, team_id))
+            row = cur.fetchone()
+
+            if row and row[0]:
+                totals = dict(zip([desc[0] for desc in cur.description], row))
+                n_games = totals["games"]
+                response["summary"] = {
+                    "games": n_games,
+                    "first_game_date": totals["first_game_date"],
+                    "last_game_date": totals["last_game_date"],
+                    "averages": {
+                        stat: round(float(totals[stat] or 0) / n_games, 2)
+                        for stat in ("minutes", "points", "rebounds", "assists", "steals",
+                                     "blocks", "turnovers", "fg3m")
+                    },
+                    "fg_pct": round(totals["fgm"] / totals["fga"], 3) if totals["fga"] else None,
+                    "fg3_pct": round(totals["fg3m"] / totals["fg3a"], 3) if totals["fg3a"] else None,
+                    "ft_pct": round(totals["ftm"] / totals["fta"], 3) if totals["fta"] else None,
+                }
+
+            cur.execute(queries.PLAYER_VS_OPPONENT_GAMES_QUERY, (player_id, team_id, limit))
+            result = cur.fetchall()
+
+            if result and cur.description:
+                columns = [desc[0] for desc in cur.description]
+                response["games"] = [dict(zip(columns, row)) for row in result]
+
+            cur.close()
+
+    except Exception as e:
+        return limits.error_response(e, "loading head-to-head history")
+
+    return jsonify(response)
+
 @app.route("/api/v1/teams/<int:id>/games", methods = ["GET"])
+@limits.limited("team_games")
 def get_games(id):
-    games = []
-    conn = None
+
+    def load():
+        with limits.connection("team_games") as conn:
+            cur = conn.cursor()
+
+            sql_query = ("""
+                SELECT season_id, team_id, team_abbreviation, game_id, game_date,
+                         matchup, win_loss, minutes, points, fgm, fga, fg_pct,
+                         fg3m, fg3a, fg3_pct, ftm, fta, ft_pct, oreb, dreb, 
+                         reb, ast, stl, blk, tov, pf, plus_minus
+                FROM 
+                    games
+                WHERE 
+                    team_id = %s
+                ORDER BY 
+                    game_date;
+                """)
+            
+            cur.execute(sql_query, (id,))
+            result = cur.fetchall()
+
+            rows = []
+            if result and cur.description:
+                columns = [desc[0] for desc in cur.description]
+                rows = [dict(zip(columns, row)) for row in result]
+
+            cur.close()
+            return rows
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        sql_query = ("""
-            SELECT season_id, team_id, team_abbreviation, game_id, game_date,
-                     matchup, win_loss, minutes, points, fgm, fga, fg_pct,
-                     fg3m, fg3a, fg3_pct, ftm, fta, ft_pct, oreb, dreb, 
-                     reb, ast, stl, blk, tov, pf, plus_minus
-            FROM 
-                games
-            WHERE 
-                team_id = %s
-            ORDER BY 
-                game_date;
-            """)
-        
-        cur.execute(sql_query, (id,))
-        result = cur.fetchall()
-
-        if result and cur.description:
-            columns = [desc[0] for desc in cur.description]
-            games = [dict(zip(columns, row)) for row in result]
-
-        cur.close()
-        
-    except Exception as e:
-        print(e)
-        games = []
+        games = team_games_flight.do(id, load)
 
-    finally:
-        if conn is not None:
-            conn.close()
+    except Exception as e:
+        return limits.error_response(e, "loading team games")
 
-        return jsonify(games)
+    return jsonify(games)
     
 
+TEAM_SEASON_TOTALS = ("minutes", "points", "opponent_points", "fgm", "fga", "fg3m", "fg3a", "ftm",
+                      "fta", "oreb", "dreb", "reb", "ast", "stl", "blk", "tov", "plus_minus")
+
+
+def _ratio(numerator, denominator, scale=1.0, digits=3):
+    return round(scale * float(numerator) / float(denominator), digits) if numerator is not None and denominator else None
+
+
+def _team_season_summary(totals):
+    """Per-game averages, shooting, pace and ratings derived from season sums."""
+    games = totals["games"]
+    # Same possessions proxy as the model's opponent features
+    possessions = (float(totals["fga"] or 0) - float(totals["oreb"] or 0) + float(totals["tov"] or 0)
+                   + 0.44 * float(totals["fta"] or 0))
+    off_rating = _ratio(totals["points"], possessions, 100.0, 2)
+    def_rating = _ratio(totals["opponent_points"], possessions, 100.0, 2)
+    per_game = {stat: _ratio(totals[stat], games, digits=2) for stat in TEAM_SEASON_TOTALS if stat != "minutes"}
+    per_game["possessions"] = _ratio(possessions, games, digits=2)
+    return {
+        "team_id": totals["team_id"],
+        "full_name": totals["full_name"],
+        "abbreviation": totals["abbreviation"],
+        "season_id": totals["season_id"],
+        "games": games,
+        "wins": totals["wins"],
+        "losses": totals["losses"],
+        "win_pct": _ratio(totals["wins"], games),
+        "first_game_date": totals["first_game_date"],
+        "last_game_date": totals["last_game_date"],
+        "totals": {stat: totals[stat] for stat in TEAM_SEASON_TOTALS},
+        "per_game": per_game,
+        "fg_pct": _ratio(totals["fgm"], totals["fga"]),
+        "fg3_pct": _ratio(totals["fg3m"], totals["fg3a"]),
+        "ft_pct": _ratio(totals["ftm"], totals["fta"]),
+        # Possessions per 48 minutes; team minutes are 240 for a regulation game
+        "pace": _ratio(possessions, totals["minutes"], 240.0, 2),
+        "off_rating": off_rating,
+        "def_rating": def_rating,
+        "net_rating": round(off_rating - def_rating, 2) if off_rating is not None and def_rating is not None else None,
+    }
+
+
+@app.route("/api/v1/teams/<int:team_id>/season", methods=["GET"])
+@limits.limited("team_season")
+def get_team_season(team_id):
+    """A team's season from team_season_stats (latest regular season unless season_id is given)."""
+    season_id = request.args.get('season_id', type=int)
+
+    def load():
+        with limits.connection("team_season") as conn:
+            cur = conn.cursor()
+            cur.execute(queries.TEAM_SEASON_STATS_QUERY, {"team_id": team_id, "season_id": season_id})
+            row = cur.fetchone()
+            totals = dict(zip([desc[0] for desc in cur.description], row)) if row else None
+            cur.close()
+            return totals
+
+    try:
+        totals = team_season_cache.get((team_id, season_id), load)
+
+    except Exception as e:
+        return limits.error_response(e, "loading team season stats")
+
+    if totals is None:
+        return jsonify({"error": "No season stats for this team"}), 404
+    return jsonify(_team_season_summary(totals))
+
+
+@app.route("/api/v1/leaders", methods=["GET"])
+@limits.limited("leaders")
+def get_leaders():
+    """Season leaderboard for a stat from player_season_stats.
+
+    Query: stat (points, rebounds, ..., fg_pct, fg3_pct, ft_pct), per (game, 36, total;
+    ignored for percentages), season_id (default: latest regular season), limit,
+    min_games, min_minutes.
+    """
+    stat = request.args.get('stat', default='points', type=str)
+    per = request.args.get('per', default='game', type=str)
+    season_id = request.args.get('season_id', type=int)
+    limit = max(1, min(request.args.get('limit', default=10, type=int), 100))
+    min_games = max(1, request.args.get('min_games', default=1, type=int))
+    min_minutes = max(0.0, request.args.get('min_minutes', default=0.0, type=float))
+    sql = queries.leaders_query(stat, per)
+    if sql is None:
+        return jsonify({
+            "error": f"Unsupported stat/per: {stat}/{per}",
+            "stats": list(queries.LEADER_COUNTING_STATS) + list(queries.LEADER_PCT_STATS),
+            "per": list(queries.LEADER_PER),
+        }), 400
+    if stat in queries.LEADER_PCT_STATS:
+        per = None
+
+    def load():
+        with limits.connection("leaders") as conn:
+            cur = conn.cursor()
+            season = season_id
+            if season is None:
+                cur.execute(queries.LATEST_PLAYER_SEASON_QUERY)
+                season = cur.fetchone()[0]
+            rows = []
+            if season is not None:
+                cur.execute(sql, {"season_id": season, "min_games": min_games,
+                                  "min_minutes": min_minutes, "limit": limit})
+                result = cur.fetchall()
+                if result and cur.description:
+                    columns = [desc[0] for desc in cur.description]
+                    rows = [dict(zip(columns, row)) for row in result]
+            cur.close()
+            return season, rows
+
+    try:
+        season, rows = leaders_cache.get((stat, per, season_id, limit, min_games, min_minutes), load)
+
+    except Exception as e:
+        return limits.error_response(e, "loading leaders")
+
+    leaders = [dict(row, rank=rank, value=round(float(row["value"]), 3))
+               for rank, row in enumerate(rows, 1)]
+    return jsonify({"season_id": season, "stat": stat, "per": per, "leaders": leaders})
+
+
+def _parse_lines(raw):
+    return [float(value) for value in str(raw).split(',') if value.strip()]
+
+
 @app.route("/api/v1/predict", methods=['GET'])
+@limits.limited("predict")
 def predict_player_points():
-    if model is None:
+    if not predictor.load_model():
         return jsonify({"error": "Model not loaded"}), 500
     
     player_id = request.args.get('player_id', type=int)
     opponent_team_id = request.args.get('opponent_team_id', type=int)
+    is_home = request.args.get('is_home', default=0, type=int)
+    requested_stats = [stat.strip() for stat in request.args.get('stats', 'pts').split(',') if stat.strip()]
 
     if not player_id or not opponent_team_id:
         return jsonify({"error": "Missing required parameters"}), 400
-    
-    conn = None
+
+    available = predictor.available_stats()
+    unsupported = [stat for stat in requested_stats if stat not in available]
+    if unsupported or not requested_stats:
+        return jsonify({"error": f"Unsupported stats: {unsupported}", "available": available}), 400
+
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        player_average_10_games_query = """
-                SELECT AVG(points)
-            FROM (
-                SELECT pgs.points
-                FROM player_game_stats pgs
-                JOIN games g ON pgs.game_id = g.game_id AND pgs.team_id = g.team_id
-                WHERE pgs.player_id = %s
-                ORDER BY g.game_date DESC
-                LIMIT 10
-            ) AS last_10_games;
-            """
-        
-        cur.execute(player_average_10_games_query, (player_id,))
-        player_avg_result = cur.fetchone()
-        player_points_last_10 = player_avg_result[0] if player_avg_result and player_avg_result[0] is not None else 0.0
-
-        opponent_avg_query = """
-                    WITH game_opponent AS (
-                        SELECT g1.game_id, g1.team_id, g2.points AS points_allowed
-                        FROM games g1 JOIN games g2 on g1.game_id = g2.game_id and g1.team_id != g2.team_id
-                    )
-
-                    SELECT AVG(points_allowed)
-                    FROM (
-                        SELECT go.points_allowed, g.game_date
-                        FROM games g JOIN game_opponent go ON g.game_id = go.game_id AND g.team_id = go.team_id
-                        WHERE g.team_id = %s
-                        ORDER BY g.game_date DESC
-                        LIMIT 10
-                    ) AS last_10_opponent_games;
-            """
-
-        cur.execute(opponent_avg_query, (opponent_team_id,))
-        opponent_avg_result = cur.fetchone()
-        opponent_avg_points_allowed_last_10 = opponent_avg_result[0] if opponent_avg_result and opponent_avg_result[0] is not None else 115.0
-
-        feature_df = pd.DataFrame({
-            'player_points_last_10': [player_points_last_10],
-            'opponent_avg_points_allowed_last_10': [opponent_avg_points_allowed_last_10]
-        })
+        lines = _parse_lines(request.args.get('lines', ''))
+    except ValueError:
+        return jsonify({"error": "lines must be comma-separated numbers"}), 400
+    
+    matchup = (player_id, opponent_team_id, is_home)
 
-        prediction = model.predict(feature_df)
-        predicted_points = round(prediction[0], 2)
+    def predict():
+        with limits.connection("predict") as conn:
+            cur = conn.cursor()
+            # Every stat the model was trained on, served from the prediction cache when warm
+            return predictor.predict_matchups(cur, [matchup])
 
-        return jsonify ({
+    try:
+        # Requested stats and lines are applied per request; the prediction is shared
+        by_stat = predict_flight.do(matchup, predict)
+        predictions = {stat: round(float(by_stat[stat][0]), 2) for stat in requested_stats}
+
+        response = {
             "player_id": player_id,
             "opponent_team_id": opponent_team_id,
-            "predicted_points": predicted_points
+            "predictions": predictions,
+        }
+        if "pts" in predictions:
+            response["predicted_points"] = predictions["pts"]
+        if lines:
+            over = {}
+            for stat in requested_stats:
+                probs = predictor.over_probabilities(stat, by_stat[stat], np.asarray(lines))
+                if probs is not None:
+                    over[stat] = {str(line): round(float(p), 4) for line, p in zip(lines, probs[0])}
+            response["over_probabilities"] = over
+        return jsonify(response)
+
+    except Exception as e:
+        return limits.error_response(e, "predicting")
+
+
+@app.route("/api/v1/props", methods=['POST'])
+@limits.limited("props")
+def price_props():
+    """Over/under probabilities for a slate of props.
+
+    Body: {"props": [{"player_id", "opponent_team_id", "stat", "lines": [...], "is_home"?}, ...]}.
+    Features and predictions are computed once per (player, opponent) pair and all
+    lines for a stat are priced in one vectorized call.
+    """
+    if not predictor.load_model():
+        return jsonify({"error": "Model not loaded"}), 500
+
+    payload = request.get_json(silent=True) or {}
+    props = payload.get("props")
+    if not isinstance(props, list) or not props:
+        return jsonify({"error": "Body must contain a non-empty 'props' list"}), 400
+
+    available = predictor.available_stats()
+    parsed = []
+    try:
+        for prop in props:
+            parsed.append({
+                "matchup": (int(prop["player_id"]), int(prop["opponent_team_id"]), int(prop.get("is_home", 0))),
+                "stat": prop.get("stat", "pts"),
+                "lines": [float(line) for line in prop["lines"]],
+            })
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Each prop needs player_id, opponent_team_id, stat and numeric lines"}), 400
+    unsupported = sorted({prop["stat"] for prop in parsed} - set(available))
+    if unsupported:
+        return jsonify({"error": f"Unsupported stats: {unsupported}", "available": available}), 400
+
+    matchups = {}
+    for prop in parsed:
+        matchups.setdefault(prop["matchup"], len(matchups))
+
+    try:
+        with limits.connection("props") as conn:
+            cur = conn.cursor()
+
+            by_stat = predictor.predict_matchups(cur, list(matchups))
+
+        # Group props by stat so each distribution prices its whole block of lines at once
+        results = [None] * len(parsed)
+        indices_by_stat = {}
+        for index, prop in enumerate(parsed):
+            indices_by_stat.setdefault(prop["stat"], []).append(index)
+        for stat, indices in indices_by_stat.items():
+            rows = np.array([matchups[parsed[i]["matchup"]] for i in indices])
+            width = max(len(parsed[i]["lines"]) for i in indices)
+            lines = np.full((len(indices), width), np.nan)
+            for k, i in enumerate(indices):
+                lines[k, :len(parsed[i]["lines"])] = parsed[i]["lines"]
+            preds = by_stat[stat][rows]
+            probs = predictor.over_probabilities(stat, preds, lines)
+            for k, i in enumerate(indices):
+                player_id, opponent_team_id, _ = parsed[i]["matchup"]
+                results[i] = {
+                    "player_id": player_id,
+                    "opponent_team_id": opponent_team_id,
+                    "stat": stat,
+                    "prediction": round(float(preds[k]), 2),
+                    "lines": [
+                        {
+                            "line": line,
+                            "over": None if probs is None else round(float(probs[k, m]), 4),
+                            "under": None if probs is None else round(1.0 - float(probs[k, m]), 4),
+                        }
+                        for m, line in enumerate(parsed[i]["lines"])
+                    ],
+                }
+
+        return jsonify({"props": results})
+
+    except Exception as e:
+        return limits.error_response(e, "pricing props")
+
+
+@app.route("/api/v1/simulate", methods=['POST'])
+@limits.limited("simulate")
+def simulate_games():
+    """Joint Monte Carlo outcomes for a slate, and parlay prices from the same draws.
+
+    Body: {"games": [{"home_team_id", "away_team_id", "home_player_ids": [...], "away_player_ids": [...]}],
+           "parlays"?: [[{"player_id", "stat", "line", "side"?: "over"|"under"}, ...]], "n_sims"?, "seed"?}.
+    Same seed and body give the same numbers.
+    """
+    if not predictor.load_model() or predictor.copula is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        games = [
+            {
+                "home_team_id": int(game["home_team_id"]),
+                "away_team_id": int(game["away_team_id"]),
+                "home": [int(player_id) for player_id in game.get("home_player_ids", [])],
+                "away": [int(player_id) for player_id in game.get("away_player_ids", [])],
+            }
+            for game in payload["games"]
+        ]
+        parlays = [
+            [dict(leg, player_id=int(leg["player_id"]), line=float(leg["line"]),
+                  side=leg.get("side", "over"), stat=leg.get("stat", "pts")) for leg in legs]
+            for legs in payload.get("parlays", [])
+        ]
+        n_sims = max(1, min(int(payload.get("n_sims", DEFAULT_SIMS)), MAX_SIMS))
+        seed = int(payload.get("seed", 0))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Body needs games with team ids and player id lists; legs need player_id, stat and a numeric line"}), 400
+    if not any(game["home"] or game["away"] for game in games):
+        return jsonify({"error": "No players on the slate"}), 400
+
+    slate_players = {player_id for game in games for player_id in game["home"] + game["away"]}
+    available = predictor.available_stats()
+    for legs in parlays:
+        for leg in legs:
+            if leg["player_id"] not in slate_players or leg["stat"] not in available or leg["side"] not in ("over", "under"):
+                return jsonify({"error": f"Invalid leg: {leg}", "available": available}), 400
+
+    try:
+        with limits.connection("simulate") as conn:
+            cur = conn.cursor()
+
+            players, mappings = [], []
+            for game in games:
+                for is_home, team_id, opponent_team_id, player_ids in (
+                        (1, game["home_team_id"], game["away_team_id"], game["home"]),
+                        (0, game["away_team_id"], game["home_team_id"], game["away"])):
+                    for player_id in player_ids:
+                        players.append({"player_id": player_id, "team_id": team_id, "opponent_team_id": opponent_team_id})
+                        mappings.append(predictor.cached_feature_mapping(cur, player_id, opponent_team_id, is_home))
+
+        simulation = predictor.simulate([(game["home"], game["away"]) for game in games], mappings, n_sims, seed)
+        summaries = simulation.summarize()
+        for player, summary in zip(players, summaries):
+            summary.update(player)
+
+        return jsonify({
+            "n_sims": n_sims,
+            "seed": seed,
+            "players": summaries,
+            "parlays": [simulation.price_parlay(legs) for legs in parlays],
         })
 
     except Exception as e:
-        print("Error during prediction")
-        traceback.print_exc()
-        return jsonify({"error": "An error occurred during prediction."}), 500
-    
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        return limits.error_response(e, "simulating the slate")
\ No newline at end of file
@@ -1,4 +1,7 @@
 from . import app
+from . import predictor
 
 if __name__ == "__main__":
+    # Load the model before serving instead of on the first prediction request
+    predictor.load_model()
     app.run(host="0.0.0.0", port=5001, debug=True)
\ No newline at end of file
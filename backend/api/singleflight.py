@@ -0,0 +1,93 @@
+import threading
+from typing import Callable, Dict, Hashable, List
+
+# In-worker request coalescing. When several threads ask for the same key while
+# a computation for it is already running, they wait for that one and share its
+# result (or its exception) instead of running their own. Unlike the TTL caches
+# in invalidation.py nothing is kept once the call finishes; this only flattens
+# thundering herds, e.g. a game-day burst of /predict calls for one star player.
+# It helps threaded workers (gunicorn gthread, Flask's threaded dev server);
+# single-threaded sync workers never see concurrent requests to coalesce.
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls per key; counts what it coalesced."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+        with _groups_lock:
+            _groups.append(self)
+
+    def __repr__(self) -> str:
+        return f"SingleFlight({self.name!r}, calls={self.calls}, coalesced={self.coalesced})"
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        """fn()'s result, shared with every concurrent caller using the same key."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "in_flight": len(self._calls),
+                "max_waiters": self.max_waiters,
+            }
+
+
+_groups: List[SingleFlight] = []
+_groups_lock = threading.Lock()
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Counters of every SingleFlight in this worker, by name."""
+    with _groups_lock:
+        groups = list(_groups)
+    return {group.name: group.stats() for group in groups}
@@ -1,15 +1,364 @@
 import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
 import psycopg2
-from dotenv import load_dotenv
 
-load_dotenv()
+_env_loaded = False
+_env_lock = threading.Lock()
 
-def get_db_connection():
+
+def _get_env_int(name: str, default: int) -> int:
+    try:
+        value = os.getenv(name)
+        return int(value) if value is not None and value != '' else default
+    except Exception:
+        return default
+
+
+def _get_env_float(name: str, default: float) -> float:
+    try:
+        value = os.getenv(name)
+        return float(value) if value is not None and value != '' else default
+    except Exception:
+        return default
+
+
+def _get_env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return str(value).strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+def load_env():
+    """Read .env into os.environ once per process; kept out of import time."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _env_loaded = True
+
+
+def connect_to(host: Optional[str], port: Optional[str]):
+    load_env()
     conn = psycopg2.connect(
         dbname = os.getenv("DB_NAME"),
         user = os.getenv("DB_USER"),
         password = os.getenv("DB_PASSWORD"),
-        host = os.getenv("DB_HOST"),
-        port = os.getenv("DB_PORT"),
+        host = host,
+        port = port,
+        connect_timeout = _get_env_int("DB_CONNECT_TIMEOUT_SECONDS", 5),
     )
-    return conn
\ No newline at end of file
+    return conn
+
+
+def get_db_connection():
+    """Connection to the primary (DB_HOST); the one to LISTEN on and write through."""
+    load_env()
+    return connect_to(os.getenv("DB_HOST"), os.getenv("DB_PORT"))
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool; checkout waits at most checkout_timeout seconds.
+
+    Connections are opened on demand up to max_size and reused LIFO. Each one
+    remembers the statement_timeout it was last given, so a checkout only sends
+    SET when the budget changes. An idle connection that fails check(conn) is
+    closed and replaced instead of being reused.
+    """
+
+    def __init__(self, connect: Callable[[], object], max_size: int, checkout_timeout: float,
+                 check: Optional[Callable[[object], bool]] = None):
+        self.connect = connect
+        self.check = check
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle: List[object] = []
+        self._timeouts: Dict[object, int] = {}
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def getconn(self, statement_timeout_ms: Optional[int] = None, timeout: Optional[float] = None):
+        if not self._slots.acquire(timeout=self.checkout_timeout if timeout is None else timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"no database connection free within {self.checkout_timeout}s")
+        try:
+            with self._lock:
+                self.checkouts += 1
+                conn = self._idle.pop() if self._idle else None
+            if conn is not None and not conn.closed and self.check is not None and not self.check(conn):
+                self._timeouts.pop(conn, None)
+                conn.close()
+            if conn is None or conn.closed:
+                conn = self.connect()
+            if statement_timeout_ms is not None and self._timeouts.get(conn) != statement_timeout_ms:
+                cur = conn.cursor()
+                cur.execute("SET statement_timeout = %s", (int(statement_timeout_ms),))
+                cur.close()
+                conn.commit()
+                self._timeouts[conn] = statement_timeout_ms
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            if not conn.closed:
+                # End whatever transaction the request left open before reuse
+                conn.rollback()
+                with self._lock:
+                    self._idle.append(conn)
+                return
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        finally:
+            self._slots.release()
+        self._timeouts.pop(conn, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"max_size": self.max_size, "idle": len(self._idle),
+                    "checkouts": self.checkouts, "timeouts": self.timeouts}
+
+
+# Replication state of a reader: recovery flag plus seconds of replay lag. An idle
+# primary writes no WAL, so a standby that has replayed everything it received
+# counts as 0 however old its last replayed commit is; one with no WAL receiver
+# (cut off from the primary) is measured against its last replayed commit.
+REPLICA_LAG_QUERY = """
+    SELECT
+        pg_is_in_recovery(),
+        CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver)
+                 AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+                          'Infinity'::float8)
+        END;
+    """
+
+
+class NoHealthyReader(PoolTimeout):
+    """Every reader is down or lagging and falling back to the primary is disabled."""
+
+
+def parse_hosts(value: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """[(host, port)] from "host[:port],host[:port]"; a host may be a socket directory."""
+    hosts = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, sep, port = item.rpartition(":")
+        hosts.append((host, port) if sep and port.isdigit() else (item, None))
+    return hosts
+
+
+class _ReaderState:
+    __slots__ = ("healthy", "lag_seconds", "checked_at", "error", "connections")
+
+    def __init__(self):
+        self.healthy = True
+        self.lag_seconds = None
+        self.checked_at = float("-inf")
+        self.error = None
+        self.connections = 0
+
+
+class ReaderRouter:
+    """Routes read-only connections across replicas, round-robin over healthy ones.
+
+    A reader is healthy while it accepts connections and its replay lag is at
+    most max_lag_seconds. Lag is measured when a connection is opened and again
+    on pooled connections every check_seconds; a reader marked down is skipped
+    until check_seconds have passed. With no healthy reader, connections go to
+    the primary if fallback_to_primary, else NoHealthyReader is raised.
+    """
+
+    def __init__(self, readers: List[Tuple[str, Optional[str]]], connect_reader: Callable[[str, Optional[str]], object],
+                 connect_primary: Callable[[], object], max_lag_seconds: float = 10.0,
+                 check_seconds: float = 5.0, fallback_to_primary: bool = True):
+        self.readers = list(readers)
+        self.connect_reader = connect_reader
+        self.connect_primary = connect_primary
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.fallback_to_primary = fallback_to_primary
+        self._state = {reader: _ReaderState() for reader in self.readers}
+        # conn -> (reader or None for the primary, when it was last vetted)
+        self._conns = weakref.WeakKeyDictionary()
+        self._next = 0
+        self._lock = threading.Lock()
+        self.primary_connections = 0
+
+    def _measure(self, reader, conn) -> bool:
+        state = self._state[reader]
+        try:
+            cur = conn.cursor()
+            cur.execute(REPLICA_LAG_QUERY)
+            _, lag_seconds = cur.fetchone()
+            cur.close()
+            conn.rollback()
+            lag_seconds = float(lag_seconds)
+            healthy, error = lag_seconds <= self.max_lag_seconds, None
+            if not healthy:
+                error = f"replay lag {lag_seconds:.1f}s over {self.max_lag_seconds}s"
+        except Exception as e:
+            lag_seconds, healthy, error = None, False, str(e).strip()
+        with self._lock:
+            if state.healthy and not healthy:
+                print(f"Reader {reader[0]} marked down: {error}")
+            state.healthy, state.lag_seconds, state.error = healthy, lag_seconds, error
+            state.checked_at = time.monotonic()
+        return healthy
+
+    def _candidates(self) -> List[Tuple[str, Optional[str]]]:
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(len(self.readers), 1)
+            rotation = self.readers[start:] + self.readers[:start]
+            return [reader for reader in rotation
+                    if self._state[reader].healthy or now - self._state[reader].checked_at >= self.check_seconds]
+
+    def connect(self):
+        """A connection to the next healthy reader (or the primary as a fallback)."""
+        for reader in self._candidates():
+            try:
+                conn = self.connect_reader(*reader)
+            except Exception as e:
+                with self._lock:
+                    state = self._state[reader]
+                    if state.healthy:
+                        print(f"Reader {reader[0]} marked down: {str(e).strip()}")
+                    state.healthy, state.error, state.checked_at = False, str(e).strip(), time.monotonic()
+                continue
+            if self._measure(reader, conn):
+                with self._lock:
+                    self._state[reader].connections += 1
+                    self._conns[conn] = (reader, time.monotonic())
+                return conn
+            conn.close()
+        if not self.fallback_to_primary:
+            raise NoHealthyReader("no database reader is healthy and fallback to the primary is disabled")
+        conn = self.connect_primary()
+        with self._lock:
+            self.primary_connections += 1
+            self._conns[conn] = (None, time.monotonic())
+        return conn
+
+    def check(self, conn) -> bool:
+        """Whether a pooled connection may be reused; re-measures lag when it is due."""
+        with self._lock:
+            reader, vetted_at = self._conns.get(conn, (None, None))
+        if vetted_at is None:
+            return True
+        now = time.monotonic()
+        if reader is None:
+            # Fallback connections are retired so readers get retried
+            return now - vetted_at < self.check_seconds
+        with self._lock:
+            healthy = self._state[reader].healthy
+        if not healthy:
+            return False
+        if now - vetted_at < self.check_seconds:
+            return True
+        if not self._measure(reader, conn):
+            return False
+        with self._lock:
+            self._conns[conn] = (reader, now)
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "readers": {
+                    f"{host}:{port}" if port else host: {
+                        "healthy": state.healthy, "lag_seconds": state.lag_seconds,
+                        "error": state.error, "connections": state.connections,
+                    }
+                    for (host, port), state in self._state.items()
+                },
+                "primary_connections": self.primary_connections,
+                "max_lag_seconds": self.max_lag_seconds,
+            }
+
+
+_router: Optional[ReaderRouter] = None
+_router_loaded = False
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def reader_max_lag_seconds() -> float:
+    return _get_env_float("DB_READER_MAX_LAG_SECONDS", 10.0)
+
+
+def get_router() -> Optional[ReaderRouter]:
+    """The worker's reader router, or None when DB_READER_HOSTS is not set."""
+    global _router, _router_loaded
+    if not _router_loaded:
+        with _pool_lock:
+            if not _router_loaded:
+                load_env()
+                readers = parse_hosts(os.getenv("DB_READER_HOSTS"))
+                if readers:
+                    _router = ReaderRouter(
+                        readers, connect_to, get_db_connection,
+                        max_lag_seconds=reader_max_lag_seconds(),
+                        check_seconds=_get_env_float("DB_READER_CHECK_SECONDS", 5.0),
+                        fallback_to_primary=_get_env_bool("DB_READER_FALLBACK_TO_PRIMARY", True),
+                    )
+                _router_loaded = True
+    return _router
+
+
+def get_read_connection():
+    """Connection for read-only queries: a healthy reader if any are configured, else the primary."""
+    router = get_router()
+    return router.connect() if router is not None else get_db_connection()
+
+
+def get_pool() -> ConnectionPool:
+    """The worker's read pool, created on first use (DB_POOL_SIZE, DB_POOL_TIMEOUT_SECONDS)."""
+    global _pool
+    if _pool is None:
+        router = get_router()
+        with _pool_lock:
+            if _pool is None:
+                load_env()
+                _pool = ConnectionPool(router.connect if router is not None else get_db_connection,
+                                       _get_env_int("DB_POOL_SIZE", 10),
+                                       _get_env_float("DB_POOL_TIMEOUT_SECONDS", 1.0),
+                                       check=router.check if router is not None else None)
+    return _pool
+
+
+@contextmanager
+def pooled_connection(statement_timeout_ms: Optional[int] = None):
+    """A pooled connection whose statements are cancelled after statement_timeout_ms."""
+    pool = get_pool()
+    conn = pool.getconn(statement_timeout_ms)
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
\ No newline at end of file
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from backend.ml.columnar import read_sql_frame
+from backend.ml.online_features import INJURY_SEVERITY, status_severity
+
+# Point-in-time joins against the timestamped injury_reports and game_lines
+# tables. Every lookup is a sorted pd.merge_asof with allow_exact_matches=False,
+# so a training row only ever sees reports and lines published before tipoff.
+
+# Older reports are treated as stale
+INJURY_REPORT_TTL = pd.Timedelta(days=14)
+# games.tipoff_datetime is optional; assume a 7pm ET tip when it is missing
+DEFAULT_TIPOFF_OFFSET = pd.Timedelta(hours=23)
+DEFAULT_GAME_TOTAL = 225.0
+TIMESTAMP_DTYPE = "datetime64[ns, UTC]"
+
+INJURY_REPORTS_QUERY = """
+    SELECT player_id, report_time, status
+    FROM injury_reports
+    ORDER BY report_time
+"""
+
+GAME_LINES_QUERY = """
+    SELECT game_id, retrieved_at, home_spread, total
+    FROM game_lines
+    ORDER BY retrieved_at
+"""
+
+
+def _read_optional(sql: str, conn, columns) -> pd.DataFrame:
+    """Read an optional table; older databases may not have it yet."""
+    try:
+        return read_sql_frame(sql, conn)
+    except Exception as e:
+        print(f"Skipping as-of source ({e.__class__.__name__}): {str(e).splitlines()[0]}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return pd.DataFrame(columns=columns)
+
+
+def load_injury_reports(conn) -> pd.DataFrame:
+    injuries = _read_optional(INJURY_REPORTS_QUERY, conn, ["player_id", "report_time", "status"])
+    injuries["report_time"] = pd.to_datetime(injuries["report_time"], utc=True)
+    injuries["player_id"] = injuries["player_id"].astype("int64")
+    injuries["severity"] = injuries["status"].map(status_severity).astype("float64")
+    return injuries.sort_values("report_time", kind="stable").reset_index(drop=True)
+
+
+def load_game_lines(conn) -> pd.DataFrame:
+    lines = _read_optional(GAME_LINES_QUERY, conn, ["game_id", "retrieved_at", "home_spread", "total"])
+    lines["retrieved_at"] = pd.to_datetime(lines["retrieved_at"], utc=True)
+    lines["game_id"] = lines["game_id"].astype(str)
+    for col in ("home_spread", "total"):
+        lines[col] = pd.to_numeric(lines[col], errors="coerce").astype("float64")
+    return lines.sort_values("retrieved_at", kind="stable").reset_index(drop=True)
+
+
+def tipoff_times(df: pd.DataFrame) -> pd.Series:
+    fallback = pd.to_datetime(df["game_date"]).dt.tz_localize("UTC") + DEFAULT_TIPOFF_OFFSET
+    if "tipoff_datetime" not in df.columns:
+        return fallback
+    return pd.to_datetime(df["tipoff_datetime"], utc=True).fillna(fallback)
+
+
+def _asof_severity(left: pd.DataFrame, injuries: pd.DataFrame) -> np.ndarray:
+    """Latest injury severity per (player_id, tipoff) row of left, 0 when none is in force."""
+    ordered = left[["player_id", "tipoff"]].reset_index().sort_values("tipoff", kind="stable")
+    merged = pd.merge_asof(
+        ordered, injuries[["player_id", "report_time", "severity"]],
+        left_on="tipoff", right_on="report_time", by="player_id",
+        direction="backward", allow_exact_matches=False, tolerance=INJURY_REPORT_TTL,
+    )
+    severity = np.zeros(len(left))
+    severity[merged["index"].to_numpy()] = merged["severity"].fillna(0.0).to_numpy()
+    return severity
+
+
+def add_asof_features(df: pd.DataFrame, injuries: pd.DataFrame, lines: pd.DataFrame) -> pd.DataFrame:
+    """Attach injury and betting-line features as of each game's tipoff."""
+    df = df.reset_index(drop=True).copy()
+    df["tipoff"] = tipoff_times(df)
+    # merge_asof needs identical key dtypes (and datetime resolutions) on both sides
+    df["game_id"] = df["game_id"].astype(str)
+    df["tipoff"] = df["tipoff"].astype(TIMESTAMP_DTYPE)
+    injuries = injuries.astype({"player_id": "int64", "report_time": TIMESTAMP_DTYPE, "severity": "float64"})
+    lines = lines.astype({"game_id": str, "retrieved_at": TIMESTAMP_DTYPE,
+                          "home_spread": "float64", "total": "float64"})
+
+    # Player's own status
+    df["player_injury_severity"] = _asof_severity(df, injuries)
+
+    # Teammates: everyone on the team's season roster, weighted by their
+    # season-to-date minutes as of the same tipoff
+    history = df[["player_id", "season_id", "tipoff", "minutes"]].sort_values(["player_id", "tipoff"])
+    grouped = history.groupby(["player_id", "season_id"], sort=False)["minutes"]
+    history["typical_minutes"] = grouped.cumsum() / (grouped.cumcount() + 1)
+    history = history.sort_values("tipoff", kind="stable")
+
+    team_games = df[["team_id", "season_id", "game_id", "tipoff"]].drop_duplicates(["team_id", "game_id"])
+    roster = df[["team_id", "season_id", "player_id"]].drop_duplicates()
+    pairs = team_games.merge(roster, on=["team_id", "season_id"]).sort_values("tipoff", kind="stable")
+    pairs = pd.merge_asof(
+        pairs, history[["player_id", "season_id", "tipoff", "typical_minutes"]].rename(columns={"tipoff": "played_at"}),
+        left_on="tipoff", right_on="played_at", by=["player_id", "season_id"],
+        direction="backward", allow_exact_matches=False,
+    ).reset_index(drop=True)
+    pairs["severity"] = _asof_severity(pairs, injuries)
+    pairs["out_minutes"] = pairs["severity"] * pairs["typical_minutes"].fillna(0.0)
+    pairs["is_out"] = (pairs["severity"] >= INJURY_SEVERITY["doubtful"]).astype("int64")
+
+    team_totals = pairs.groupby(["team_id", "game_id"], as_index=False)[["is_out", "out_minutes"]].sum()
+    df = df.merge(team_totals, on=["team_id", "game_id"], how="left")
+    # Remove each player's own contribution from the team totals
+    own = pairs[["team_id", "game_id", "player_id", "is_out", "out_minutes"]].rename(
+        columns={"is_out": "own_out", "out_minutes": "own_out_minutes"})
+    df = df.merge(own, on=["team_id", "game_id", "player_id"], how="left")
+    df["teammates_out"] = (df["is_out"].fillna(0) - df["own_out"].fillna(0)).astype("int64")
+    df["teammates_out_minutes"] = df["out_minutes"].fillna(0.0) - df["own_out_minutes"].fillna(0.0)
+    df.drop(columns=["is_out", "out_minutes", "own_out", "own_out_minutes"], inplace=True)
+
+    # Latest spread/total published before tipoff
+    games = df[["game_id", "tipoff"]].drop_duplicates("game_id").sort_values("tipoff", kind="stable")
+    game_lines = pd.merge_asof(
+        games, lines[["game_id", "retrieved_at", "home_spread", "total"]],
+        left_on="tipoff", right_on="retrieved_at", by="game_id",
+        direction="backward", allow_exact_matches=False,
+    )
+    df = df.merge(game_lines[["game_id", "home_spread", "total"]], on="game_id", how="left")
+    df["has_line"] = df["home_spread"].notna().astype("int64")
+    home = df["is_home"].fillna(False).astype(bool) if "is_home" in df.columns else False
+    df["team_spread"] = np.where(home, df["home_spread"], -df["home_spread"])
+    df["team_spread"] = df["team_spread"].fillna(0.0)
+    known_total = df["total"].mean() if df["total"].notna().any() else DEFAULT_GAME_TOTAL
+    df["game_total"] = df["total"].fillna(known_total)
+    df.drop(columns=["tipoff", "home_spread", "total"], inplace=True)
+    return df
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.multioutput import MultiOutputRegressor
+
+from backend.ml.train_model import (
+    STAT_TARGETS,
+    create_training_dataframe,
+    feature_engineering,
+    prepare_training_data,
+)
+from backend.ml.tuning import build_estimator
+
+# Point-in-time backtest: replays game dates in order as if the model had been
+# deployed, retraining every `retrain_every` game dates on everything strictly
+# before the window and scoring each day in it.
+#
+#   python -m backend.ml.backtest --start 2024-10-22 --end 2025-04-13 --workers 8 --output backtest.json
+#
+# Features come from feature_engineering(point_in_time=True), which only looks at
+# earlier games. Rows are selected as in prepare_training_data, so the MAEs are
+# comparable with train_model's holdout numbers. The date-sorted arrays are
+# written once to .npy files and opened with mmap_mode="r" by every worker (as in
+# tuning.py); a task is a window of row offsets.
+#
+# There are no historical player prop lines in the database, so each prop is
+# priced against a proxy line: the player's last-10 average of the stat, set to
+# the half point below it. The model "bets" the side its prediction falls on.
+
+DEFAULT_PARAMS: Dict[str, Dict[str, Any]] = {
+    # Lighter than train_model's forest: one fit per window, dozens per season
+    "random_forest": {"n_estimators": 100, "min_samples_leaf": 20, "max_features": 0.3, "max_samples": 0.5},
+    "lightgbm": {"n_estimators": 300, "learning_rate": 0.05, "num_leaves": 31},
+}
+# Predictions at least this far from the line count as "edge" props
+DEFAULT_MIN_EDGE = 1.0
+
+# Per-process view of the shared arrays, set by _init_worker
+_shared: Dict[str, np.ndarray] = {}
+
+
+def proxy_lines(df: pd.DataFrame, targets: Sequence[str]) -> np.ndarray:
+    """Half-point lines just under each player's last-10 average, shape (rows, targets)."""
+    averages = df[[f"{target}_last_10" for target in targets]].to_numpy(dtype=np.float64)
+    return np.floor(averages - 0.5) + 0.5
+
+
+def write_backtest_arrays(df: pd.DataFrame, features: List[str], targets: List[str],
+                          directory: str) -> Dict[str, str]:
+    """X (float32, as fitted), Y, proxy lines and day numbers of date-sorted rows, as .npy files."""
+    arrays = {
+        "X": np.ascontiguousarray(df[features].to_numpy(dtype=np.float32)),
+        "Y": np.ascontiguousarray(df[targets].to_numpy(dtype=np.float64)),
+        "lines": np.ascontiguousarray(proxy_lines(df, targets)),
+        "day": df["game_date"].to_numpy(dtype="datetime64[D]").astype(np.int64),
+    }
+    paths = {}
+    for name, values in arrays.items():
+        paths[name] = os.path.join(directory, f"{name}.npy")
+        np.save(paths[name], values)
+    return paths
+
+
+def _init_worker(paths: Dict[str, str]) -> None:
+    for name, path in paths.items():
+        _shared[name] = np.load(path, mmap_mode="r")
+
+
+def make_windows(days: np.ndarray, start_day: int, end_day: int, retrain_every: int) -> List[Tuple[int, int]]:
+    """(row_start, row_end) windows of `retrain_every` game dates within [start_day, end_day]."""
+    dates = np.unique(days[(days >= start_day) & (days <= end_day)])
+    windows = []
+    for first in range(0, len(dates), retrain_every):
+        chunk = dates[first:first + retrain_every]
+        windows.append((int(np.searchsorted(days, chunk[0], side="left")),
+                        int(np.searchsorted(days, chunk[-1], side="right"))))
+    return windows
+
+
+def _fit(kind: str, params: Dict[str, Any], X: np.ndarray, Y: np.ndarray):
+    model = build_estimator(kind, params)
+    if Y.shape[1] > 1 and kind != "random_forest":
+        model = MultiOutputRegressor(model)
+    model.fit(X, Y if Y.shape[1] > 1 else Y[:, 0])
+    return model
+
+
+def _score_day(day: int, Y: np.ndarray, preds: np.ndarray, lines: np.ndarray, stats: Sequence[str],
+               min_edge: float) -> Dict[str, Any]:
+    errors = np.abs(preds - Y)
+    over = preds > lines
+    hit = np.where(over, Y > lines, Y < lines)
+    edge = np.abs(preds - lines) >= min_edge
+    priced = ~np.isnan(lines)
+    return {
+        "date": str(np.datetime64(day, "D")),
+        "rows": int(len(Y)),
+        "abs_error": {stat: float(errors[:, k].sum()) for k, stat in enumerate(stats)},
+        "props": {
+            stat: {
+                "n": int(priced[:, k].sum()),
+                "hits": int((hit[:, k] & priced[:, k]).sum()),
+                "edge_n": int((edge[:, k] & priced[:, k]).sum()),
+                "edge_hits": int((hit[:, k] & edge[:, k] & priced[:, k]).sum()),
+            }
+            for k, stat in enumerate(stats)
+        },
+    }
+
+
+def _run_window(task: Tuple[Tuple[int, int], str, Dict[str, Any], Sequence[str], float]) -> List[Dict[str, Any]]:
+    (row_start, row_end), kind, params, stats, min_edge = task
+    X, Y, lines, days = _shared["X"], _shared["Y"], _shared["lines"], _shared["day"]
+    start = time.perf_counter()
+    # Rows are date-sorted, so "strictly before the window" is a prefix
+    model = _fit(kind, params, X[:row_start], Y[:row_start])
+    preds = np.asarray(model.predict(X[row_start:row_end]), dtype=np.float64).reshape(row_end - row_start, -1)
+    window_days = np.asarray(days[row_start:row_end])
+    window_Y, window_lines = np.asarray(Y[row_start:row_end]), np.asarray(lines[row_start:row_end])
+
+    records = []
+    boundaries = np.flatnonzero(np.diff(window_days)) + 1
+    for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(window_days)]):
+        records.append(_score_day(int(window_days[lo]), window_Y[lo:hi], preds[lo:hi],
+                                  window_lines[lo:hi], stats, min_edge))
+    records[0]["fit_seconds"] = round(time.perf_counter() - start, 2)
+    records[0]["train_rows"] = row_start
+    return records
+
+
+def summarize(records: List[Dict[str, Any]], stats: Sequence[str]) -> Dict[str, Any]:
+    """Pooled MAE and prop hit rates, overall and per month."""
+    def pool(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+        rows = sum(record["rows"] for record in group)
+        out: Dict[str, Any] = {"dates": len(group), "rows": rows, "mae": {}, "hit_rate": {}, "edge_hit_rate": {}}
+        for stat in stats:
+            out["mae"][stat] = round(sum(r["abs_error"][stat] for r in group) / rows, 4) if rows else None
+            n = sum(r["props"][stat]["n"] for r in group)
+            edge_n = sum(r["props"][stat]["edge_n"] for r in group)
+            out["hit_rate"][stat] = round(sum(r["props"][stat]["hits"] for r in group) / n, 4) if n else None
+            out["edge_hit_rate"][stat] = (
+                round(sum(r["props"][stat]["edge_hits"] for r in group) / edge_n, 4) if edge_n else None)
+        return out
+
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_month.setdefault(record["date"][:7], []).append(record)
+    return {"overall": pool(records), "by_month": {month: pool(group) for month, group in sorted(by_month.items())}}
+
+
+def backtest(df: pd.DataFrame, stats: Sequence[str] = tuple(STAT_TARGETS), start: Optional[str] = None,
+             end: Optional[str] = None, retrain_every: int = 7, min_train_days: int = 30,
+             kind: str = "random_forest", params: Optional[Dict[str, Any]] = None,
+             workers: Optional[int] = None, min_edge: float = DEFAULT_MIN_EDGE) -> Dict[str, Any]:
+    """Replay [start, end] (default: everything after min_train_days game dates of history).
+
+    df is the output of feature_engineering(..., point_in_time=True).
+    """
+    targets = [STAT_TARGETS[stat] for stat in stats]
+    df_clean, features = prepare_training_data(df, targets)
+    df_clean = df_clean.sort_values("game_date", kind="stable").reset_index(drop=True)
+    days = df_clean["game_date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+    all_dates = np.unique(days)
+    if len(all_dates) <= min_train_days:
+        raise ValueError(f"Need more than {min_train_days} game dates, have {len(all_dates)}")
+    start_day = int(np.datetime64(start, "D").astype(np.int64)) if start else int(all_dates[min_train_days])
+    end_day = int(np.datetime64(end, "D").astype(np.int64)) if end else int(all_dates[-1])
+    windows = [w for w in make_windows(days, start_day, end_day, retrain_every) if w[0] > 0]
+    if not windows:
+        raise ValueError("No game dates with training history in the requested range")
+
+    params = dict(DEFAULT_PARAMS[kind] if params is None else params)
+    workers = workers or os.cpu_count() or 1
+    # Later windows train on more rows; hand them out first so workers finish together
+    tasks = [(window, kind, params, list(stats), min_edge) for window in reversed(windows)]
+    print(f"Backtesting {len(windows)} windows ({windows[0][0]}..{windows[-1][1]} of {len(df_clean)} rows) "
+          f"with {workers} workers")
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_backtest_arrays(df_clean, features, targets, tmp)
+        if workers == 1:
+            _init_worker(paths)
+            results = [_run_window(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths,)) as pool:
+                results = list(pool.map(_run_window, tasks))
+
+    records = sorted((record for window in results for record in window), key=lambda r: r["date"])
+    summary = summarize(records, stats)
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    summary["config"] = {"kind": kind, "params": params, "retrain_every": retrain_every,
+                         "features": features, "min_edge": min_edge}
+    overall = summary["overall"]
+    for stat in stats:
+        print(f"  {stat}: MAE {overall['mae'][stat]:.3f}, hit rate {overall['hit_rate'][stat]}, "
+              f"edge hit rate {overall['edge_hit_rate'][stat]}")
+    print(f"Replayed {overall['dates']} dates in {summary['seconds']:.1f}s")
+    return {"summary": summary, "days": records}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Point-in-time backtest of the player stat model.")
+    parser.add_argument("--start", default=None, help="first game date to score (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="last game date to score (YYYY-MM-DD)")
+    parser.add_argument("--stats", nargs="+", default=list(STAT_TARGETS), choices=list(STAT_TARGETS))
+    parser.add_argument("--retrain-every", type=int, default=7, help="game dates per model refit")
+    parser.add_argument("--min-train-days", type=int, default=30)
+    parser.add_argument("--kind", default="random_forest", choices=list(DEFAULT_PARAMS))
+    parser.add_argument("--params", default=None, help="JSON estimator params, e.g. a tuning leaderboard entry")
+    parser.add_argument("--min-edge", type=float, default=DEFAULT_MIN_EDGE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--parquet-dir", default=None, help="read from a Parquet export instead of Postgres")
+    parser.add_argument("--synthetic-seasons", type=int, default=None, help="backtest on generated data instead of the DB")
+    parser.add_argument("--output", default="backtest.json")
+    args = parser.parse_args(argv)
+
+    if args.synthetic_seasons:
+        from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+        conn = load_into_sqlite(generate_league_tables(args.synthetic_seasons))
+        master_df = create_training_dataframe(conn)
+        conn.close()
+    elif args.parquet_dir:
+        from backend.ml.columnar import connect_duckdb
+        master_df = create_training_dataframe(connect_duckdb(args.parquet_dir))
+    else:
+        master_df = create_training_dataframe()
+    featured_df = feature_engineering(master_df, point_in_time=True)
+
+    result = backtest(featured_df, stats=args.stats, start=args.start, end=args.end,
+                      retrain_every=args.retrain_every, min_train_days=args.min_train_days,
+                      kind=args.kind, params=json.loads(args.params) if args.params else None,
+                      workers=args.workers, min_edge=args.min_edge)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import argparse
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from backend.ml.columnar import connect_duckdb, export_tables
+from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+from backend.ml.train_model import create_training_dataframe, feature_engineering, train_model
+
+# Benchmark for the training pipeline stages on generated data.
+#
+#   python -m backend.ml.benchmark --seasons 1 5 20 --output bench.json
+#   python -m backend.ml.benchmark --seasons 1 --compare bench.json
+#
+# Peak memory is measured with tracemalloc in the same pass as wall time, so
+# absolute timings carry a small tracing overhead; they are meant to be compared
+# against reports produced the same way.
+
+DEFAULT_SEASONS = (1, 5, 20)
+
+
+def run_stage(name: str, func: Callable[[], Any], rows: int,
+              profile_dir: Optional[str] = None, label: str = "") -> Tuple[Any, Dict[str, Any]]:
+    """Run one stage, returning its result and wall time / peak memory / throughput."""
+    profiler = cProfile.Profile() if profile_dir else None
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        result = func()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # Throughput is measured on the stage output when it is a frame, else on its input
+    out_rows = len(result) if isinstance(result, pd.DataFrame) else rows
+    stats: Dict[str, Any] = {
+        "seconds": round(elapsed, 4),
+        "peak_mb": round(peak / (1024 * 1024), 2),
+        "rows": int(out_rows),
+        "rows_per_sec": round(out_rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+    if profiler is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        prof_path = os.path.join(profile_dir, f"{label}{name}.prof")
+        profiler.dump_stats(prof_path)
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(25)
+        with open(os.path.join(profile_dir, f"{label}{name}.txt"), "w") as f:
+            f.write(buffer.getvalue())
+        stats["profile"] = prof_path
+
+    print(f"  {name}: {stats['seconds']:.3f}s, peak {stats['peak_mb']:.1f} MB, "
+          f"{stats['rows_per_sec'] or 0:,.0f} rows/s")
+    return result, stats
+
+
+def _columnar_available() -> bool:
+    try:
+        import duckdb  # noqa: F401
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def benchmark_seasons(n_seasons: int, seed: int = 42,
+                      profile_dir: Optional[str] = None) -> Dict[str, Any]:
+    print(f"Benchmarking {n_seasons} season(s) of generated data...")
+    tables = generate_league_tables(n_seasons=n_seasons, seed=seed)
+    conn = load_into_sqlite(tables)
+    n_source_rows = len(tables["player_game_stats"])
+    label = f"{n_seasons}s_"
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    try:
+        raw_df, stages["create_training_dataframe"] = run_stage(
+            "create_training_dataframe", lambda: create_training_dataframe(conn),
+            n_source_rows, profile_dir, label,
+        )
+        if _columnar_available():
+            # Same loader against DuckDB over a Parquet export of the same tables
+            with tempfile.TemporaryDirectory() as parquet_dir:
+                export_tables(conn, parquet_dir)
+                duck = connect_duckdb(parquet_dir)
+                try:
+                    _, stages["create_training_dataframe_duckdb"] = run_stage(
+                        "create_training_dataframe_duckdb", lambda: create_training_dataframe(duck),
+                        n_source_rows, profile_dir, label,
+                    )
+                finally:
+                    duck.close()
+    finally:
+        conn.close()
+
+    featured_df, stages["feature_engineering"] = run_stage(
+        "feature_engineering", lambda: feature_engineering(raw_df),
+        len(raw_df), profile_dir, label,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "benchmark_model.pkl")
+        _, stages["train_model"] = run_stage(
+            "train_model", lambda: train_model(featured_df, model_filename=model_path),
+            len(featured_df), profile_dir, label,
+        )
+
+    return {"seasons": n_seasons, "source_rows": n_source_rows, "stages": stages}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _environment() -> Dict[str, Any]:
+    import numpy as np
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def run_benchmark(seasons: Sequence[int] = DEFAULT_SEASONS, seed: int = 42,
+                  profile_dir: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "seed": seed,
+        "environment": _environment(),
+        "runs": [benchmark_seasons(n, seed=seed, profile_dir=profile_dir) for n in seasons],
+    }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 0.25) -> List[str]:
+    """Return regressions where seconds or peak_mb grew by more than threshold."""
+    regressions: List[str] = []
+    baseline_runs = {run["seasons"]: run for run in baseline.get("runs", [])}
+    for run in current.get("runs", []):
+        base_run = baseline_runs.get(run["seasons"])
+        if base_run is None:
+            continue
+        for stage, stats in run["stages"].items():
+            base_stats = base_run["stages"].get(stage)
+            if not base_stats:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                old, new = base_stats.get(metric), stats.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                if change > threshold:
+                    regressions.append(
+                        f"{run['seasons']} season(s) {stage} {metric}: {old} -> {new} (+{change:.0%})"
+                    )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the training pipeline on generated data.")
+    parser.add_argument("--seasons", type=int, nargs="+", default=list(DEFAULT_SEASONS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="training_benchmark.json", help="where to write the JSON report")
+    parser.add_argument("--profile-dir", default=None, help="write cProfile output per stage to this directory")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown when comparing")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.seasons, seed=args.seed, profile_dir=args.profile_dir)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Benchmark report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, threshold=args.threshold)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
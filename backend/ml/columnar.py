@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+# Parquet mirror of the tables training reads, queried in-process with DuckDB so
+# training and backtests put no analytical load on the Postgres that serves the API.
+#
+# Layout (hive-style, one directory per season for the partitioned fact tables):
+#   <root>/games/season_id=22023/part-0.parquet
+#   <root>/player_game_stats/season_id=22023/part-0.parquet
+#   <root>/players/part-0.parquet, <root>/injury_reports/..., <root>/game_lines/...
+#   <root>/manifest.json
+#
+# pyarrow and duckdb are optional dependencies, imported only when used.
+
+# Table -> partition column (None: written as a single file)
+EXPORT_TABLES: Dict[str, Optional[str]] = {
+    "games": "season_id",
+    "player_game_stats": "season_id",
+    "players": None,
+    # Timestamped sources for the as-of features in asof_features.py
+    "injury_reports": None,
+    "game_lines": None,
+}
+MANIFEST = "manifest.json"
+
+
+def _require(module: str):
+    try:
+        return __import__(module)
+    except ImportError as e:
+        raise ImportError(f"{module} is required for the Parquet/DuckDB path: pip install {module}") from e
+
+
+def is_duckdb_connection(conn) -> bool:
+    # DuckDBPyConnection lives in duckdb's compiled "_duckdb" module
+    return type(conn).__module__.split(".")[0].lstrip("_") == "duckdb"
+
+
+def read_sql_frame(sql: str, conn) -> pd.DataFrame:
+    """pd.read_sql_query for DB-API connections, DuckDB's native Arrow path otherwise."""
+    if is_duckdb_connection(conn):
+        return conn.execute(sql).df()
+    return pd.read_sql_query(sql, conn)
+
+
+def _write_parquet(frame: pd.DataFrame, directory: str) -> int:
+    """Replace directory with a single Parquet file holding frame."""
+    pa = _require("pyarrow")
+    import pyarrow.parquet as pq
+
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    pq.write_table(table, os.path.join(tmp_dir, "part-0.parquet"), compression="zstd")
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return len(frame)
+
+
+def _table_seasons(conn, table: str) -> List[int]:
+    frame = read_sql_frame(f"SELECT DISTINCT season_id FROM {table} ORDER BY season_id", conn)
+    return [int(value) for value in frame["season_id"]]
+
+
+def export_tables(conn, root: str, tables: Iterable[str] = tuple(EXPORT_TABLES),
+                  seasons: Optional[Sequence[int]] = None) -> Dict[str, Dict[str, int]]:
+    """Mirror tables from conn (Postgres, or the SQLite synthetic league) into root.
+
+    Partitioned tables are exported one season at a time, so each query reads a
+    single Postgres partition; pass seasons (season_ids) to refresh only those.
+    Tables missing from the source database are skipped.
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest_path = os.path.join(root, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    counts: Dict[str, Dict[str, int]] = {}
+    for table in tables:
+        partition_column = EXPORT_TABLES[table]
+        start = time.perf_counter()
+        try:
+            if partition_column is None:
+                frame = read_sql_frame(f"SELECT * FROM {table}", conn)
+                counts[table] = {"all": _write_parquet(frame, os.path.join(root, table))}
+            else:
+                counts[table] = {}
+                for season_id in (seasons or _table_seasons(conn, table)):
+                    frame = read_sql_frame(
+                        f"SELECT * FROM {table} WHERE {partition_column} = {int(season_id)}", conn)
+                    # The value lives in the directory name (hive partitioning)
+                    frame = frame.drop(columns=[partition_column])
+                    directory = os.path.join(root, table, f"{partition_column}={int(season_id)}")
+                    counts[table][str(season_id)] = _write_parquet(frame, directory)
+        except Exception as e:
+            if is_duckdb_connection(conn) or not hasattr(conn, "rollback"):
+                raise
+            print(f"Skipping export of {table} ({e.__class__.__name__}): {str(e).splitlines()[0]}")
+            conn.rollback()
+            continue
+        rows = sum(counts[table].values())
+        print(f"Exported {table}: {rows} rows in {time.perf_counter() - start:.2f}s")
+        entry = manifest.setdefault(table, {"partitions": {}})
+        entry["partitions"].update(counts[table])
+        entry["exported_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return counts
+
+
+def connect_duckdb(root: str, threads: Optional[int] = None):
+    """In-memory DuckDB connection with a view per exported table.
+
+    The views carry the Postgres table names, so create_training_dataframe's SQL
+    runs unchanged; a filter on season_id only opens that season's files.
+    """
+    duckdb = _require("duckdb")
+    conn = duckdb.connect(":memory:")
+    conn.execute("SET TimeZone = 'UTC'")
+    if threads:
+        conn.execute(f"SET threads = {int(threads)}")
+    for table, partition_column in EXPORT_TABLES.items():
+        directory = os.path.join(root, table)
+        if not os.path.isdir(directory):
+            continue
+        pattern = os.path.join(directory, "*", "*.parquet") if partition_column else os.path.join(directory, "*.parquet")
+        conn.execute(
+            f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)")
+    return conn
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export training tables to Parquet for DuckDB.")
+    parser.add_argument("--out", default="data/parquet", help="Output directory")
+    parser.add_argument("--tables", nargs="+", default=list(EXPORT_TABLES), choices=list(EXPORT_TABLES))
+    parser.add_argument("--seasons", nargs="+", type=int, default=None,
+                        help="season_ids to refresh (default: all)")
+    args = parser.parse_args(argv)
+
+    from backend.ml.train_model import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        export_tables(conn, args.out, tables=args.tables, seasons=args.seasons)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,331 @@
+import argparse
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Flat-array export of trained tree ensembles for serving. Every tree's nodes are
+# concatenated into a handful of NumPy arrays and a batch walks all trees at once,
+# one vectorized step per tree level, which skips predict()'s input validation,
+# joblib dispatch and per-tree Python calls.
+#
+# Leaves are marked with feature -1. Cursors that reach one are dropped, so a batch
+# costs the total path length rather than rows x trees x max_depth.
+
+# How a node routes missing values (LightGBM's MissingType; sklearn trees use NAN)
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+# LightGBM treats |x| <= kZeroThreshold as zero
+ZERO_THRESHOLD = 1e-35
+# Rows per evaluation chunk, so the (rows x trees) cursors stay cache-sized
+DEFAULT_CHUNK_ROWS = 1024
+# LightGBM objectives whose raw score is the prediction
+IDENTITY_OBJECTIVES = ("regression", "regression_l1", "huber", "fair", "quantile", "mape")
+
+
+class CompiledEnsemble:
+    """Tree ensemble as flat node arrays; predict() mirrors the source estimator's.
+
+    Trees form groups of contiguous roots, and each group sums its trees' leaf
+    values into value.shape[1] output columns (one group for a forest, one per
+    target for MultiOutputRegressor).
+    """
+
+    __slots__ = ("feature", "threshold", "children", "default_left", "missing_type", "value",
+                 "roots", "groups", "bias", "max_depth", "n_features", "input_dtype", "squeeze")
+
+    def __init__(self, feature, threshold, children, default_left, missing_type, value, roots,
+                 groups: Sequence[Tuple[int, int]], bias, max_depth: int, n_features: int,
+                 input_dtype=np.float32, squeeze: bool = True):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.missing_type = np.ascontiguousarray(missing_type, dtype=np.uint8)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.groups = tuple((int(start), int(end)) for start, end in groups)
+        self.bias = np.ascontiguousarray(bias, dtype=np.float64)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.input_dtype = np.dtype(input_dtype)
+        self.squeeze = bool(squeeze)
+
+    def __repr__(self) -> str:
+        return (f"CompiledEnsemble(trees={len(self.roots)}, nodes={len(self.feature)}, "
+                f"outputs={self.n_outputs}, max_depth={self.max_depth})")
+
+    @property
+    def n_outputs(self) -> int:
+        return len(self.groups) * self.value.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in
+                   ("feature", "threshold", "children", "default_left", "missing_type", "value", "roots"))
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached by each row in each tree, shape (rows, trees)."""
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected a 2-D array with {self.n_features} columns, got shape {X.shape}")
+        has_nan = bool(np.isnan(X).any())
+        check_zero = bool((self.missing_type == MISSING_ZERO).any())
+
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        leaves = np.empty(n_rows * n_trees, dtype=np.intp)
+        # One cursor per (row, tree), row-major; finished cursors drop out each level
+        slot = np.arange(n_rows * n_trees, dtype=np.intp)
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * self.n_features, n_trees)
+        flat_X = X.ravel()
+        while slot.size:
+            feature = self.feature[node]
+            inner = feature >= 0
+            if not inner.all():
+                leaves[slot[~inner]] = node[~inner]
+                slot, node, row_offset, feature = slot[inner], node[inner], row_offset[inner], feature[inner]
+            x = flat_X[row_offset + feature]
+            threshold = self.threshold[node]
+            go_right = ~(x <= threshold)
+            if has_nan or check_zero:
+                missing_type = self.missing_type[node]
+                nan = np.isnan(x)
+                missing = nan & (missing_type == MISSING_NAN)
+                if check_zero:
+                    # Nodes that are not NaN-aware read NaN as 0.0 before the zero test
+                    zero = nan | (np.abs(x) <= ZERO_THRESHOLD)
+                    missing |= zero & (missing_type == MISSING_ZERO)
+                if has_nan:
+                    as_zero = nan & (missing_type == MISSING_NONE)
+                    go_right[as_zero] = ~(0.0 <= threshold[as_zero])
+                go_right = np.where(missing, ~self.default_left[node], go_right)
+            node = self.children[2 * node + go_right]
+        return leaves.reshape(n_rows, n_trees)
+
+    def predict(self, X: np.ndarray, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> np.ndarray:
+        X = np.asarray(X)
+        out = np.empty((X.shape[0], self.n_outputs), dtype=np.float64)
+        width = self.value.shape[1]
+        for start in range(0, X.shape[0], chunk_rows):
+            leaves = self.apply(X[start:start + chunk_rows])
+            for g, (first, last) in enumerate(self.groups):
+                out[start:start + len(leaves), g * width:(g + 1) * width] = (
+                    self.value[leaves[:, first:last]].sum(axis=1))
+        out += self.bias
+        return out[:, 0] if self.squeeze and self.n_outputs == 1 else out
+
+
+def _concat(parts: List[Dict[str, Any]], n_features: int, input_dtype, squeeze: bool) -> CompiledEnsemble:
+    """Join per-tree node arrays into one ensemble, shifting node indices."""
+    offsets = np.cumsum([0] + [len(part["feature"]) for part in parts])
+    return CompiledEnsemble(
+        feature=np.concatenate([part["feature"] for part in parts]),
+        threshold=np.concatenate([part["threshold"] for part in parts]),
+        children=np.concatenate([part["children"] + offset for part, offset in zip(parts, offsets)]),
+        default_left=np.concatenate([part["default_left"] for part in parts]),
+        missing_type=np.concatenate([part["missing_type"] for part in parts]),
+        value=np.concatenate([part["value"] for part in parts]),
+        roots=offsets[:-1],
+        groups=[(0, len(parts))],
+        bias=np.zeros(parts[0]["value"].shape[1]),
+        max_depth=max(part["depth"] for part in parts),
+        n_features=n_features,
+        input_dtype=input_dtype,
+        squeeze=squeeze,
+    )
+
+
+def _sklearn_tree(estimator, scale: float) -> Dict[str, Any]:
+    tree = estimator.tree_
+    n_nodes = tree.node_count
+    leaf = tree.children_left < 0
+    # sklearn < 1.3 has no missing-value support: NaN fails "<=" and goes right
+    missing_go_to_left = getattr(tree, "missing_go_to_left", np.zeros(n_nodes, dtype=np.uint8))
+    return {
+        "feature": np.where(leaf, -1, tree.feature),
+        "threshold": np.where(leaf, 0.0, tree.threshold),
+        "children": np.column_stack([tree.children_left, tree.children_right]).clip(min=0).ravel(),
+        "default_left": np.asarray(missing_go_to_left, dtype=bool),
+        "missing_type": np.full(n_nodes, MISSING_NAN, dtype=np.uint8),
+        "value": tree.value[:, :, 0] * scale,
+        "depth": tree.max_depth,
+    }
+
+
+def _compile_forest(model) -> CompiledEnsemble:
+    trees = model.estimators_
+    scale = 1.0 / len(trees)
+    parts = [_sklearn_tree(tree, scale) for tree in trees]
+    # sklearn evaluates trees on float32 input
+    return _concat(parts, model.n_features_in_, np.float32, squeeze=model.n_outputs_ == 1)
+
+
+def _lightgbm_tree(structure: Dict[str, Any], scale: float) -> Dict[str, Any]:
+    """Flatten one tree from Booster.dump_model(), root first."""
+    feature, threshold, children, default_left, missing_type, value = [], [], [], [], [], []
+    missing_codes = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+
+    def visit(node: Dict[str, Any], depth: int) -> Tuple[int, int]:
+        index = len(feature)
+        feature.append(-1)
+        threshold.append(0.0)
+        children.extend([0, 0])
+        default_left.append(True)
+        missing_type.append(MISSING_NONE)
+        if "leaf_coeff" in node:
+            raise ValueError("Linear trees are not supported")
+        if "leaf_value" in node:
+            value.append(node["leaf_value"] * scale)
+            return index, depth
+        if node.get("decision_type", "<=") != "<=":
+            raise ValueError("Categorical splits are not supported")
+        value.append(0.0)
+        feature[index] = node["split_feature"]
+        threshold[index] = float(node["threshold"])
+        default_left[index] = bool(node["default_left"])
+        missing_type[index] = missing_codes[node["missing_type"]]
+        children[2 * index], left_depth = visit(node["left_child"], depth + 1)
+        children[2 * index + 1], right_depth = visit(node["right_child"], depth + 1)
+        return index, max(left_depth, right_depth)
+
+    _, depth = visit(structure, 0)
+    return {
+        "feature": np.array(feature),
+        "threshold": np.array(threshold),
+        "children": np.array(children),
+        "default_left": np.array(default_left),
+        "missing_type": np.array(missing_type),
+        "value": np.array(value)[:, None],
+        "depth": depth,
+    }
+
+
+def _compile_lightgbm(model) -> CompiledEnsemble:
+    booster = getattr(model, "booster_", model)
+    dump = booster.dump_model()
+    objective = str(dump.get("objective", "regression")).split(" ")[0]
+    if dump.get("num_tree_per_iteration", 1) != 1 or objective not in IDENTITY_OBJECTIVES:
+        raise ValueError(f"LightGBM objective {objective!r} is not supported")
+    trees = dump["tree_info"]
+    # boosting="rf" averages its trees
+    scale = 1.0 / len(trees) if dump.get("average_output") else 1.0
+    parts = [_lightgbm_tree(tree["tree_structure"], scale) for tree in trees]
+    # LightGBM compares in double precision
+    return _concat(parts, dump["max_feature_idx"] + 1, np.float64, squeeze=True)
+
+
+def _stack_outputs(ensembles: Sequence[CompiledEnsemble]) -> CompiledEnsemble:
+    """One group per single-output ensemble, in target order (MultiOutputRegressor)."""
+    if any(ensemble.n_outputs != 1 for ensemble in ensembles):
+        raise ValueError("MultiOutputRegressor members must be single-output")
+    if len({ensemble.input_dtype for ensemble in ensembles}) != 1:
+        raise ValueError("MultiOutputRegressor members must share an input dtype")
+    node_offsets = np.cumsum([0] + [len(ensemble.feature) for ensemble in ensembles])
+    tree_offsets = np.cumsum([0] + [len(ensemble.roots) for ensemble in ensembles])
+    return CompiledEnsemble(
+        feature=np.concatenate([ensemble.feature for ensemble in ensembles]),
+        threshold=np.concatenate([ensemble.threshold for ensemble in ensembles]),
+        children=np.concatenate([ensemble.children + offset for ensemble, offset in zip(ensembles, node_offsets)]),
+        default_left=np.concatenate([ensemble.default_left for ensemble in ensembles]),
+        missing_type=np.concatenate([ensemble.missing_type for ensemble in ensembles]),
+        value=np.concatenate([ensemble.value for ensemble in ensembles]),
+        roots=np.concatenate([ensemble.roots + offset for ensemble, offset in zip(ensembles, node_offsets)]),
+        groups=list(zip(tree_offsets[:-1], tree_offsets[1:])),
+        bias=np.concatenate([ensemble.bias for ensemble in ensembles]),
+        max_depth=max(ensemble.max_depth for ensemble in ensembles),
+        n_features=ensembles[0].n_features,
+        input_dtype=ensembles[0].input_dtype,
+        squeeze=False,
+    )
+
+
+def compile_ensemble(model) -> CompiledEnsemble:
+    """Export a fitted RandomForest/ExtraTrees, LightGBM or MultiOutputRegressor of them.
+
+    Raises ValueError for anything else, so callers can keep using model.predict.
+    """
+    name = type(model).__name__
+    if name == "MultiOutputRegressor":
+        return _stack_outputs([compile_ensemble(estimator) for estimator in model.estimators_])
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        return _compile_forest(model)
+    if name in ("LGBMRegressor", "Booster"):
+        return _compile_lightgbm(model)
+    raise ValueError(f"Cannot compile {name}")
+
+
+def _time_call(call, repeats: int) -> float:
+    call()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        call()
+    return (time.perf_counter() - start) / repeats
+
+
+def benchmark_latency(model, compiled: CompiledEnsemble, X: np.ndarray,
+                      batch_sizes: Sequence[int] = (1, 10_000), repeats: int = 20) -> List[Dict[str, Any]]:
+    """Milliseconds per predict() call for the stock estimator and the compiled one."""
+    results = []
+    for batch_size in batch_sizes:
+        batch = np.ascontiguousarray(np.resize(X, (batch_size, X.shape[1])))
+        # Large batches are slow enough that a few calls give a stable number
+        n = repeats if batch_size <= 100 else max(1, repeats // 10)
+        stock_s = _time_call(lambda: model.predict(batch), n)
+        compiled_s = _time_call(lambda: compiled.predict(batch), n)
+        max_abs_diff = float(np.max(np.abs(np.asarray(model.predict(batch)) - compiled.predict(batch))))
+        results.append({
+            "rows": batch_size,
+            "stock_ms": stock_s * 1e3,
+            "compiled_ms": compiled_s * 1e3,
+            "speedup": stock_s / compiled_s,
+            "max_abs_diff": max_abs_diff,
+        })
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Check and time the compiled tree evaluator.")
+    parser.add_argument("--model", default=None, help="saved model artifact (default: train a RandomForest on generated data)")
+    parser.add_argument("--n-estimators", type=int, default=400)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 10_000])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    from backend.ml.feature_matrix import FeatureMatrix
+    from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+    from backend.ml.train_model import create_training_dataframe, feature_engineering, prepare_training_data
+
+    conn = load_into_sqlite(generate_league_tables(n_seasons=1))
+    df_clean, features = prepare_training_data(feature_engineering(create_training_dataframe(conn)))
+    conn.close()
+
+    if args.model:
+        artifact = joblib.load(args.model)
+        model, features = artifact["model"], list(artifact["features"])
+    else:
+        from sklearn.ensemble import RandomForestRegressor
+        # Same configuration as the RandomForest fallback in train_model
+        model = RandomForestRegressor(n_estimators=args.n_estimators, max_depth=args.max_depth,
+                                      random_state=42, n_jobs=-1)
+        model.fit(FeatureMatrix.from_frame(df_clean, features).values, df_clean["player_points"].to_numpy())
+
+    start = time.perf_counter()
+    compiled = compile_ensemble(model)
+    print(f"Compiled {compiled} ({compiled.nbytes / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+
+    X = FeatureMatrix.from_frame(df_clean, features).values
+    ok = True
+    for row in benchmark_latency(model, compiled, X, args.batch_sizes, args.repeats):
+        ok &= row["max_abs_diff"] <= 1e-6
+        print(f"{row['rows']:>6} rows: stock {row['stock_ms']:8.2f} ms, compiled {row['compiled_ms']:8.2f} ms "
+              f"({row['speedup']:.1f}x), max |diff| = {row['max_abs_diff']:.3g}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+from typing import Optional
+
+import numpy as np
+
+# Predictive distributions around the point model: holdout residuals
+# (actual - predicted) are summarised as quantile curves per cohort of predicted
+# value, since a 30-point scorer's misses are wider than a 6-point scorer's.
+# Probabilities for any number of lines are then one np.interp per cohort.
+
+QUANTILE_LEVELS = np.linspace(0.0, 1.0, 201)
+
+
+class ResidualDistribution:
+    __slots__ = ("edges", "quantiles")
+
+    def __init__(self, edges: np.ndarray, quantiles: np.ndarray):
+        # edges: inner cohort boundaries on the predicted value, shape (n_cohorts - 1,)
+        # quantiles: residual quantiles at QUANTILE_LEVELS, shape (n_cohorts, len(QUANTILE_LEVELS))
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, preds: np.ndarray, actuals: np.ndarray, n_cohorts: int = 5,
+            min_cohort_size: int = 200) -> "ResidualDistribution":
+        preds = np.asarray(preds, dtype=np.float64).ravel()
+        residuals = np.asarray(actuals, dtype=np.float64).ravel() - preds
+        if len(preds) == 0:
+            raise ValueError("Cannot fit a residual distribution without predictions")
+
+        # Equal-count cohorts, fewer when data is thin so each curve stays stable
+        n_cohorts = max(1, min(n_cohorts, len(preds) // max(min_cohort_size, 1)))
+        edges = np.unique(np.quantile(preds, np.linspace(0, 1, n_cohorts + 1)[1:-1]))
+        cohorts = np.searchsorted(edges, preds, side="right")
+        quantiles = np.vstack([
+            np.quantile(residuals[cohorts == c], QUANTILE_LEVELS) if np.any(cohorts == c)
+            else np.quantile(residuals, QUANTILE_LEVELS)
+            for c in range(len(edges) + 1)
+        ])
+        return cls(edges, quantiles)
+
+    def cohorts(self, preds: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.edges, np.asarray(preds, dtype=np.float64), side="right")
+
+    def cdf(self, preds: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """P(actual <= value) for each prediction; values broadcast against preds[:, None]."""
+        preds = np.asarray(preds, dtype=np.float64).reshape(-1)
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64),
+                                 np.broadcast_shapes((len(preds), 1), np.shape(values)))
+        offsets = values - preds[:, None]
+        out = np.empty(offsets.shape, dtype=np.float64)
+        cohorts = self.cohorts(preds)
+        for c in np.unique(cohorts):
+            rows = cohorts == c
+            out[rows] = np.interp(offsets[rows], self.quantiles[c], QUANTILE_LEVELS, left=0.0, right=1.0)
+        return out
+
+    def prob_over(self, preds: np.ndarray, lines: np.ndarray) -> np.ndarray:
+        """P(actual > line), shape (len(preds), n_lines)."""
+        return 1.0 - self.cdf(preds, lines)
+
+    def ppf(self, preds: np.ndarray, levels: np.ndarray, cohorts: Optional[np.ndarray] = None) -> np.ndarray:
+        """Inverse CDF: prediction plus the residual quantile at each level (same shape as levels).
+
+        QUANTILE_LEVELS is an even grid, so each level maps straight to its knot
+        interval without a search; the simulator calls this on millions of draws.
+        """
+        preds = np.asarray(preds, dtype=np.float64)
+        cohorts = self.cohorts(preds) if cohorts is None else np.asarray(cohorts)
+        steps = len(QUANTILE_LEVELS) - 1
+        position = np.clip(np.asarray(levels, dtype=np.float64), 0.0, 1.0) * steps
+        knot = np.minimum(position.astype(np.intp), steps - 1)
+        flat = cohorts * len(QUANTILE_LEVELS) + knot
+        table = self.quantiles.ravel()
+        lower = table[flat]
+        return preds + lower + (position - knot) * (table[flat + 1] - lower)
@@ -0,0 +1,144 @@
+import argparse
+import sys
+import time
+import warnings
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Compact model input shared by training and serving: a C-contiguous float32
+# array whose column order is fixed by the "features" list saved with the model.
+# sklearn's tree ensembles evaluate in float32 and convert anything else on every
+# predict() call, so handing them this layout skips both pandas and that copy.
+
+DTYPE = np.float32
+
+
+class FeatureMatrix:
+    __slots__ = ("columns", "values")
+
+    def __init__(self, columns: Sequence[str], values: np.ndarray):
+        values = np.ascontiguousarray(values, dtype=DTYPE)
+        if values.ndim != 2 or values.shape[1] != len(columns):
+            raise ValueError(f"Expected a 2-D array with {len(columns)} columns, got shape {values.shape}")
+        self.columns = tuple(columns)
+        self.values = values
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __repr__(self) -> str:
+        return f"FeatureMatrix(rows={len(self)}, columns={list(self.columns)})"
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.columns.index(name)]
+
+    @classmethod
+    def from_frame(cls, frame, columns: Sequence[str]) -> "FeatureMatrix":
+        """Select and order columns from a DataFrame (training path)."""
+        return cls(columns, frame[list(columns)].to_numpy(dtype=DTYPE))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]], row_columns: Sequence[str],
+                  columns: Sequence[str]) -> "FeatureMatrix":
+        """Build from DB-API result rows, e.g. cur.fetchall() with names from cur.description.
+
+        Columns are reordered to `columns`; SQL NULLs become NaN.
+        """
+        positions = [list(row_columns).index(name) for name in columns]
+        rows = list(rows)
+        values = np.empty((len(rows), len(columns)), dtype=DTYPE)
+        for i, row in enumerate(rows):
+            for j, pos in enumerate(positions):
+                value = row[pos]
+                values[i, j] = np.nan if value is None else value
+        return cls(columns, values)
+
+    @classmethod
+    def from_mappings(cls, columns: Sequence[str], mappings: Sequence[Mapping[str, Any]],
+                      default: float = np.nan) -> "FeatureMatrix":
+        """One row per mapping of feature name -> value (serving path)."""
+        values = np.empty((len(mappings), len(columns)), dtype=DTYPE)
+        for i, mapping in enumerate(mappings):
+            for j, name in enumerate(columns):
+                value = mapping.get(name)
+                values[i, j] = default if value is None else value
+        return cls(columns, values)
+
+
+def check_prediction_equivalence(model, frame, columns: Sequence[str], atol: float = 1e-6) -> Dict[str, Any]:
+    """Compare predict() on the DataFrame path and on the FeatureMatrix path."""
+    with warnings.catch_warnings():
+        # Models fitted on arrays warn when given named columns; the values are what matter here
+        warnings.simplefilter("ignore", UserWarning)
+        frame_preds = np.asarray(model.predict(frame[list(columns)]), dtype=np.float64)
+    matrix_preds = np.asarray(model.predict(FeatureMatrix.from_frame(frame, columns).values), dtype=np.float64)
+    max_abs_diff = float(np.max(np.abs(frame_preds - matrix_preds))) if len(frame_preds) else 0.0
+    return {
+        "rows": int(len(frame_preds)),
+        "max_abs_diff": max_abs_diff,
+        "equivalent": bool(np.allclose(frame_preds, matrix_preds, rtol=0.0, atol=atol)),
+    }
+
+
+def measure_predict_overhead(model, mapping: Mapping[str, float], columns: Sequence[str],
+                             repeats: int = 200) -> Dict[str, float]:
+    """Microseconds per single-row request: building a DataFrame vs a FeatureMatrix, plus predict()."""
+    import pandas as pd
+
+    def frame_call():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            return model.predict(pd.DataFrame({name: [mapping[name]] for name in columns}))
+
+    def matrix_call():
+        return model.predict(FeatureMatrix.from_mappings(columns, [mapping]).values)
+
+    timings = {}
+    for label, call in (("dataframe_us", frame_call), ("feature_matrix_us", matrix_call)):
+        call()  # warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            call()
+        timings[label] = (time.perf_counter() - start) / repeats * 1e6
+    timings["saved_us"] = timings["dataframe_us"] - timings["feature_matrix_us"]
+    return timings
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Check and time the FeatureMatrix predict path.")
+    parser.add_argument("--model", default=None, help="saved model artifact (default: train a small one on generated data)")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+    from backend.ml.train_model import create_training_dataframe, feature_engineering, prepare_training_data
+
+    conn = load_into_sqlite(generate_league_tables(n_seasons=1))
+    df_clean, features = prepare_training_data(feature_engineering(create_training_dataframe(conn)))
+    conn.close()
+
+    if args.model:
+        artifact = joblib.load(args.model)
+        model, features = artifact["model"], list(artifact["features"])
+    else:
+        from sklearn.ensemble import RandomForestRegressor
+        model = RandomForestRegressor(n_estimators=100, max_depth=12, random_state=42, n_jobs=-1)
+        model.fit(FeatureMatrix.from_frame(df_clean, features).values, df_clean["player_points"].to_numpy())
+
+    sample = df_clean.tail(2000)
+    equivalence = check_prediction_equivalence(model, sample, features)
+    print(f"Equivalence on {equivalence['rows']} rows: max |diff| = {equivalence['max_abs_diff']:.3g} "
+          f"({'ok' if equivalence['equivalent'] else 'MISMATCH'})")
+
+    mapping: Dict[str, float] = {name: float(sample[name].iloc[-1]) for name in features}
+    timings = measure_predict_overhead(model, mapping, features, repeats=args.repeats)
+    print(f"Per-call predict: DataFrame {timings['dataframe_us']:.0f} us, "
+          f"FeatureMatrix {timings['feature_matrix_us']:.0f} us, saved {timings['saved_us']:.0f} us")
+    return 0 if equivalence["equivalent"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
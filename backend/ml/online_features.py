@@ -0,0 +1,130 @@
+from datetime import date
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Serve-time versions of the features built by train_model.feature_engineering.
+# Inputs are the most-recent-first rows returned by the API's SQL queries; outputs
+# are keyed by the training feature names so FeatureMatrix can order them.
+
+# Used when a player or team has no history yet
+DEFAULT_FEATURES: Dict[str, float] = {
+    "days_rest": 7.0,
+    "opponent_avg_points_allowed_last_10": 115.0,
+    "opponent_possessions_last_10": 100.0,
+    "opponent_def_rating_last_10": 115.0,
+    "is_home": 0.0,
+    "player_injury_severity": 0.0,
+    "teammates_out": 0.0,
+    "teammates_out_minutes": 0.0,
+    "team_spread": 0.0,
+    "game_total": 225.0,
+    "has_line": 0.0,
+}
+
+# Severity of a reported injury status, 1.0 meaning certainly out (shared with asof_features.py)
+INJURY_SEVERITY = {
+    "out": 1.0,
+    "doubtful": 0.75,
+    "questionable": 0.5,
+    "probable": 0.25,
+    "day-to-day": 0.25,
+    "available": 0.0,
+    "active": 0.0,
+}
+
+
+def ewm_last(values: np.ndarray, span: int) -> float:
+    """Last value of pandas' ewm(span, adjust=False).mean() over chronological values."""
+    alpha = 2.0 / (span + 1.0)
+    result = float(values[0])
+    for value in values[1:]:
+        result = alpha * float(value) + (1.0 - alpha) * result
+    return result
+
+
+def player_form_features(stat_values: Dict[str, Sequence[float]], minutes: Sequence[float],
+                         game_dates: Sequence[date], as_of: Optional[date] = None) -> Dict[str, float]:
+    """Rolling/EWM form from a player's recent games, newest first.
+
+    stat_values maps training stat columns (e.g. "player_points") to their values.
+    """
+    if not len(minutes):
+        return {}
+    # Chronological order, like the shifted rolling windows in training
+    mins = np.asarray(minutes, dtype=np.float64)[::-1]
+    series = {name: np.asarray(values, dtype=np.float64)[::-1] for name, values in stat_values.items()}
+    if "player_points" in series:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ppm = np.where(mins > 0, series["player_points"] / mins, np.nan)
+        ppm = ppm[~np.isnan(ppm)]
+        if len(ppm):
+            series["ppm"] = ppm
+
+    features: Dict[str, float] = {}
+    for prefix, values in series.items():
+        for w in (5, 10):
+            features[f"{prefix}_last_{w}"] = float(values[-w:].mean())
+        for span in (5, 10):
+            features[f"{prefix}_ewm_span_{span}"] = ewm_last(values, span)
+
+    if as_of is not None and game_dates[0] is not None:
+        features["days_rest"] = float(min(max((as_of - game_dates[0]).days, 0), 10))
+    return features
+
+
+def opponent_features(points_allowed: Sequence[float], fga: Sequence[float], oreb: Sequence[float],
+                      tov: Sequence[float], fta: Sequence[float]) -> Dict[str, float]:
+    """Opponent defence and pace over its last games (newest first, already limited to 10)."""
+    if not len(points_allowed):
+        return {}
+    allowed = np.asarray(points_allowed, dtype=np.float64)
+    possessions = (
+        np.asarray(fga, dtype=np.float64)
+        - np.asarray(oreb, dtype=np.float64)
+        + np.asarray(tov, dtype=np.float64)
+        + 0.44 * np.asarray(fta, dtype=np.float64)
+    )
+    avg_allowed = float(np.nanmean(allowed))
+    avg_possessions = float(np.nanmean(possessions))
+    features = {
+        "opponent_avg_points_allowed_last_10": avg_allowed,
+        "opponent_possessions_last_10": avg_possessions,
+    }
+    if avg_possessions > 0:
+        features["opponent_def_rating_last_10"] = 100.0 * avg_allowed / avg_possessions
+    return features
+
+
+def status_severity(status: Optional[str]) -> float:
+    if not status:
+        return 0.0
+    return INJURY_SEVERITY.get(str(status).strip().lower(), 0.0)
+
+
+def injury_features(player_status: Optional[str],
+                    teammates: Sequence[Tuple[Optional[float], Optional[str]]]) -> Dict[str, float]:
+    """Own status plus teammates' (season-to-date minutes, latest status) as of now."""
+    severities = np.array([status_severity(status) for _, status in teammates], dtype=np.float64)
+    minutes = np.array([m if m is not None else 0.0 for m, _ in teammates], dtype=np.float64)
+    return {
+        "player_injury_severity": status_severity(player_status),
+        "teammates_out": float(np.sum(severities >= INJURY_SEVERITY["doubtful"])),
+        "teammates_out_minutes": float(np.sum(severities * minutes)),
+    }
+
+
+def line_features(home_spread: Optional[float], total: Optional[float], is_home: bool) -> Dict[str, float]:
+    if home_spread is None:
+        return {}
+    features = {"has_line": 1.0, "team_spread": float(home_spread) if is_home else -float(home_spread)}
+    if total is not None:
+        features["game_total"] = float(total)
+    return features
+
+
+def build_feature_mapping(*parts: Dict[str, float]) -> Dict[str, float]:
+    mapping = dict(DEFAULT_FEATURES)
+    for part in parts:
+        mapping.update(part)
+    return mapping
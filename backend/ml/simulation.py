@@ -0,0 +1,314 @@
+import argparse
+import json
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Monte Carlo slate simulator. Each player's stat line is drawn from the model's
+# ResidualDistribution around its point prediction, and the draws are tied
+# together with a Gaussian copula: a correlated standard normal per (player, stat)
+# in a game, pushed through the normal CDF and each marginal's inverse CDF.
+#
+# The copula has three K x K blocks (K = simulated stats), estimated from holdout
+# normal scores at training time:
+#   self      - stats of the same player in the same game (points vs assists)
+#   teammate  - a stat of one player vs a stat of a teammate (shared usage, pace)
+#   opponent  - a stat of one player vs a stat of an opposing player (game script)
+# so one SlateCopula covers every roster; a game's full correlation matrix only
+# depends on how many players each side has.
+
+DEFAULT_SIMS = 10_000
+MAX_SIMS = 50_000
+# PIT values are clipped away from 0/1 before the inverse normal CDF
+PIT_EPSILON = 1e-3
+# Eigenvalue floor when repairing a correlation matrix to be positive definite
+MIN_EIGENVALUE = 1e-6
+SUMMARY_QUANTILES = (0.1, 0.5, 0.9)
+
+
+def normal_scores(distribution, preds: np.ndarray, actuals: np.ndarray) -> np.ndarray:
+    """Standard normal score of each actual under its predictive distribution.
+
+    The residual quantile curves already smear each count over its neighbourhood,
+    so F(actual) is the PIT value without a discreteness correction.
+    """
+    from scipy.special import ndtri
+
+    preds = np.asarray(preds, dtype=np.float64).ravel()
+    actuals = np.asarray(actuals, dtype=np.float64).ravel()
+    levels = distribution.cdf(preds, actuals[:, None])[:, 0]
+    return ndtri(np.clip(levels, PIT_EPSILON, 1.0 - PIT_EPSILON))
+
+
+def nearest_correlation(matrix: np.ndarray) -> np.ndarray:
+    """Clip negative eigenvalues and rescale to a unit diagonal."""
+    matrix = (matrix + matrix.T) / 2.0
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    if eigenvalues.min() < MIN_EIGENVALUE:
+        matrix = (eigenvectors * np.maximum(eigenvalues, MIN_EIGENVALUE)) @ eigenvectors.T
+    scale = np.sqrt(np.diag(matrix))
+    return matrix / np.outer(scale, scale)
+
+
+class SlateCopula:
+    __slots__ = ("stats", "self_corr", "teammate_corr", "opponent_corr", "_cholesky")
+
+    def __init__(self, stats: Sequence[str], self_corr: np.ndarray, teammate_corr: np.ndarray,
+                 opponent_corr: np.ndarray):
+        self.stats = tuple(stats)
+        self.self_corr = np.asarray(self_corr, dtype=np.float64)
+        self.teammate_corr = np.asarray(teammate_corr, dtype=np.float64)
+        self.opponent_corr = np.asarray(opponent_corr, dtype=np.float64)
+        # (n_home, n_away) -> Cholesky factor; the same few roster sizes repeat all night
+        self._cholesky: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def __getstate__(self):
+        return {"stats": self.stats, "self_corr": self.self_corr,
+                "teammate_corr": self.teammate_corr, "opponent_corr": self.opponent_corr}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __repr__(self) -> str:
+        return f"SlateCopula(stats={list(self.stats)})"
+
+    @classmethod
+    def independent(cls, stats: Sequence[str]) -> "SlateCopula":
+        k = len(stats)
+        return cls(stats, np.eye(k), np.zeros((k, k)), np.zeros((k, k)))
+
+    @classmethod
+    def fit(cls, frame: "pd.DataFrame", stats: Sequence[str]) -> "SlateCopula":
+        """Estimate the blocks from normal scores, one row per player-game.
+
+        frame needs game_id, team_id and one normal-score column per stat. Pair
+        moments come from per-team sums: sum_{i != j} z_i z_j' = s s' - sum_i z_i z_i'.
+        """
+        import pandas as pd
+
+        stats = list(stats)
+        z = frame[stats].to_numpy(dtype=np.float64)
+        keep = np.isfinite(z).all(axis=1)
+        frame, z = frame.loc[keep], z[keep]
+        if len(z) < 2:
+            raise ValueError("Need at least two player-games to fit a copula")
+
+        # Centre first: a shared bias in the scores would otherwise show up as
+        # positive correlation between every pair of players
+        z = z - z.mean(axis=0)
+        covariance = z.T @ z / len(z)
+        scale = np.sqrt(np.diag(covariance))
+        norm = np.outer(scale, scale)
+
+        groups = pd.DataFrame(z, columns=stats).groupby(
+            [frame["game_id"].to_numpy(), frame["team_id"].to_numpy()], sort=True)
+        sums = groups.sum()
+        counts = groups.size().to_numpy(dtype=np.float64)
+        team_sums = sums.to_numpy()
+
+        teammate_pairs = float(np.sum(counts * (counts - 1)))
+        teammate = (team_sums.T @ team_sums - z.T @ z) / teammate_pairs if teammate_pairs else 0.0
+
+        # Pair each team with the other team of the same game
+        game_ids = sums.index.get_level_values(0)
+        opponent = np.zeros((len(stats), len(stats)))
+        opponent_pairs = 0.0
+        for positions in pd.Series(np.arange(len(sums))).groupby(np.asarray(game_ids)).indices.values():
+            if len(positions) != 2:
+                continue
+            a, b = positions
+            opponent += np.outer(team_sums[a], team_sums[b]) + np.outer(team_sums[b], team_sums[a])
+            opponent_pairs += 2.0 * counts[a] * counts[b]
+        if opponent_pairs:
+            opponent /= opponent_pairs
+
+        return cls(stats, covariance / norm, teammate / norm, opponent / norm)
+
+    def correlation(self, n_home: int, n_away: int) -> np.ndarray:
+        """Correlation of a game's normals, ordered player-major (home players first)."""
+        n = n_home + n_away
+        side = np.r_[np.zeros(n_home, dtype=int), np.ones(n_away, dtype=int)]
+        same_side = side[:, None] == side[None, :]
+        relation = np.where(np.eye(n, dtype=bool), 0, np.where(same_side, 1, 2))
+        blocks = np.stack([self.self_corr, self.teammate_corr, self.opponent_corr])
+        matrix = blocks[relation].transpose(0, 2, 1, 3).reshape(n * len(self.stats), n * len(self.stats))
+        return nearest_correlation(matrix)
+
+    def cholesky(self, n_home: int, n_away: int) -> np.ndarray:
+        key = (n_home, n_away)
+        factor = self._cholesky.get(key)
+        if factor is None:
+            factor = np.linalg.cholesky(self.correlation(n_home, n_away))
+            self._cholesky[key] = factor
+        return factor
+
+
+class SlateSimulation:
+    """Simulated stat lines: samples[stat] has shape (n_sims, n_players)."""
+
+    __slots__ = ("player_ids", "samples")
+
+    def __init__(self, player_ids: Sequence[int], samples: Dict[str, np.ndarray]):
+        self.player_ids = list(player_ids)
+        self.samples = samples
+
+    @property
+    def n_sims(self) -> int:
+        return next(iter(self.samples.values())).shape[0]
+
+    def column(self, player_id: int) -> int:
+        return self.player_ids.index(player_id)
+
+    def summarize(self) -> List[Dict[str, Any]]:
+        summaries = [{"player_id": player_id, "stats": {}} for player_id in self.player_ids]
+        for stat, draws in self.samples.items():
+            means = draws.mean(axis=0)
+            quantiles = np.quantile(draws, SUMMARY_QUANTILES, axis=0)
+            for j, summary in enumerate(summaries):
+                summary["stats"][stat] = {"mean": round(float(means[j]), 2)}
+                summary["stats"][stat].update({
+                    f"p{int(level * 100)}": round(float(value), 2)
+                    for level, value in zip(SUMMARY_QUANTILES, quantiles[:, j])
+                })
+        return summaries
+
+    def leg_hits(self, player_id: int, stat: str, line: float, side: str = "over") -> np.ndarray:
+        draws = self.samples[stat][:, self.column(player_id)]
+        if side == "over":
+            return draws > line
+        if side == "under":
+            return draws < line
+        raise ValueError(f"side must be 'over' or 'under', got {side!r}")
+
+    def price_parlay(self, legs: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+        """Joint hit rate of all legs, next to the product of their marginal hit rates."""
+        hits = [self.leg_hits(int(leg["player_id"]), leg["stat"], float(leg["line"]), leg.get("side", "over"))
+                for leg in legs]
+        marginals = [float(hit.mean()) for hit in hits]
+        return {
+            "legs": [dict(leg, prob=round(p, 4)) for leg, p in zip(legs, marginals)],
+            "prob": round(float(np.logical_and.reduce(hits).mean()), 4),
+            "independent_prob": round(float(np.prod(marginals)), 4),
+        }
+
+
+def simulate_slate(games: Sequence[Tuple[Sequence[int], Sequence[int]]], preds: Mapping[str, np.ndarray],
+                   distributions: Mapping[str, Any], copula: SlateCopula,
+                   derived: Optional[Mapping[str, Sequence[str]]] = None,
+                   n_sims: int = DEFAULT_SIMS, seed: int = 0) -> SlateSimulation:
+    """Draw n_sims joint outcomes for every player on the slate.
+
+    games: (home player ids, away player ids) per game. preds: stat -> predictions
+    aligned with the players in game order (home then away). Stats in the copula
+    are simulated; derived stats are sums of simulated ones, so they inherit the
+    correlation between their parts.
+    """
+    from scipy.special import ndtr
+
+    player_ids = [player_id for home, away in games for player_id in (*home, *away)]
+    stats = copula.stats
+    k = len(stats)
+    rng = np.random.default_rng(seed)
+
+    # Correlated normals, player-major within each game, one game block at a time.
+    # float32 halves the cost of the draws and the CDF; it is ample for hit rates.
+    normals = np.empty((n_sims, len(player_ids) * k), dtype=np.float32)
+    start = 0
+    for home, away in games:
+        width = (len(home) + len(away)) * k
+        if width:
+            factor = copula.cholesky(len(home), len(away)).astype(np.float32)
+            normals[:, start:start + width] = rng.standard_normal((n_sims, width), dtype=np.float32) @ factor.T
+        start += width
+    uniforms = ndtr(normals).reshape(n_sims, len(player_ids), k)
+
+    samples: Dict[str, np.ndarray] = {}
+    for s, stat in enumerate(stats):
+        stat_preds = np.asarray(preds[stat], dtype=np.float64)
+        distribution = distributions[stat]
+        draws = distribution.ppf(stat_preds[None, :], uniforms[:, :, s],
+                                 cohorts=distribution.cohorts(stat_preds)[None, :])
+        # Counting stats cannot go negative
+        samples[stat] = np.maximum(draws, 0.0).astype(np.float32)
+    for name, parts in (derived or {}).items():
+        if set(parts) <= set(samples):
+            samples[name] = sum(samples[part] for part in parts)
+    return SlateSimulation(player_ids, samples)
+
+
+def synthetic_slate(n_games: int, players_per_team: int, stats: Sequence[str],
+                    seed: int = 0) -> Tuple[List[Tuple[List[int], List[int]]], Dict[str, np.ndarray]]:
+    """A made-up slate with plausible predictions, for timing runs."""
+    rng = np.random.default_rng(seed)
+    typical = {"pts": 14.0, "reb": 5.5, "ast": 3.5, "fg3m": 1.5, "stl": 0.9, "blk": 0.6}
+    games, next_id = [], 1
+    for _ in range(n_games):
+        home = list(range(next_id, next_id + players_per_team))
+        away = list(range(next_id + players_per_team, next_id + 2 * players_per_team))
+        games.append((home, away))
+        next_id += 2 * players_per_team
+    n_players = next_id - 1
+    preds = {stat: typical.get(stat, 5.0) * rng.gamma(4.0, 0.25, n_players) for stat in stats}
+    return games, preds
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Simulate a slate of games and price parlays.")
+    parser.add_argument("--model", default="player_stats_predictor.pkl",
+                        help="model artifact with distributions and copula")
+    parser.add_argument("--slate", default=None,
+                        help="JSON: {\"games\": [{\"home\": [{\"player_id\", \"predictions\": {stat: value}}], "
+                             "\"away\": [...]}], \"parlays\": [[{\"player_id\", \"stat\", \"line\", \"side\"}]]}; "
+                             "default: a synthetic slate")
+    parser.add_argument("--games", type=int, default=15, help="synthetic slate size")
+    parser.add_argument("--players-per-team", type=int, default=10)
+    parser.add_argument("--sims", type=int, default=DEFAULT_SIMS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write player summaries and parlay prices as JSON")
+    args = parser.parse_args(argv)
+
+    artifact = joblib.load(args.model)
+    distributions = artifact["distributions"]
+    copula = artifact.get("copula") or SlateCopula.independent(artifact["stats"])
+
+    parlays: List[List[Dict[str, Any]]] = []
+    if args.slate:
+        with open(args.slate) as f:
+            slate = json.load(f)
+        games = [([p["player_id"] for p in game["home"]], [p["player_id"] for p in game["away"]])
+                 for game in slate["games"]]
+        players = [p for game in slate["games"] for p in (*game["home"], *game["away"])]
+        preds = {stat: np.array([p["predictions"][stat] for p in players], dtype=np.float64)
+                 for stat in copula.stats}
+        parlays = slate.get("parlays", [])
+    else:
+        games, preds = synthetic_slate(args.games, args.players_per_team, copula.stats, args.seed)
+
+    from backend.ml.train_model import DERIVED_STATS
+
+    start = time.perf_counter()
+    simulation = simulate_slate(games, preds, distributions, copula, derived=DERIVED_STATS,
+                                n_sims=args.sims, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {len(games)} games, {len(simulation.player_ids)} players, "
+          f"{len(simulation.samples)} stats x {args.sims} draws in {elapsed:.2f}s")
+
+    priced = [simulation.price_parlay(legs) for legs in parlays]
+    for parlay in priced:
+        print(f"Parlay of {len(parlay['legs'])}: joint {parlay['prob']:.4f} "
+              f"vs independent {parlay['independent_prob']:.4f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"players": simulation.summarize(), "parlays": priced}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
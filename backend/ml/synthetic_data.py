@@ -0,0 +1,262 @@
+import io
+import sqlite3
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Synthetic league used for benchmarks and tests. Shapes and column names mirror
+# the tables in backend/schema.sql so the production SQL runs unchanged on it.
+
+N_TEAMS = 30
+PLAYERS_PER_TEAM = 15
+PLAYERS_PER_GAME = 12
+DAYS_PER_SEASON = 165
+GAMES_PER_DAY = 8
+FIRST_TEAM_ID = 1610612737
+FIRST_PLAYER_ID = 1_000_000
+FIRST_SEASON = 2023
+
+
+def generate_league_tables(n_seasons: int = 1, seed: int = 42,
+                           first_season: int = FIRST_SEASON) -> Dict[str, pd.DataFrame]:
+    """Generate teams, players, games, player_game_stats, game_lines and injury_reports."""
+    rng = np.random.default_rng(seed)
+
+    team_ids = FIRST_TEAM_ID + np.arange(N_TEAMS)
+    abbrs = [f"T{i:02d}" for i in range(N_TEAMS)]
+    teams_df = pd.DataFrame({
+        "id": team_ids,
+        "full_name": [f"Synthetic Team {i:02d}" for i in range(N_TEAMS)],
+        "abbreviation": abbrs,
+        "nickname": [f"Team {i:02d}" for i in range(N_TEAMS)],
+        "city": [f"City {i:02d}" for i in range(N_TEAMS)],
+        "state": None,
+        "year_founded": 1970,
+    })
+
+    n_players = N_TEAMS * PLAYERS_PER_TEAM
+    player_ids = FIRST_PLAYER_ID + np.arange(n_players)
+    players_df = pd.DataFrame({
+        "id": player_ids,
+        "full_name": [f"Player {i:04d}" for i in range(n_players)],
+        "first_name": "Player",
+        "last_name": [f"{i:04d}" for i in range(n_players)],
+        "is_active": True,
+        "position": rng.choice(["G", "F", "C"], size=n_players),
+        "height_inches": rng.integers(72, 86, size=n_players),
+        "weight_lbs": rng.integers(180, 270, size=n_players),
+        "age": rng.integers(19, 38, size=n_players),
+    })
+    # Latent per-player scoring rate (points per minute) and minutes share
+    player_ppm = rng.gamma(shape=4.0, scale=0.12, size=n_players)
+    player_minutes = np.clip(rng.normal(24, 8, size=n_players), 6, 40)
+    team_defense = rng.normal(1.0, 0.05, size=N_TEAMS)
+
+    games_frames = []
+    pgs_frames = []
+    lines_frames = []
+    injury_frames = []
+    for season_offset in range(n_seasons):
+        start_year = first_season - n_seasons + 1 + season_offset
+        season_id = 22000 + start_year - 2000
+        start_date = np.datetime64(f"{start_year}-10-20")
+
+        # Each day a random subset of teams is paired into games
+        n_games = DAYS_PER_SEASON * GAMES_PER_DAY
+        order = np.argsort(rng.random((DAYS_PER_SEASON, N_TEAMS)), axis=1)[:, :2 * GAMES_PER_DAY]
+        home_idx = order[:, 0::2].ravel()
+        away_idx = order[:, 1::2].ravel()
+        day = np.repeat(np.arange(DAYS_PER_SEASON), GAMES_PER_DAY)
+        game_dates = start_date + day.astype("timedelta64[D]")
+        game_ids = np.array([f"002{start_year % 100:02d}{k:05d}" for k in range(n_games)])
+
+        # Team-game rows: home rows first, then away rows
+        team_idx = np.concatenate([home_idx, away_idx])
+        opp_idx = np.concatenate([away_idx, home_idx])
+        is_home = np.concatenate([np.ones(n_games, bool), np.zeros(n_games, bool)])
+        tg_game_ids = np.concatenate([game_ids, game_ids])
+        tg_dates = np.concatenate([game_dates, game_dates])
+        n_tg = 2 * n_games
+
+        fga = rng.integers(78, 98, size=n_tg)
+        fgm = rng.binomial(fga, 0.47)
+        fg3a = rng.integers(25, 45, size=n_tg)
+        fg3m = np.minimum(rng.binomial(fg3a, 0.36), fgm)
+        fta = rng.integers(12, 30, size=n_tg)
+        ftm = rng.binomial(fta, 0.78)
+        oreb = rng.integers(6, 15, size=n_tg)
+        dreb = rng.integers(28, 40, size=n_tg)
+        tov = rng.integers(8, 18, size=n_tg)
+        points = 2 * fgm + fg3m + ftm
+        opp_points = np.concatenate([points[n_games:], points[:n_games]])
+
+        games_frames.append(pd.DataFrame({
+            "season_id": season_id,
+            "team_id": team_ids[team_idx],
+            "team_abbreviation": np.array(abbrs)[team_idx],
+            "game_id": tg_game_ids,
+            "game_date": pd.to_datetime(tg_dates).date,
+            "matchup": [
+                f"{abbrs[t]} vs. {abbrs[o]}" if h else f"{abbrs[t]} @ {abbrs[o]}"
+                for t, o, h in zip(team_idx, opp_idx, is_home)
+            ],
+            "opponent_team_id": team_ids[opp_idx],
+            "opponent_points": opp_points,
+            "is_home": is_home,
+            "season_type": "Regular",
+            "tipoff_datetime": pd.to_datetime(tg_dates).tz_localize("UTC") + pd.Timedelta(hours=23, minutes=30),
+            "win_loss": np.where(points > opp_points, "W", "L"),
+            "minutes": 240,
+            "points": points,
+            "fgm": fgm,
+            "fga": fga,
+            "fg_pct": fgm / fga,
+            "fg3m": fg3m,
+            "fg3a": fg3a,
+            "fg3_pct": fg3m / fg3a,
+            "ftm": ftm,
+            "fta": fta,
+            "ft_pct": ftm / fta,
+            "oreb": oreb,
+            "dreb": dreb,
+            "reb": oreb + dreb,
+            "ast": rng.integers(18, 32, size=n_tg),
+            "stl": rng.integers(4, 12, size=n_tg),
+            "blk": rng.integers(2, 9, size=n_tg),
+            "tov": tov,
+            "pf": rng.integers(14, 26, size=n_tg),
+            "plus_minus": points - opp_points,
+        }))
+
+        # Player rows: the first PLAYERS_PER_GAME rostered players of each team-game
+        slot = np.tile(np.arange(PLAYERS_PER_GAME), n_tg)
+        row_tg = np.repeat(np.arange(n_tg), PLAYERS_PER_GAME)
+        p_idx = team_idx[row_tg] * PLAYERS_PER_TEAM + slot
+        minutes = np.clip(player_minutes[p_idx] + rng.normal(0, 4, size=p_idx.size), 0, 48).round(1)
+        lam = player_ppm[p_idx] * minutes * team_defense[opp_idx[row_tg]]
+        p_points = rng.poisson(lam)
+        p_fga = rng.poisson(lam / 1.1 + 0.5)
+        p_fgm = np.minimum(rng.binomial(p_fga, 0.46), p_points // 2)
+        p_fg3a = rng.poisson(p_fga * 0.35)
+        p_fg3m = np.minimum(rng.binomial(p_fg3a, 0.36), p_fgm)
+        p_fta = rng.poisson(lam * 0.2)
+        p_ftm = rng.binomial(p_fta, 0.78)
+        p_oreb = rng.poisson(minutes * 0.03)
+        p_dreb = rng.poisson(minutes * 0.12)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pgs_frames.append(pd.DataFrame({
+                "season_id": season_id,
+                "game_date": pd.to_datetime(tg_dates[row_tg]).date,
+                "player_id": player_ids[p_idx],
+                "game_id": tg_game_ids[row_tg],
+                "team_id": team_ids[team_idx[row_tg]],
+                "minutes": minutes,
+                "points": p_points,
+                "rebounds": p_oreb + p_dreb,
+                "oreb": p_oreb,
+                "dreb": p_dreb,
+                "assists": rng.poisson(minutes * 0.08),
+                "steals": rng.poisson(minutes * 0.025),
+                "blocks": rng.poisson(minutes * 0.015),
+                "turnovers": rng.poisson(minutes * 0.04),
+                "fgm": p_fgm,
+                "fga": p_fga,
+                "fg_pct": np.where(p_fga > 0, p_fgm / p_fga, 0.0),
+                "fg3m": p_fg3m,
+                "fg3a": p_fg3a,
+                "fg3_pct": np.where(p_fg3a > 0, p_fg3m / p_fg3a, 0.0),
+                "ftm": p_ftm,
+                "fta": p_fta,
+                "ft_pct": np.where(p_fta > 0, p_ftm / p_fta, 0.0),
+                "starter": slot < 5,
+            }))
+
+        # Pregame lines: an opening line the day before and a closing line before tipoff
+        margin = points[:n_games] - points[n_games:]
+        opening = np.round(-(margin * 0.4 + rng.normal(0, 6, size=n_games)) * 2) / 2
+        lines_frames.append(pd.DataFrame({
+            "game_id": np.concatenate([game_ids, game_ids]),
+            "retrieved_at": np.concatenate([
+                pd.to_datetime(game_dates).tz_localize("UTC") - pd.Timedelta(hours=8),
+                pd.to_datetime(game_dates).tz_localize("UTC") + pd.Timedelta(hours=21),
+            ]),
+            "source": "synthetic",
+            "home_spread": np.concatenate([opening, opening + rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0], size=n_games)]),
+            "total": np.concatenate([np.full(n_games, 224.5), 224.5 + rng.normal(0, 4, size=n_games).round()]),
+            "home_ml": None,
+            "away_ml": None,
+        }))
+
+        # Injury reports on game days: bench players (who never play here) listed
+        # out, plus a few rotation players listed doubtful, questionable or probable
+        flagged = rng.random(p_idx.size) < 0.02
+        bench = rng.integers(PLAYERS_PER_GAME, PLAYERS_PER_TEAM, size=n_tg)
+        report_time = pd.to_datetime(tg_dates).tz_localize("UTC") + pd.Timedelta(hours=17)
+        injury_frames.append(pd.DataFrame({
+            "player_id": np.concatenate([player_ids[team_idx * PLAYERS_PER_TEAM + bench], player_ids[p_idx[flagged]]]),
+            "report_time": np.concatenate([report_time, report_time[row_tg[flagged]]]),
+            "status": np.concatenate([
+                np.full(n_tg, "Out", dtype=object),
+                rng.choice(["Questionable", "Probable", "Doubtful"], size=int(flagged.sum())).astype(object),
+            ]),
+            "detail": None,
+            "source": "synthetic",
+        }))
+
+    player_game_stats_df = pd.concat(pgs_frames, ignore_index=True)
+    player_game_stats_df.insert(0, "id", np.arange(1, len(player_game_stats_df) + 1))
+    return {
+        "teams": teams_df,
+        "players": players_df,
+        "games": pd.concat(games_frames, ignore_index=True),
+        "player_game_stats": player_game_stats_df,
+        "game_lines": pd.concat(lines_frames, ignore_index=True),
+        "injury_reports": pd.concat(injury_frames, ignore_index=True).drop_duplicates(
+            ["player_id", "report_time", "source"]),
+    }
+
+
+def load_into_sqlite(tables: Dict[str, pd.DataFrame],
+                     conn: Optional[sqlite3.Connection] = None) -> sqlite3.Connection:
+    """Load generated tables into an (in-memory by default) SQLite database."""
+    if conn is None:
+        conn = sqlite3.connect(":memory:")
+    for name, frame in tables.items():
+        frame.to_sql(name, conn, index=False, if_exists="replace")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_games_pk ON games(season_id, game_id, team_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pgs_player_date ON player_game_stats(player_id, game_date)")
+    conn.commit()
+    return conn
+
+
+def load_into_postgres(tables: Dict[str, pd.DataFrame], conn) -> None:
+    """COPY generated tables into a PostgreSQL database that already has backend/schema.sql.
+
+    Only columns present in the target table are copied; the caller commits.
+    """
+    cur = conn.cursor()
+    years = pd.unique(tables["games"]["season_id"] % 10000)
+    for year in years:
+        cur.execute("SELECT ensure_season_partitions(%s)", (int(year),))
+    for name in ("teams", "players", "games", "player_game_stats", "game_lines", "injury_reports"):
+        if name not in tables:
+            continue
+        cur.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = %s AND table_schema = current_schema()",
+            (name,),
+        )
+        known = {row[0] for row in cur.fetchall()}
+        frame = tables[name]
+        columns = [col for col in frame.columns if col in known]
+        buffer = io.StringIO()
+        frame[columns].to_csv(buffer, index=False, header=False, na_rep="\\N")
+        buffer.seek(0)
+        cur.copy_expert(
+            f"COPY {name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    if "player_game_stats" in tables:
+        cur.execute(
+            "SELECT setval(pg_get_serial_sequence('player_game_stats', 'id'), "
+            "(SELECT MAX(id) FROM player_game_stats))")
+    cur.close()
@@ -1,18 +1,20 @@
 import os
-from typing import Tuple, List
+from typing import Dict, List, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-import psycopg2
-from dotenv import load_dotenv
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error
-from sklearn.model_selection import TimeSeriesSplit
-import joblib
 
-load_dotenv()
+from backend.ml.asof_features import add_asof_features, load_game_lines, load_injury_reports
+from backend.ml.columnar import connect_duckdb, read_sql_frame
+from backend.ml.distributions import ResidualDistribution
+from backend.ml.feature_matrix import FeatureMatrix
+from backend.ml.simulation import SlateCopula, normal_scores
 
 def get_db_connection():
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
     conn = psycopg2.connect(
         dbname=os.getenv("DB_NAME"),
         user=os.getenv("DB_USER"),
@@ -22,59 +24,77 @@ def get_db_connection():
     )
     return conn
 
-def create_training_dataframe() -> pd.DataFrame:
-
-    print("Connecting to the database...")
-    conn = get_db_connection()
+# Stat key (as used by the API) -> training column
+STAT_TARGETS: Dict[str, str] = {
+    "pts": "player_points",
+    "reb": "player_rebounds",
+    "ast": "player_assists",
+    "fg3m": "player_fg3m",
+    "stl": "player_steals",
+    "blk": "player_blocks",
+}
+# Combined props served as sums of predicted stats
+DERIVED_STATS: Dict[str, Tuple[str, ...]] = {
+    "pra": ("pts", "reb", "ast"),
+}
+
+
+def create_training_dataframe(conn=None) -> pd.DataFrame:
+
+    # Callers may pass their own connection: the benchmark's SQLite copy, or DuckDB over
+    # the Parquet export (columnar.connect_duckdb) to keep training off Postgres
+    owns_connection = conn is None
+    if owns_connection:
+        print("Connecting to the database...")
+        conn = get_db_connection()
 
     sql_query = """
-        WITH game_opponents AS (
-            SELECT
-                g1.game_id,
-                g1.team_id,
-                g2.team_id AS opponent_team_id,
-                g2.points AS opponent_points,
-                -- Opponent box score for pace estimation
-                g2.fga  AS opponent_fga,
-                g2.oreb AS opponent_oreb,
-                g2.tov  AS opponent_tov,
-                g2.fta  AS opponent_fta
-            FROM games g1
-            JOIN games g2 ON g1.game_id = g2.game_id AND g1.team_id != g2.team_id
-        )
         SELECT 
             pgs.player_id,
             pgs.game_id,
             pgs.team_id,
             pgs.minutes,
             pgs.points AS player_points,
+            pgs.rebounds AS player_rebounds,
+            pgs.assists AS player_assists,
+            pgs.fg3m AS player_fg3m,
+            pgs.steals AS player_steals,
+            pgs.blocks AS player_blocks,
+            g.season_id,
             g.game_date,
+            g.tipoff_datetime,
             g.is_home,
             -- Player team box score for pace estimation
             g.fga  AS team_fga,
             g.oreb AS team_oreb,
             g.tov  AS team_tov,
             g.fta  AS team_fta,
-            go.opponent_team_id,
-            go.opponent_points AS points_allowed,
-            go.opponent_fga,
-            go.opponent_oreb,
-            go.opponent_tov,
-            go.opponent_fta
+            g.opponent_team_id,
+            o.points AS points_allowed,
+            -- Opponent box score for pace estimation
+            o.fga  AS opponent_fga,
+            o.oreb AS opponent_oreb,
+            o.tov  AS opponent_tov,
+            o.fta  AS opponent_fta
         FROM player_game_stats pgs
-        JOIN games g ON pgs.game_id = g.game_id AND pgs.team_id = g.team_id
-        JOIN game_opponents go ON pgs.game_id = go.game_id AND pgs.team_id = go.team_id
+        -- Both joins are primary-key lookups within the same season partition
+        JOIN games g ON pgs.season_id = g.season_id AND pgs.game_id = g.game_id AND pgs.team_id = g.team_id
+        JOIN games o ON g.season_id = o.season_id AND g.game_id = o.game_id AND g.opponent_team_id = o.team_id
         WHERE pgs.minutes > 0
-        ORDER BY pgs.player_id, g.game_date
+        ORDER BY pgs.player_id, pgs.game_date
     """
 
-    training_df = pd.read_sql_query(sql_query, conn)
+    training_df = read_sql_frame(sql_query, conn)
+    # Timestamped sources for the as-of injury/line features
+    injuries = load_injury_reports(conn)
+    lines = load_game_lines(conn)
 
     print(f"Successfully created DataFrame with {len(training_df)} rows.")
     print("Here are the first 5 rows:")
     print(training_df.head())
 
-    conn.close()
+    if owns_connection:
+        conn.close()
 
     # Ensure types
     training_df["game_date"] = pd.to_datetime(training_df["game_date"])  # safe if already datetime
@@ -82,31 +102,52 @@ def create_training_dataframe() -> pd.DataFrame:
     if "minutes" not in training_df.columns:
         training_df["minutes"] = np.nan
 
+    training_df = add_asof_features(training_df, injuries, lines)
     return training_df
 
-def feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.sort_values(by=["player_id", "game_date"]).copy()
-
-    # Rolling windows and exponentially weighted means
-    def rolling_mean(group: pd.Series, window: int) -> pd.Series:
-        return group.rolling(window=window, min_periods=1).mean().shift(1)
+def add_player_form_features(df: pd.DataFrame, columns: Dict[str, str]) -> pd.DataFrame:
+    """Per-player rolling (5, 10) and EWM (span 5, 10) means of prior games.
 
-    def ewm_mean(group: pd.Series, span: int) -> pd.Series:
-        return group.ewm(span=span, adjust=False).mean().shift(1)
-
-    # Player form features
+    columns maps source column -> feature prefix, e.g. "points_per_minute" -> "ppm".
+    Shifting before the grouped window keeps each row's features to earlier games
+    and lets every stat share one cythonized groupby pass instead of a lambda per stat.
+    """
+    source = list(columns)
+    shifted = df.groupby("player_id", sort=False)[source].shift(1)
+    grouped = shifted.groupby(df["player_id"], sort=False)
     for w in (5, 10):
-        df[f"player_points_last_{w}"] = df.groupby("player_id")["player_points"].transform(lambda s: rolling_mean(s, w))
+        rolled = grouped.rolling(window=w, min_periods=1).mean().droplevel(0)
+        for col, prefix in columns.items():
+            df[f"{prefix}_last_{w}"] = rolled[col]
     for span in (5, 10):
-        df[f"player_points_ewm_span_{span}"] = df.groupby("player_id")["player_points"].transform(lambda s: ewm_mean(s, span))
+        smoothed = grouped.ewm(span=span, adjust=False).mean().droplevel(0)
+        for col, prefix in columns.items():
+            df[f"{prefix}_ewm_span_{span}"] = smoothed[col]
+    return df
+
 
-    # Minutes and efficiency
+def _mean_before_date(dates: pd.Series, values: pd.Series) -> pd.Series:
+    """Per row, the mean of values over rows from strictly earlier dates (NaN on the first date)."""
+    daily = values.astype(float).groupby(dates).agg(["sum", "count"]).sort_index()
+    prior = daily.cumsum().shift(1)
+    return dates.map(prior["sum"] / prior["count"])
+
+
+def feature_engineering(df: pd.DataFrame, point_in_time: bool = False) -> pd.DataFrame:
+    """Model features for every player-game, computed from earlier games only.
+
+    The one exception is the fallback for opponents without history, which uses
+    whole-sample means; point_in_time=True (backtests) fills those gaps from
+    games on earlier dates instead.
+    """
+    df = df.sort_values(by=["player_id", "game_date"]).copy()
+
+    # Player form features for every stat target present, plus scoring efficiency
+    form_columns = {col: col for col in STAT_TARGETS.values() if col in df.columns}
     if "minutes" in df.columns:
         df["points_per_minute"] = df["player_points"] / df["minutes"].replace({0: np.nan})
-        for w in (5, 10):
-            df[f"ppm_last_{w}"] = df.groupby("player_id")["points_per_minute"].transform(lambda s: rolling_mean(s, w))
-        for span in (5, 10):
-            df[f"ppm_ewm_span_{span}"] = df.groupby("player_id")["points_per_minute"].transform(lambda s: ewm_mean(s, span))
+        form_columns["points_per_minute"] = "ppm"
+    df = add_player_form_features(df, form_columns)
 
     # Days rest
     df["prev_game_date"] = df.groupby("player_id")["game_date"].shift(1)
@@ -156,30 +197,40 @@ def feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
 
     # Fallbacks for missing opponent features
     # Per-opponent historical means, then global means
-    per_opp_def_mean = df.groupby("opponent_team_id")["points_allowed"].transform("mean")
-    global_def_mean = df["points_allowed"].mean()
-    df["opponent_avg_points_allowed_last_10"].fillna(per_opp_def_mean, inplace=True)
-    df["opponent_avg_points_allowed_last_10"].fillna(global_def_mean, inplace=True)
+    if point_in_time:
+        def_fallback = _mean_before_date(df["game_date"], df["points_allowed"])
+    else:
+        per_opp_def_mean = df.groupby("opponent_team_id")["points_allowed"].transform("mean")
+        def_fallback = per_opp_def_mean.fillna(df["points_allowed"].mean())
+    df["opponent_avg_points_allowed_last_10"] = df["opponent_avg_points_allowed_last_10"].fillna(def_fallback)
 
     # For pace, use opponent's average possessions if available; else fallback to overall mean
     # Compute opponent possessions at the game level from opponent box scores if missing
     if "opponent_possessions_last_10" not in df.columns:
         df["opponent_possessions_last_10"] = np.nan
-    global_poss_mean = (
-        (df["opponent_fga"].astype(float) - df["opponent_oreb"].astype(float) + df["opponent_tov"].astype(float) + 0.44 * df["opponent_fta"].astype(float))
-        .mean()
-    ) if {"opponent_fga", "opponent_oreb", "opponent_tov", "opponent_fta"}.issubset(df.columns) else np.nan
-    df["opponent_possessions_last_10"].fillna(global_poss_mean, inplace=True)
+    if {"opponent_fga", "opponent_oreb", "opponent_tov", "opponent_fta"}.issubset(df.columns):
+        opponent_possessions = (
+            df["opponent_fga"].astype(float) - df["opponent_oreb"].astype(float) + df["opponent_tov"].astype(float) + 0.44 * df["opponent_fta"].astype(float)
+        )
+        global_poss_mean = (
+            _mean_before_date(df["game_date"], opponent_possessions) if point_in_time else opponent_possessions.mean()
+        )
+    else:
+        global_poss_mean = np.nan
+    df["opponent_possessions_last_10"] = df["opponent_possessions_last_10"].fillna(global_poss_mean)
 
     # Defensive rating proxy: 100 * (opponent points allowed / opponent possessions)
     with np.errstate(divide="ignore", invalid="ignore"):
         df["opponent_def_rating_last_10"] = 100.0 * (
             df["opponent_avg_points_allowed_last_10"] / df["opponent_possessions_last_10"]
         )
-    df["opponent_def_rating_last_10"].replace([np.inf, -np.inf], np.nan, inplace=True)
+    df["opponent_def_rating_last_10"] = df["opponent_def_rating_last_10"].replace([np.inf, -np.inf], np.nan)
     # Fallbacks for def rating
-    global_defrt_mean = df["opponent_def_rating_last_10"].mean()
-    df["opponent_def_rating_last_10"].fillna(global_defrt_mean, inplace=True)
+    if point_in_time:
+        global_defrt_mean = _mean_before_date(df["game_date"], df["opponent_def_rating_last_10"])
+    else:
+        global_defrt_mean = df["opponent_def_rating_last_10"].mean()
+    df["opponent_def_rating_last_10"] = df["opponent_def_rating_last_10"].fillna(global_defrt_mean)
 
     # Home/away numeric encoding
     if "is_home" in df.columns:
@@ -197,41 +248,60 @@ def time_based_split(df: pd.DataFrame, test_size: float = 0.2) -> Tuple[pd.DataF
     cutoff_index = int(len(df_sorted) * (1 - test_size))
     return df_sorted.iloc[:cutoff_index].copy(), df_sorted.iloc[cutoff_index:].copy()
 
-def train_model(df: pd.DataFrame):
-    candidate_features: List[str] = [
-        "player_points_last_5",
-        "player_points_last_10",
-        "player_points_ewm_span_5",
-        "player_points_ewm_span_10",
-        "ppm_last_5",
-        "ppm_last_10",
-        "ppm_ewm_span_5",
-        "ppm_ewm_span_10",
-        "days_rest",
-        "opponent_avg_points_allowed_last_10",
-        "opponent_possessions_last_10",
-        "opponent_def_rating_last_10",
-        "is_home",
-    ]
-    target = "player_points"
 
+CANDIDATE_FEATURES: List[str] = [
+    "player_points_last_5",
+    "player_points_last_10",
+    "player_points_ewm_span_5",
+    "player_points_ewm_span_10",
+    "ppm_last_5",
+    "ppm_last_10",
+    "ppm_ewm_span_5",
+    "ppm_ewm_span_10",
+    "days_rest",
+    "opponent_avg_points_allowed_last_10",
+    "opponent_possessions_last_10",
+    "opponent_def_rating_last_10",
+    "is_home",
+    "player_injury_severity",
+    "teammates_out",
+    "teammates_out_minutes",
+    "team_spread",
+    "game_total",
+    "has_line",
+]
+TARGET = "player_points"
+
+
+def candidate_features(targets: Sequence[str] = (TARGET,)) -> List[str]:
+    """Points features plus the form features of any other target stats (shared by all targets)."""
+    features = list(CANDIDATE_FEATURES)
+    for target in targets:
+        if target == TARGET:
+            continue
+        features += [f"{target}_last_5", f"{target}_last_10", f"{target}_ewm_span_5", f"{target}_ewm_span_10"]
+    return features
+
+
+def prepare_training_data(df: pd.DataFrame, targets: Sequence[str] = (TARGET,)) -> Tuple[pd.DataFrame, List[str]]:
     # Keep only features that exist
-    features = [f for f in candidate_features if f in df.columns]
+    features = [f for f in candidate_features(targets) if f in df.columns]
     if not features:
         raise ValueError("No valid features available for training.")
 
     # Drop rows with missing in used columns, after filtering low minutes
     if "minutes" in df.columns:
         df = df[df["minutes"] >= 15]
-    df_clean = df.dropna(subset=features + [target]).copy()
+    df_clean = df.dropna(subset=features + list(targets)).copy()
+    return df_clean, features
 
-    # Time-based split
-    train_df, test_df = time_based_split(df_clean, test_size=0.2)
-    X_train, y_train = train_df[features], train_df[target]
-    X_test, y_test = test_df[features], test_df[target]
 
+def fit_default_model(X_train, y_train, X_test, y_test):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.multioutput import MultiOutputRegressor
+
+    multi_output = y_train.ndim > 1
     # Prefer LightGBM if available
-    model = None
     try:
         from lightgbm import LGBMRegressor  # type: ignore
         model = LGBMRegressor(
@@ -242,22 +312,93 @@ def train_model(df: pd.DataFrame):
             colsample_bytree=0.9,
             random_state=42,
         )
-        model.fit(X_train, y_train, eval_set=[(X_test, y_test)], eval_metric="l1", verbose=False)
+        if multi_output:
+            # One booster per stat, fitted in parallel on the shared feature matrix
+            model = MultiOutputRegressor(model, n_jobs=-1)
+            model.fit(X_train, y_train)
+        else:
+            model.fit(X_train, y_train, eval_set=[(X_test, y_test)], eval_metric="l1", verbose=False)
     except Exception:
+        # RandomForest handles several targets natively in a single forest
         model = RandomForestRegressor(n_estimators=400, random_state=42, n_jobs=-1)
         model.fit(X_train, y_train)
+    return model
+
+
+def train_model(df: pd.DataFrame, model_filename: str = "player_points_predictor.pkl", estimator=None,
+                stats: Sequence[str] = ("pts",)):
+    import joblib
+    from sklearn.metrics import mean_absolute_error
+
+    unknown = [stat for stat in stats if stat not in STAT_TARGETS]
+    if unknown:
+        raise ValueError(f"Unknown stats: {unknown}")
+    targets = [STAT_TARGETS[stat] for stat in stats]
+    df_clean, features = prepare_training_data(df, targets)
+
+    # Time-based split
+    train_df, test_df = time_based_split(df_clean, test_size=0.2)
+    # Fit on the same float32 layout the API builds per request (see feature_matrix.py)
+    target_cols = targets[0] if len(targets) == 1 else targets
+    X_train, y_train = FeatureMatrix.from_frame(train_df, features).values, train_df[target_cols].to_numpy()
+    X_test, y_test = FeatureMatrix.from_frame(test_df, features).values, test_df[target_cols].to_numpy()
+
+    if estimator is not None:
+        # Caller-supplied configuration, e.g. the best entry from backend/ml/tuning.py
+        model = estimator
+        model.fit(X_train, y_train)
+    else:
+        model = fit_default_model(X_train, y_train, X_test, y_test)
 
     preds = model.predict(X_test)
-    mae = mean_absolute_error(y_test, preds)
     print(f"Features used: {features}")
-    print(f"Test MAE: {mae:.2f}")
-
-    model_filename = "player_points_predictor.pkl"
-    joblib.dump({"model": model, "features": features}, model_filename)
+    if len(targets) == 1:
+        mae = mean_absolute_error(y_test, preds)
+        print(f"Test MAE: {mae:.2f}")
+    else:
+        for k, stat in enumerate(stats):
+            print(f"Test MAE ({stat}): {mean_absolute_error(y_test[:, k], preds[:, k]):.2f}")
+
+    # Over/under probabilities come from the holdout residuals of each stat
+    preds_by_stat = dict(zip(stats, np.asarray(preds).reshape(len(y_test), -1).T))
+    actuals_by_stat = dict(zip(stats, np.asarray(y_test).reshape(len(y_test), -1).T))
+    for name, parts in DERIVED_STATS.items():
+        if set(parts) <= set(stats):
+            preds_by_stat[name] = sum(preds_by_stat[part] for part in parts)
+            actuals_by_stat[name] = sum(actuals_by_stat[part] for part in parts)
+    distributions = {
+        stat: ResidualDistribution.fit(preds_by_stat[stat], actuals_by_stat[stat])
+        for stat in preds_by_stat
+    }
+
+    # Same-game dependence between players and stats for the slate simulator
+    scores = pd.DataFrame({
+        stat: normal_scores(distributions[stat], preds_by_stat[stat], actuals_by_stat[stat]) for stat in stats
+    })
+    scores["game_id"] = test_df["game_id"].to_numpy()
+    scores["team_id"] = test_df["team_id"].to_numpy()
+    copula = SlateCopula.fit(scores, stats)
+
+    joblib.dump({
+        "model": model,
+        "features": features,
+        "stats": list(stats),
+        "distributions": distributions,
+        "copula": copula,
+    }, model_filename)
     print(f"Model saved to {model_filename}")
     return model
 
 if __name__ == '__main__':
-    master_df = create_training_dataframe()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the player stat models.")
+    parser.add_argument("--parquet-dir", default=None,
+                        help="Read from a Parquet export (python -m backend.ml.columnar) instead of Postgres")
+    args = parser.parse_args()
+
+    master_df = create_training_dataframe(connect_duckdb(args.parquet_dir) if args.parquet_dir else None)
     featured_df = feature_engineering(master_df)
-    trained_model = train_model(featured_df)
\ No newline at end of file
+    # One feature pass feeds every stat; the API serves them all from this artifact
+    trained_model = train_model(featured_df, model_filename="player_stats_predictor.pkl",
+                                stats=tuple(STAT_TARGETS))
\ No newline at end of file
@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import ParameterGrid, ParameterSampler, TimeSeriesSplit
+from sklearn.multioutput import MultiOutputRegressor
+
+from backend.ml.train_model import (
+    STAT_TARGETS,
+    TARGET,
+    create_training_dataframe,
+    feature_engineering,
+    prepare_training_data,
+    train_model,
+)
+
+# Walk-forward cross-validation and hyperparameter search for train_model.
+#
+#   python -m backend.ml.tuning --n-iter 20 --folds 5 --workers 4 --output leaderboard.json
+#
+# The feature matrix is written once to .npy files and every worker opens them
+# with mmap_mode="r", so tasks only carry a config and a pair of row offsets.
+
+DEFAULT_PARAM_GRID: Dict[str, Dict[str, List[Any]]] = {
+    "random_forest": {
+        "n_estimators": [200, 400],
+        "max_depth": [None, 12, 20],
+        "min_samples_leaf": [1, 5, 20],
+        "max_features": [1.0, 0.5],
+    },
+    "lightgbm": {
+        "n_estimators": [300, 1000],
+        "learning_rate": [0.03, 0.1],
+        "num_leaves": [15, 31, 63],
+        "subsample": [0.8, 1.0],
+        "colsample_bytree": [0.8, 1.0],
+    },
+}
+
+# Per-process view of the shared arrays, set by _init_worker
+_shared: Dict[str, np.ndarray] = {}
+
+
+def _lightgbm_available() -> bool:
+    try:
+        import lightgbm  # type: ignore  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def build_estimator(kind: str, params: Dict[str, Any]):
+    if kind == "random_forest":
+        # One core per task; parallelism comes from the process pool
+        return RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    if kind == "lightgbm":
+        from lightgbm import LGBMRegressor  # type: ignore
+        return LGBMRegressor(random_state=42, n_jobs=1, verbose=-1, subsample_freq=1, **params)
+    raise ValueError(f"Unknown estimator kind: {kind}")
+
+
+def refit_best(featured_df: pd.DataFrame, best: Dict[str, Any],
+               model_filename: str = "player_stats_predictor.pkl"):
+    """Train the winning config on every stat and save it where the API looks first.
+
+    Mirrors train_model's __main__ (MODEL_PATHS in backend/api/predictor.py prefers
+    player_stats_predictor.pkl), so a refit is not shadowed by an older artifact.
+    """
+    estimator = build_estimator(best["kind"], best["params"])
+    if best["kind"] == "random_forest":
+        estimator.set_params(n_jobs=-1)
+    else:
+        # LightGBM fits one target; one booster per stat, as in fit_default_model
+        estimator = MultiOutputRegressor(estimator, n_jobs=-1)
+    model = train_model(featured_df, model_filename=model_filename, estimator=estimator,
+                        stats=tuple(STAT_TARGETS))
+    print(f"Refit {best['kind']} {best['params']} on {', '.join(STAT_TARGETS)}; the API loads {model_filename}")
+    return model
+
+
+def make_configs(kinds: Sequence[str], n_iter: Optional[int] = None, seed: int = 42) -> List[Dict[str, Any]]:
+    """Full grid per estimator kind, or n_iter random draws from it when n_iter is set."""
+    configs: List[Dict[str, Any]] = []
+    for kind in kinds:
+        grid = DEFAULT_PARAM_GRID[kind]
+        if n_iter is None:
+            candidates = list(ParameterGrid(grid))
+        else:
+            candidates = list(ParameterSampler(grid, n_iter=n_iter, random_state=seed))
+        configs.extend({"kind": kind, "params": params} for params in candidates)
+    return configs
+
+
+def walk_forward_folds(n_rows: int, n_splits: int = 5) -> List[Tuple[int, int, int]]:
+    """(train_end, test_start, test_end) offsets for expanding-window folds over time-sorted rows."""
+    folds = []
+    for train_idx, test_idx in TimeSeriesSplit(n_splits=n_splits).split(np.arange(n_rows)):
+        folds.append((int(train_idx[-1]) + 1, int(test_idx[0]), int(test_idx[-1]) + 1))
+    return folds
+
+
+def write_shared_arrays(df: pd.DataFrame, features: List[str], target: str, directory: str) -> Tuple[str, str]:
+    # Tree estimators work in float32 internally, so storing X that way lets fit()
+    # consume the read-only memmap without converting it per task
+    X = np.ascontiguousarray(df[features].to_numpy(dtype=np.float32))
+    y = np.ascontiguousarray(df[target].to_numpy(dtype=np.float64))
+    x_path, y_path = os.path.join(directory, "X.npy"), os.path.join(directory, "y.npy")
+    np.save(x_path, X)
+    np.save(y_path, y)
+    return x_path, y_path
+
+
+def _init_worker(x_path: str, y_path: str) -> None:
+    _shared["X"] = np.load(x_path, mmap_mode="r")
+    _shared["y"] = np.load(y_path, mmap_mode="r")
+
+
+def _evaluate_task(task: Tuple[int, Dict[str, Any], int, Tuple[int, int, int]]) -> Dict[str, Any]:
+    config_id, config, fold_id, (train_end, test_start, test_end) = task
+    X, y = _shared["X"], _shared["y"]
+    model = build_estimator(config["kind"], config["params"])
+    start = time.perf_counter()
+    model.fit(X[:train_end], y[:train_end])
+    preds = model.predict(X[test_start:test_end])
+    return {
+        "config_id": config_id,
+        "fold": fold_id,
+        "mae": float(mean_absolute_error(y[test_start:test_end], preds)),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def build_leaderboard(configs: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    by_config: Dict[int, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_config.setdefault(result["config_id"], []).append(result)
+
+    leaderboard = []
+    for config_id, fold_results in by_config.items():
+        fold_results.sort(key=lambda r: r["fold"])
+        maes = np.array([r["mae"] for r in fold_results])
+        leaderboard.append({
+            "config_id": config_id,
+            "kind": configs[config_id]["kind"],
+            "params": configs[config_id]["params"],
+            "mean_mae": round(float(maes.mean()), 4),
+            "std_mae": round(float(maes.std()), 4),
+            "fold_mae": [round(float(m), 4) for m in maes],
+            "fit_seconds": round(sum(r["seconds"] for r in fold_results), 2),
+        })
+    leaderboard.sort(key=lambda row: row["mean_mae"])
+    for rank, row in enumerate(leaderboard, 1):
+        row["rank"] = rank
+    return leaderboard
+
+
+def tune(df: pd.DataFrame, configs: List[Dict[str, Any]], n_splits: int = 5,
+         workers: Optional[int] = None, target: str = TARGET) -> List[Dict[str, Any]]:
+    """Evaluate every config on every walk-forward fold and return the MAE leaderboard."""
+    df_clean, features = prepare_training_data(df, [target])
+    df_clean = df_clean.sort_values("game_date", kind="stable").reset_index(drop=True)
+    folds = walk_forward_folds(len(df_clean), n_splits)
+    tasks = [
+        (config_id, config, fold_id, fold)
+        for config_id, config in enumerate(configs)
+        for fold_id, fold in enumerate(folds)
+    ]
+    workers = workers or os.cpu_count() or 1
+    print(f"Tuning {len(configs)} configs x {len(folds)} folds on {len(df_clean)} rows with {workers} workers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        x_path, y_path = write_shared_arrays(df_clean, features, target, tmp)
+        if workers == 1:
+            _init_worker(x_path, y_path)
+            results = [_evaluate_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(x_path, y_path)) as pool:
+                results = list(pool.map(_evaluate_task, tasks))
+
+    leaderboard = build_leaderboard(configs, results)
+    for row in leaderboard[:10]:
+        print(f"  #{row['rank']} {row['kind']} MAE {row['mean_mae']:.3f} (+/- {row['std_mae']:.3f}) {row['params']}")
+    return leaderboard
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Walk-forward CV hyperparameter search for train_model.")
+    parser.add_argument("--kinds", nargs="+", default=None, help="estimator kinds (random_forest, lightgbm)")
+    parser.add_argument("--n-iter", type=int, default=None, help="random search draws per kind (default: full grid)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--synthetic-seasons", type=int, default=None, help="tune on generated data instead of the DB")
+    parser.add_argument("--output", default="tuning_leaderboard.json")
+    parser.add_argument("--refit", action="store_true", help="train the best config on every stat and save player_stats_predictor.pkl")
+    args = parser.parse_args(argv)
+
+    kinds = args.kinds or (["random_forest", "lightgbm"] if _lightgbm_available() else ["random_forest"])
+    configs = make_configs(kinds, n_iter=args.n_iter, seed=args.seed)
+
+    if args.synthetic_seasons:
+        from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+        conn = load_into_sqlite(generate_league_tables(args.synthetic_seasons, seed=args.seed))
+        master_df = create_training_dataframe(conn)
+        conn.close()
+    else:
+        master_df = create_training_dataframe()
+    featured_df = feature_engineering(master_df)
+
+    leaderboard = tune(featured_df, configs, n_splits=args.folds, workers=args.workers)
+    with open(args.output, "w") as f:
+        json.dump(leaderboard, f, indent=2)
+    print(f"Leaderboard written to {args.output}")
+
+    if args.refit and leaderboard:
+        refit_best(featured_df, leaderboard[0])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
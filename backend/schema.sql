@@ -1,6 +1,6 @@
 
 -- id is the team id from the NBA API
-CREATE TABLE teams (
+CREATE TABLE IF NOT EXISTS teams (
     id INTEGER PRIMARY KEY,
     full_name VARCHAR(255) NOT NULL,
     abbreviation VARCHAR(10) NOT NULL,
@@ -11,7 +11,7 @@ CREATE TABLE teams (
 );
 
 -- id is the player id from the NBA API
-CREATE TABLE players (
+CREATE TABLE IF NOT EXISTS players (
     id INTEGER PRIMARY KEY,
     full_name VARCHAR(255) NOT NULL,
     first_name VARCHAR(255),
@@ -23,8 +23,10 @@ CREATE TABLE players (
     age INTEGER
 );
 
--- id is the game id from the NBA API
-CREATE TABLE games (
+-- One row per team per game, LIST-partitioned by season (see ensure_season_partitions
+-- below). season_id is NBA-style: season type digit + start year, e.g. 22023 is the
+-- 2023-24 regular season and 42023 its playoffs; all types of a season share a partition.
+CREATE TABLE IF NOT EXISTS games (
     season_id INTEGER NOT NULL,
     team_id INTEGER NOT NULL,
     team_abbreviation VARCHAR(10) NOT NULL,
@@ -32,6 +34,7 @@ CREATE TABLE games (
     game_date DATE NOT NULL,
     matchup VARCHAR(50),          -- e.g., "LAL vs. GSW"
     opponent_team_id INTEGER,
+    opponent_points INTEGER,      -- denormalized from the opponent's row by ingest
     is_home BOOLEAN,
     season_type VARCHAR(20) DEFAULT 'Regular',
     tipoff_datetime TIMESTAMPTZ,
@@ -58,18 +61,20 @@ CREATE TABLE games (
     pf INTEGER,
     plus_minus INTEGER,
 
-    
-
-
-    PRIMARY KEY (game_id, team_id),
+    -- Unique keys on a partitioned table must include the partition key
+    PRIMARY KEY (season_id, game_id, team_id),
     CONSTRAINT fk_team FOREIGN KEY(team_id) REFERENCES teams(id),
     CONSTRAINT fk_opp_team FOREIGN KEY(opponent_team_id) REFERENCES teams(id)
-);
+) PARTITION BY LIST (season_id);
 
 --the performance of a single player in a single game.
+-- season_id and game_date are copied from games so per-player history is one index
+-- scan and the table partitions alongside games.
 
-CREATE TABLE player_game_stats (
-    id SERIAL PRIMARY KEY, -- Using SERIAL creates an auto-incrementing integer for a unique row ID.
+CREATE TABLE IF NOT EXISTS player_game_stats (
+    id BIGSERIAL,
+    season_id INTEGER NOT NULL,
+    game_date DATE NOT NULL,
     player_id INTEGER NOT NULL,
     game_id VARCHAR(20) NOT NULL,
     team_id INTEGER NOT NULL,
@@ -95,17 +100,57 @@ CREATE TABLE player_game_stats (
     starter BOOLEAN,
     
     CONSTRAINT fk_player FOREIGN KEY(player_id) REFERENCES players(id),
-    CONSTRAINT fk_game FOREIGN KEY(game_id, team_id) REFERENCES games(game_id, team_id),
+    CONSTRAINT fk_game FOREIGN KEY(season_id, game_id, team_id) REFERENCES games(season_id, game_id, team_id),
     
-    -- Add a unique constraint to prevent duplicate entries for the same player in the same game.
-    UNIQUE (player_id, game_id)
+    -- One row per player per game (prevents duplicate entries)
+    PRIMARY KEY (season_id, player_id, game_id)
+) PARTITION BY LIST (season_id);
+
+-- Creates the games/player_game_stats partitions for the season starting in start_year.
+-- Ingest calls this before loading a season; rows for seasons without a partition
+-- land in the DEFAULT partitions.
+CREATE OR REPLACE FUNCTION ensure_season_partitions(start_year INTEGER) RETURNS void AS $$
+DECLARE
+    season_ids TEXT := format('%s, %s, %s, %s, %s', 10000 + start_year, 20000 + start_year,
+                              30000 + start_year, 40000 + start_year, 50000 + start_year);
+BEGIN
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF games FOR VALUES IN (%s)',
+                   'games_' || start_year, season_ids);
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF player_game_stats FOR VALUES IN (%s)',
+                   'player_game_stats_' || start_year, season_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS games_default PARTITION OF games DEFAULT;
+CREATE TABLE IF NOT EXISTS player_game_stats_default PARTITION OF player_game_stats DEFAULT;
+SELECT ensure_season_partitions(start_year) FROM generate_series(2019, 2025) AS start_year;
+
+-- In-progress box scores from scripts/live_ingest.py. Everything that reads games and
+-- player_game_stats treats their rows as completed games, so live rows are staged here
+-- and moved over when the game goes final.
+CREATE TABLE IF NOT EXISTS live_games (
+    LIKE games INCLUDING DEFAULTS,
+    PRIMARY KEY (season_id, game_id, team_id)
+);
+CREATE TABLE IF NOT EXISTS live_player_game_stats (
+    LIKE player_game_stats INCLUDING DEFAULTS,
+    PRIMARY KEY (season_id, player_id, game_id)
 );
 
--- Helpful indexes
-CREATE INDEX IF NOT EXISTS idx_games_team_date ON games(team_id, game_date);
-CREATE INDEX IF NOT EXISTS idx_games_opp_date ON games(opponent_team_id, game_date);
-CREATE INDEX IF NOT EXISTS idx_pgs_player_date ON player_game_stats(player_id, game_id);
-CREATE INDEX IF NOT EXISTS idx_pgs_team_date ON player_game_stats(team_id, game_id);
+-- Covering indexes for the hot serve-time queries (backend/api/queries.py); each one
+-- answers its query with an index-only scan per partition
+-- Last N games of a player (form features, game log, current team)
+CREATE INDEX IF NOT EXISTS idx_pgs_player_date ON player_game_stats(player_id, game_date DESC)
+    INCLUDE (minutes, points, rebounds, assists, fg3m, steals, blocks, team_id);
+-- Season roster of a team with minutes (teammate injury features)
+CREATE INDEX IF NOT EXISTS idx_pgs_team_season ON player_game_stats(team_id, season_id)
+    INCLUDE (player_id, minutes);
+-- Last N games of a team (opponent defence/pace features)
+CREATE INDEX IF NOT EXISTS idx_games_team_date ON games(team_id, game_date DESC)
+    INCLUDE (opponent_points, fga, oreb, tov, fta);
+-- Games against an opponent (head-to-head, schedule lookups)
+CREATE INDEX IF NOT EXISTS idx_games_opp_date ON games(opponent_team_id, game_date DESC)
+    INCLUDE (team_id, game_id);
 
 -- Optional: historical game lines (timestamped to avoid leakage)
 CREATE TABLE IF NOT EXISTS game_lines (
@@ -130,3 +175,106 @@ CREATE TABLE IF NOT EXISTS injury_reports (
   FOREIGN KEY (player_id) REFERENCES players(id)
 );
 
+-- As-of lookups (latest report/line strictly before tipoff) walk these backwards;
+-- INCLUDE lets the serve-time queries answer from the index alone
+CREATE INDEX IF NOT EXISTS idx_injury_reports_player_time ON injury_reports(player_id, report_time DESC) INCLUDE (status);
+CREATE INDEX IF NOT EXISTS idx_injury_reports_time ON injury_reports(report_time);
+CREATE INDEX IF NOT EXISTS idx_game_lines_game_time ON game_lines(game_id, retrieved_at DESC) INCLUDE (home_spread, total);
+CREATE INDEX IF NOT EXISTS idx_game_lines_time ON game_lines(retrieved_at);
+CREATE INDEX IF NOT EXISTS idx_games_team_opp_date ON games(team_id, opponent_team_id, game_date);
+
+-- Head-to-head aggregates per (player, opponent), maintained by ingest
+-- (scripts/init_data_load.py refresh_player_vs_opponent) for the games it loads
+CREATE TABLE IF NOT EXISTS player_vs_opponent (
+    player_id INTEGER NOT NULL,
+    opponent_team_id INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    minutes FLOAT,
+    points INTEGER,
+    rebounds INTEGER,
+    assists INTEGER,
+    steals INTEGER,
+    blocks INTEGER,
+    turnovers INTEGER,
+    fgm INTEGER,
+    fga INTEGER,
+    fg3m INTEGER,
+    fg3a INTEGER,
+    ftm INTEGER,
+    fta INTEGER,
+    first_game_date DATE,
+    last_game_date DATE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (player_id, opponent_team_id),
+    FOREIGN KEY (player_id) REFERENCES players(id),
+    FOREIGN KEY (opponent_team_id) REFERENCES teams(id)
+);
+CREATE INDEX IF NOT EXISTS idx_player_vs_opponent_opp ON player_vs_opponent(opponent_team_id);
+
+-- Season totals per (player, season) and (team, season), maintained by ingest
+-- (scripts/init_data_load.py refresh_player_season_stats / refresh_team_season_stats)
+-- for the keys it loads. Only sums and counts are stored, so averages, per-36 rates,
+-- shooting percentages, pace and ratings derived from them are exact.
+-- team_id is the team of the player's latest game that season.
+CREATE TABLE IF NOT EXISTS player_season_stats (
+    player_id INTEGER NOT NULL,
+    season_id INTEGER NOT NULL,
+    team_id INTEGER,
+    games INTEGER NOT NULL,        -- games with minutes > 0
+    games_started INTEGER NOT NULL,
+    minutes FLOAT,
+    points INTEGER,
+    rebounds INTEGER,
+    oreb INTEGER,
+    dreb INTEGER,
+    assists INTEGER,
+    steals INTEGER,
+    blocks INTEGER,
+    turnovers INTEGER,
+    fgm INTEGER,
+    fga INTEGER,
+    fg3m INTEGER,
+    fg3a INTEGER,
+    ftm INTEGER,
+    fta INTEGER,
+    first_game_date DATE,
+    last_game_date DATE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (player_id, season_id),
+    FOREIGN KEY (player_id) REFERENCES players(id),
+    FOREIGN KEY (team_id) REFERENCES teams(id)
+);
+-- Leaderboards read one season's rows
+CREATE INDEX IF NOT EXISTS idx_player_season_stats_season ON player_season_stats(season_id);
+
+-- Possessions use the same proxy as the model features (fga - oreb + tov + 0.44 * fta);
+-- minutes are team minutes (240 for a regulation game), so pace = 240 * possessions / minutes
+CREATE TABLE IF NOT EXISTS team_season_stats (
+    team_id INTEGER NOT NULL,
+    season_id INTEGER NOT NULL,
+    games INTEGER NOT NULL,        -- completed games (win_loss set)
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    minutes INTEGER,
+    points INTEGER,
+    opponent_points INTEGER,
+    fgm INTEGER,
+    fga INTEGER,
+    fg3m INTEGER,
+    fg3a INTEGER,
+    ftm INTEGER,
+    fta INTEGER,
+    oreb INTEGER,
+    dreb INTEGER,
+    reb INTEGER,
+    ast INTEGER,
+    stl INTEGER,
+    blk INTEGER,
+    tov INTEGER,
+    plus_minus INTEGER,
+    first_game_date DATE,
+    last_game_date DATE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (team_id, season_id),
+    FOREIGN KEY (team_id) REFERENCES teams(id)
+);
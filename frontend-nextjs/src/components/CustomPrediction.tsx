@@ -18,52 +18,83 @@ interface Prediction {
   predicted_points: number
 }
 
+// Debounce for the player search box, in milliseconds
+const SEARCH_DELAY_MS = 150
+
 export default function CustomPrediction() {
-  const [players, setPlayers] = useState<Player[]>([])
+  const [playerQuery, setPlayerQuery] = useState('')
+  const [playerResults, setPlayerResults] = useState<Player[]>([])
+  const [selectedPlayer, setSelectedPlayer] = useState<Player | null>(null)
   const [teams, setTeams] = useState<Team[]>([])
-  const [selectedPlayerId, setSelectedPlayerId] = useState('')
   const [selectedTeamId, setSelectedTeamId] = useState('')
   const [prediction, setPrediction] = useState<Prediction | null>(null)
   const [predictionStatus, setPredictionStatus] = useState('')
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
 
+  const selectedPlayerId = selectedPlayer ? String(selectedPlayer.id) : ''
+
   useEffect(() => {
     initializeData()
   }, [])
 
+  // Players are searched server-side as the user types instead of downloading the full list
+  useEffect(() => {
+    const query = playerQuery.trim()
+    if (!query || (selectedPlayer && query === selectedPlayer.full_name)) {
+      setPlayerResults([])
+      return
+    }
+
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      try {
+        const results = await fetchData(`/players/search?q=${encodeURIComponent(query)}&limit=10`)
+        if (!cancelled) {
+          setPlayerResults(Array.isArray(results) ? results : [])
+        }
+      } catch (error) {
+        console.error('Player search failed:', error)
+        if (!cancelled) {
+          setPlayerResults([])
+        }
+      }
+    }, SEARCH_DELAY_MS)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [playerQuery, selectedPlayer])
+
   const initializeData = async () => {
     try {
       setLoading(true)
-      const [playersRaw, teamsRaw] = await Promise.all([
-        fetchData('/players'),
-        fetchData('/teams')
-      ])
+      const teamsRaw = await fetchData('/teams')
 
       // Normalize possible response shapes
-      const playersAll = Array.isArray(playersRaw) ? playersRaw : (playersRaw?.players || [])
       const teamsAll = Array.isArray(teamsRaw) ? teamsRaw : (teamsRaw?.teams || [])
 
-      // Filter only active players and sort
-      const filteredPlayers = playersAll
-        .filter((p: Player) => p && (p.is_active !== false))
-        .sort((a: Player, b: Player) => (a.full_name || '').localeCompare(b.full_name || ''))
-
       // Sort teams alphabetically
       const sortedTeams = teamsAll
         .filter((t: Team) => t)
         .sort((a: Team, b: Team) => (a.full_name || '').localeCompare(b.full_name || ''))
 
-      setPlayers(filteredPlayers)
       setTeams(sortedTeams)
     } catch (error) {
       console.error('Failed to initialize data:', error)
-      setError('Failed to load players and teams. Please try again later.')
+      setError('Failed to load teams. Please try again later.')
     } finally {
       setLoading(false)
     }
   }
 
+  const handlePlayerSelect = (player: Player) => {
+    setSelectedPlayer(player)
+    setPlayerQuery(player.full_name)
+    setPlayerResults([])
+  }
+
   const handlePrediction = async () => {
     if (!selectedPlayerId || !selectedTeamId) return
 
@@ -88,8 +119,7 @@ export default function CustomPrediction() {
   }
 
   const getSelectedPlayerName = () => {
-    const player = players.find(p => p.id === selectedPlayerId)
-    return player?.full_name || '—'
+    return selectedPlayer?.full_name || '—'
   }
 
   const getSelectedTeamName = () => {
@@ -105,7 +135,7 @@ export default function CustomPrediction() {
   if (loading) {
     return (
       <div className="card">
-        <div className="loading">Loading players and teams...</div>
+        <div className="loading">Loading teams...</div>
       </div>
     )
   }
@@ -131,19 +161,33 @@ export default function CustomPrediction() {
       <div className="card-body">
         <div className="selectors">
           <div className="select-group">
-            <label htmlFor="player-select">Select a Player:</label>
-            <select 
-              id="player-select"
-              value={selectedPlayerId}
-              onChange={(e) => setSelectedPlayerId(e.target.value)}
-            >
-              <option value="" disabled>Select a Player...</option>
-              {players.map(player => (
-                <option key={player.id} value={player.id}>
-                  {player.full_name}
-                </option>
-              ))}
-            </select>
+            <label htmlFor="player-search">Select a Player:</label>
+            <input
+              id="player-search"
+              type="text"
+              autoComplete="off"
+              placeholder="Search for a player..."
+              value={playerQuery}
+              onChange={(e) => {
+                setPlayerQuery(e.target.value)
+                setSelectedPlayer(null)
+              }}
+            />
+            {playerResults.length > 0 && (
+              <ul className="search-results" role="listbox">
+                {playerResults.map(player => (
+                  <li
+                    key={player.id}
+                    role="option"
+                    aria-selected={player.id === selectedPlayer?.id}
+                    onMouseDown={() => handlePlayerSelect(player)}
+                  >
+                    {player.full_name}
+                    {player.is_active === false && <span className="search-result-note">inactive</span>}
+                  </li>
+                ))}
+              </ul>
+            )}
           </div>
           
           <div className="select-group">
@@ -1,17 +1,16 @@
 import psycopg2
 import os
-from nba_api.stats.static import teams, players
-from nba_api.stats.endpoints import boxscoretraditionalv2
-from nba_api.stats.endpoints import commonplayerinfo
-from nba_api.stats.endpoints import leaguegamefinder
+import json
 import time
-import pandas as pd
 from requests.exceptions import Timeout, ConnectionError
 import random
-from typing import Optional, List
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Optional, List
 
-load_dotenv()
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Importing this module does no I/O: .env, the database connection and the
+# nba_api/pandas imports all wait for configure()/connect() or the load functions.
 
 # Configuration helpers to read env values safely
 def _get_env_int(name: str, default: int) -> int:
@@ -34,14 +33,6 @@ def _get_env_float(name: str, default: float) -> float:
     except Exception:
         return default
 
-# Retry/rate-limit configuration (overridable via env)
-# API_MAX_RETRIES, API_BASE_TIMEOUT, API_RATE_LIMIT_MIN, API_RATE_LIMIT_MAX, API_COOL_OFF_ON_TIMEOUT
-MAX_RETRIES = _get_env_int("API_MAX_RETRIES", 3)
-BASE_TIMEOUT = _get_env_float("API_BASE_TIMEOUT", 45.0)  # seconds per attempt
-RATE_LIMIT_MIN = _get_env_float("API_RATE_LIMIT_MIN", 3.0)
-RATE_LIMIT_MAX = _get_env_float("API_RATE_LIMIT_MAX", 5.0)
-COOL_OFF_ON_TIMEOUT = _get_env_float("API_COOL_OFF_ON_TIMEOUT", 0.0)
-
 # Seasons to load, configurable via env: API_SEASONS="2021-22,2022-23,2023-24"
 def _parse_env_seasons(env_value: Optional[str]) -> List[str]:
     if not env_value:
@@ -59,25 +50,73 @@ def _parse_env_seasons(env_value: Optional[str]) -> List[str]:
             continue
     return seasons or ['2023-24']
 
-season_to_load: List[str] = _parse_env_seasons(os.getenv('API_SEASONS'))
-
-connection = psycopg2.connect(
-    dbname = os.getenv("DB_NAME"),
-    user = os.getenv("DB_USER"),
-    password = os.getenv("DB_PASSWORD"),
-    host = os.getenv("DB_HOST"),
-    port = os.getenv("DB_PORT"),
-)
-
-cur = connection.cursor()
-print("connected to database")
+def configure():
+    """Load .env and (re)read the settings below from the environment."""
+    global MAX_RETRIES, BASE_TIMEOUT, RATE_LIMIT_MIN, RATE_LIMIT_MAX, COOL_OFF_ON_TIMEOUT, season_to_load
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    # Retry/rate-limit configuration (overridable via env)
+    # API_MAX_RETRIES, API_BASE_TIMEOUT, API_RATE_LIMIT_MIN, API_RATE_LIMIT_MAX, API_COOL_OFF_ON_TIMEOUT
+    MAX_RETRIES = _get_env_int("API_MAX_RETRIES", 3)
+    BASE_TIMEOUT = _get_env_float("API_BASE_TIMEOUT", 45.0)  # seconds per attempt
+    RATE_LIMIT_MIN = _get_env_float("API_RATE_LIMIT_MIN", 3.0)
+    RATE_LIMIT_MAX = _get_env_float("API_RATE_LIMIT_MAX", 5.0)
+    COOL_OFF_ON_TIMEOUT = _get_env_float("API_COOL_OFF_ON_TIMEOUT", 0.0)
+    season_to_load = _parse_env_seasons(os.getenv('API_SEASONS'))
+
+MAX_RETRIES = 3
+BASE_TIMEOUT = 45.0
+RATE_LIMIT_MIN = 3.0
+RATE_LIMIT_MAX = 5.0
+COOL_OFF_ON_TIMEOUT = 0.0
+season_to_load: List[str] = ['2023-24']
+
+# Shared by the load functions; set by connect()
+connection = None
+cur = None
+
+def connect():
+    """configure() and open the loader's connection and cursor."""
+    global connection, cur
+    configure()
+    connection = psycopg2.connect(
+        dbname = os.getenv("DB_NAME"),
+        user = os.getenv("DB_USER"),
+        password = os.getenv("DB_PASSWORD"),
+        host = os.getenv("DB_HOST"),
+        port = os.getenv("DB_PORT"),
+    )
+    cur = connection.cursor()
+    print("connected to database")
+    return connection
+
+# Channel the API workers LISTEN on (see backend/api/invalidation.py). Each load
+# transaction notifies once per table and season it wrote; Postgres delivers the
+# notifications on commit and folds duplicates within a transaction.
+DATA_CHANGED_CHANNEL = "data_changed"
+
+def notify_data_changed(table: str, season_id: Optional[int] = None):
+    """Queue a data_changed notification for table (and season) in the current transaction."""
+    payload = json.dumps({"table": table, "season_id": None if season_id is None else int(season_id)})
+    cur.execute("SELECT pg_notify(%s, %s)", (DATA_CHANGED_CHANNEL, payload))
+
+def season_str_to_season_id(season_str: str) -> int:
+    """Convert season like '2023-24' to numeric season_id 22023 used in DB."""
+    try:
+        start_year = int(season_str[:4])
+        return 22000 + start_year - 2000
+    except Exception:
+        return 22023
 
 def rate_limit_sleep():
     """Sleep for a random duration to avoid rate limiting"""
     time.sleep(random.uniform(RATE_LIMIT_MIN, RATE_LIMIT_MAX))
 
-def make_api_request(request_func, *args, context_label: Optional[str] = None, **kwargs) -> pd.DataFrame:
+def make_api_request(request_func, *args, context_label: Optional[str] = None, **kwargs) -> "pd.DataFrame":
     """Make an API request with retry logic"""
+    import pandas as pd
+
     for attempt in range(MAX_RETRIES):
         try:
             label = context_label or getattr(request_func, '__name__', str(request_func))
@@ -105,6 +144,10 @@ def make_api_request(request_func, *args, context_label: Optional[str] = None, *
     raise ValueError("Failed to get valid response after all retries")
 
 def load_players_data():
+    import pandas as pd
+    from nba_api.stats.endpoints import commonplayerinfo
+    from nba_api.stats.static import players
+
     try:
         all_players = players.get_active_players()
         print(f'Retrieving {len(all_players)} players')
@@ -247,6 +290,7 @@ def load_players_data():
                 if should_fetch_meta:
                     rate_limit_sleep()
                 
+        notify_data_changed("players")
         connection.commit()
         print("Done loading players")
         
@@ -256,6 +300,8 @@ def load_players_data():
         raise
 
 def load_teams_data():
+    from nba_api.stats.static import teams
+
     try:
         all_teams = teams.get_teams()
         print(f'Retrieving {len(all_teams)} teams')
@@ -276,6 +322,7 @@ def load_teams_data():
                 values_to_insert = (team['id'], team['full_name'], team['abbreviation'], team['nickname'], team['city'], team['state'], team['year_founded'])
                 cur.execute(sql_command, values_to_insert)
                 
+        notify_data_changed("teams")
         connection.commit()
         print('Done loading teams')
         
@@ -285,6 +332,9 @@ def load_teams_data():
         raise
 
 def load_games_data():
+    from nba_api.stats.endpoints import leaguegamefinder
+    from nba_api.stats.static import teams
+
     try:
 
         active_teams = teams.get_teams()
@@ -306,6 +356,8 @@ def load_games_data():
 
         for season in season_to_load:
                 try:
+                        ensure_season_partitions(season)
+
                         all_games_for_season = make_api_request(
                             leaguegamefinder.LeagueGameFinder,
                             context_label=f"LeagueGameFinder season={season}",
@@ -374,10 +426,12 @@ def load_games_data():
                                 %(reb)s, %(ast)s, %(stl)s, %(blk)s, %(tov)s,
                                 %(pf)s, %(plus_minus)s
                             )
-                            ON CONFLICT (game_id, team_id) DO NOTHING;
+                            ON CONFLICT (season_id, game_id, team_id) DO NOTHING;
                         """
 
                         cur.execute(sql_command, game_data)
+
+                        notify_data_changed("games", season_str_to_season_id(season))
                 except Exception as e:
                         print(f"Error loading games for {season}: {str(e)}")
                         if isinstance(e, (Timeout, ConnectionError)) and COOL_OFF_ON_TIMEOUT > 0:
@@ -388,7 +442,21 @@ def load_games_data():
                                         pass
                         # continue with next season
                         continue
-                        
+
+        # Denormalize each side's score onto the other side's row (see games.opponent_points)
+        cur.execute(OPPONENT_POINTS_UPDATE_SQL)
+        print(f'Set opponent_points on {cur.rowcount} games rows')
+
+        # Season totals for every season type (regular, playoffs, ...) of the loaded seasons;
+        # a database loaded before team_season_stats existed gets all seasons once
+        cur.execute("SELECT EXISTS (SELECT 1 FROM team_season_stats)")
+        if cur.fetchone()[0]:
+            refresh_team_season_stats(season_ids=[season_type * 10000 + int(season[:4])
+                                                  for season in season_to_load for season_type in range(1, 6)])
+        else:
+            refresh_team_season_stats()
+        notify_data_changed("team_season_stats")
+
         connection.commit()
         print(f'Done loading games for {season}')
         
@@ -398,6 +466,21 @@ def load_games_data():
         raise
 
 
+# Copies the other side's points onto each team-game row; only touches rows that changed
+OPPONENT_POINTS_UPDATE_SQL = """
+    UPDATE games g
+    SET opponent_points = o.points
+    FROM games o
+    WHERE o.season_id = g.season_id
+      AND o.game_id = g.game_id
+      AND o.team_id = g.opponent_team_id
+      AND g.opponent_points IS DISTINCT FROM o.points;
+"""
+
+def ensure_season_partitions(season: str):
+    """Create the games/player_game_stats partitions for a season like '2023-24'."""
+    cur.execute("SELECT ensure_season_partitions(%s)", (int(season[:4]),))
+
 # Odds API ingestion removed as per cleanup decision (left intentionally empty)
 
 def convert_time_to_minutes(time_str):
@@ -409,7 +492,172 @@ def convert_time_to_minutes(time_str):
     except:
         return 0
 
+# Recomputes player_vs_opponent rows for the (player, opponent) pairs that appear in
+# the given games (all pairs when game_ids is NULL). Recomputing from the fact tables
+# rather than adding deltas keeps re-runs of ingest idempotent. season_ids prunes the
+# key lookup to those seasons' partitions; both sides repeat it so each is pruned.
+PLAYER_VS_OPPONENT_REFRESH_SQL = """
+    WITH keys AS (
+        SELECT DISTINCT pgs.player_id, g.opponent_team_id
+        FROM player_game_stats pgs
+        JOIN games g ON pgs.season_id = g.season_id AND pgs.game_id = g.game_id AND pgs.team_id = g.team_id
+        WHERE (%(game_ids)s::varchar[] IS NULL OR pgs.game_id = ANY(%(game_ids)s::varchar[]))
+          AND (%(season_ids)s::integer[] IS NULL OR pgs.season_id = ANY(%(season_ids)s::integer[]))
+          AND (%(season_ids)s::integer[] IS NULL OR g.season_id = ANY(%(season_ids)s::integer[]))
+          AND g.opponent_team_id IS NOT NULL
+    )
+    INSERT INTO player_vs_opponent (
+        player_id, opponent_team_id, games, minutes, points, rebounds, assists,
+        steals, blocks, turnovers, fgm, fga, fg3m, fg3a, ftm, fta,
+        first_game_date, last_game_date, updated_at
+    )
+    SELECT
+        pgs.player_id, g.opponent_team_id, COUNT(*), SUM(pgs.minutes), SUM(pgs.points),
+        SUM(pgs.rebounds), SUM(pgs.assists), SUM(pgs.steals), SUM(pgs.blocks),
+        SUM(pgs.turnovers), SUM(pgs.fgm), SUM(pgs.fga), SUM(pgs.fg3m), SUM(pgs.fg3a),
+        SUM(pgs.ftm), SUM(pgs.fta), MIN(g.game_date), MAX(g.game_date), now()
+    FROM keys k
+    JOIN player_game_stats pgs ON pgs.player_id = k.player_id
+    JOIN games g ON pgs.season_id = g.season_id AND pgs.game_id = g.game_id AND pgs.team_id = g.team_id
+        AND g.opponent_team_id = k.opponent_team_id
+    WHERE pgs.minutes > 0
+    GROUP BY pgs.player_id, g.opponent_team_id
+    ON CONFLICT (player_id, opponent_team_id) DO UPDATE SET
+        games = EXCLUDED.games,
+        minutes = EXCLUDED.minutes,
+        points = EXCLUDED.points,
+        rebounds = EXCLUDED.rebounds,
+        assists = EXCLUDED.assists,
+        steals = EXCLUDED.steals,
+        blocks = EXCLUDED.blocks,
+        turnovers = EXCLUDED.turnovers,
+        fgm = EXCLUDED.fgm,
+        fga = EXCLUDED.fga,
+        fg3m = EXCLUDED.fg3m,
+        fg3a = EXCLUDED.fg3a,
+        ftm = EXCLUDED.ftm,
+        fta = EXCLUDED.fta,
+        first_game_date = EXCLUDED.first_game_date,
+        last_game_date = EXCLUDED.last_game_date,
+        updated_at = EXCLUDED.updated_at;
+"""
+
+def refresh_player_vs_opponent(game_ids: Optional[List[str]] = None, season_ids: Optional[List[int]] = None):
+    """Bring player_vs_opponent up to date for the pairs touched by game_ids/season_ids (None = full rebuild)."""
+    cur.execute(PLAYER_VS_OPPONENT_REFRESH_SQL, {"game_ids": game_ids, "season_ids": season_ids})
+    print(f"Refreshed {cur.rowcount} player_vs_opponent rows")
+
+# Season aggregates, refreshed the same way for the (player|team, season) keys that
+# appear in the given games and/or seasons (NULL = no filter). Each key is recomputed
+# from its own season's rows only, so the cost follows the games loaded, not history.
+PLAYER_SEASON_STATS_REFRESH_SQL = """
+    WITH keys AS (
+        SELECT DISTINCT player_id, season_id
+        FROM player_game_stats
+        WHERE (%(game_ids)s::varchar[] IS NULL OR game_id = ANY(%(game_ids)s::varchar[]))
+          AND (%(season_ids)s::integer[] IS NULL OR season_id = ANY(%(season_ids)s::integer[]))
+    )
+    INSERT INTO player_season_stats (
+        player_id, season_id, team_id, games, games_started, minutes, points, rebounds,
+        oreb, dreb, assists, steals, blocks, turnovers, fgm, fga, fg3m, fg3a, ftm, fta,
+        first_game_date, last_game_date, updated_at
+    )
+    SELECT
+        pgs.player_id, pgs.season_id, (ARRAY_AGG(pgs.team_id ORDER BY pgs.game_date DESC))[1],
+        COUNT(*), COUNT(*) FILTER (WHERE pgs.starter), SUM(pgs.minutes), SUM(pgs.points),
+        SUM(pgs.rebounds), SUM(pgs.oreb), SUM(pgs.dreb), SUM(pgs.assists), SUM(pgs.steals),
+        SUM(pgs.blocks), SUM(pgs.turnovers), SUM(pgs.fgm), SUM(pgs.fga), SUM(pgs.fg3m),
+        SUM(pgs.fg3a), SUM(pgs.ftm), SUM(pgs.fta), MIN(pgs.game_date), MAX(pgs.game_date), now()
+    FROM keys k
+    JOIN player_game_stats pgs ON pgs.player_id = k.player_id AND pgs.season_id = k.season_id
+    WHERE pgs.minutes > 0
+    GROUP BY pgs.player_id, pgs.season_id
+    ON CONFLICT (player_id, season_id) DO UPDATE SET
+        team_id = EXCLUDED.team_id,
+        games = EXCLUDED.games,
+        games_started = EXCLUDED.games_started,
+        minutes = EXCLUDED.minutes,
+        points = EXCLUDED.points,
+        rebounds = EXCLUDED.rebounds,
+        oreb = EXCLUDED.oreb,
+        dreb = EXCLUDED.dreb,
+        assists = EXCLUDED.assists,
+        steals = EXCLUDED.steals,
+        blocks = EXCLUDED.blocks,
+        turnovers = EXCLUDED.turnovers,
+        fgm = EXCLUDED.fgm,
+        fga = EXCLUDED.fga,
+        fg3m = EXCLUDED.fg3m,
+        fg3a = EXCLUDED.fg3a,
+        ftm = EXCLUDED.ftm,
+        fta = EXCLUDED.fta,
+        first_game_date = EXCLUDED.first_game_date,
+        last_game_date = EXCLUDED.last_game_date,
+        updated_at = EXCLUDED.updated_at;
+"""
+
+TEAM_SEASON_STATS_REFRESH_SQL = """
+    WITH keys AS (
+        SELECT DISTINCT team_id, season_id
+        FROM games
+        WHERE (%(game_ids)s::varchar[] IS NULL OR game_id = ANY(%(game_ids)s::varchar[]))
+          AND (%(season_ids)s::integer[] IS NULL OR season_id = ANY(%(season_ids)s::integer[]))
+    )
+    INSERT INTO team_season_stats (
+        team_id, season_id, games, wins, losses, minutes, points, opponent_points,
+        fgm, fga, fg3m, fg3a, ftm, fta, oreb, dreb, reb, ast, stl, blk, tov, plus_minus,
+        first_game_date, last_game_date, updated_at
+    )
+    SELECT
+        g.team_id, g.season_id, COUNT(*), COUNT(*) FILTER (WHERE g.win_loss = 'W'),
+        COUNT(*) FILTER (WHERE g.win_loss = 'L'), SUM(g.minutes), SUM(g.points),
+        SUM(g.opponent_points), SUM(g.fgm), SUM(g.fga), SUM(g.fg3m), SUM(g.fg3a), SUM(g.ftm),
+        SUM(g.fta), SUM(g.oreb), SUM(g.dreb), SUM(g.reb), SUM(g.ast), SUM(g.stl), SUM(g.blk),
+        SUM(g.tov), SUM(g.plus_minus), MIN(g.game_date), MAX(g.game_date), now()
+    FROM keys k
+    JOIN games g ON g.team_id = k.team_id AND g.season_id = k.season_id
+    WHERE g.win_loss IS NOT NULL
+    GROUP BY g.team_id, g.season_id
+    ON CONFLICT (team_id, season_id) DO UPDATE SET
+        games = EXCLUDED.games,
+        wins = EXCLUDED.wins,
+        losses = EXCLUDED.losses,
+        minutes = EXCLUDED.minutes,
+        points = EXCLUDED.points,
+        opponent_points = EXCLUDED.opponent_points,
+        fgm = EXCLUDED.fgm,
+        fga = EXCLUDED.fga,
+        fg3m = EXCLUDED.fg3m,
+        fg3a = EXCLUDED.fg3a,
+        ftm = EXCLUDED.ftm,
+        fta = EXCLUDED.fta,
+        oreb = EXCLUDED.oreb,
+        dreb = EXCLUDED.dreb,
+        reb = EXCLUDED.reb,
+        ast = EXCLUDED.ast,
+        stl = EXCLUDED.stl,
+        blk = EXCLUDED.blk,
+        tov = EXCLUDED.tov,
+        plus_minus = EXCLUDED.plus_minus,
+        first_game_date = EXCLUDED.first_game_date,
+        last_game_date = EXCLUDED.last_game_date,
+        updated_at = EXCLUDED.updated_at;
+"""
+
+def refresh_player_season_stats(game_ids: Optional[List[str]] = None, season_ids: Optional[List[int]] = None):
+    """Bring player_season_stats up to date for the players in game_ids/season_ids (None = all)."""
+    cur.execute(PLAYER_SEASON_STATS_REFRESH_SQL, {"game_ids": game_ids, "season_ids": season_ids})
+    print(f"Refreshed {cur.rowcount} player_season_stats rows")
+
+def refresh_team_season_stats(game_ids: Optional[List[str]] = None, season_ids: Optional[List[int]] = None):
+    """Bring team_season_stats up to date for the teams in game_ids/season_ids (None = all)."""
+    cur.execute(TEAM_SEASON_STATS_REFRESH_SQL, {"game_ids": game_ids, "season_ids": season_ids})
+    print(f"Refreshed {cur.rowcount} team_season_stats rows")
+
 def load_player_game_stats():
+    import pandas as pd
+    from nba_api.stats.endpoints import boxscoretraditionalv2
+
     try:
         cur.execute("SELECT id FROM players")
         active_player_ids = {row[0] for row in cur.fetchall()}
@@ -420,17 +668,21 @@ def load_player_game_stats():
         processed_games = {row[0] for row in cur.fetchall()}
         print(f"Found {len(processed_games)} already processed games")
 
-        def _season_str_to_season_id(season_str: str) -> int:
-            """Convert season like '2023-24' to numeric season_id 22023 used in DB."""
-            try:
-                start_year = int(season_str[:4])
-                return 22000 + start_year - 2000
-            except Exception:
-                return 22023
-
-        season_ids_clause = ','.join(str(_season_str_to_season_id(s)) for s in season_to_load)
+        # Backfill head-to-head aggregates for databases loaded before the table existed
+        cur.execute("SELECT EXISTS (SELECT 1 FROM player_vs_opponent)")
+        if processed_games and not cur.fetchone()[0]:
+            refresh_player_vs_opponent()
+            notify_data_changed("player_vs_opponent")
+            connection.commit()
+        cur.execute("SELECT EXISTS (SELECT 1 FROM player_season_stats)")
+        if processed_games and not cur.fetchone()[0]:
+            refresh_player_season_stats()
+            notify_data_changed("player_season_stats")
+            connection.commit()
+
+        season_ids_clause = ','.join(str(season_str_to_season_id(s)) for s in season_to_load)
         from_games_table = f"""
-            SELECT DISTINCT game_id, season_id
+            SELECT DISTINCT game_id, season_id, game_date
             FROM games
             WHERE season_id IN ({season_ids_clause})
         """
@@ -443,6 +695,7 @@ def load_player_game_stats():
         for game_index, game_row in enumerate(all_games, 1):
                 game_id = game_row[0]
                 season_id_for_game = game_row[1]
+                game_date_for_game = game_row[2]
                 
                 # Skip if already processed
                 if game_id in processed_games:
@@ -469,6 +722,8 @@ def load_player_game_stats():
                                 continue
 
                             game_data = {
+                                'season_id': season_id_for_game,
+                                'game_date': game_date_for_game,
                                 'player_id': player_id,
                                 'game_id': game['GAME_ID'],
                                 'team_id': game['TEAM_ID'],
@@ -495,21 +750,27 @@ def load_player_game_stats():
                             
                             sql_command = """
                                 INSERT INTO player_game_stats (
-                                    player_id, game_id, team_id, minutes, points,
+                                    season_id, game_date, player_id, game_id, team_id, minutes, points,
                                     rebounds, oreb, dreb, assists, steals, blocks, turnovers,
                                     fgm, fga, fg_pct, fg3m, fg3a, fg3_pct,
                                     ftm, fta, ft_pct, starter
                                 ) VALUES (
-                                    %(player_id)s, %(game_id)s, %(team_id)s, %(minutes)s, %(points)s,
+                                    %(season_id)s, %(game_date)s, %(player_id)s, %(game_id)s, %(team_id)s, %(minutes)s, %(points)s,
                                     %(rebounds)s, %(oreb)s, %(dreb)s, %(assists)s, %(steals)s, %(blocks)s, %(turnovers)s,
                                     %(fgm)s, %(fga)s, %(fg_pct)s, %(fg3m)s, %(fg3a)s, %(fg3_pct)s,
                                     %(ftm)s, %(fta)s, %(ft_pct)s, %(starter)s
                                 )
-                                ON CONFLICT (player_id, game_id) DO NOTHING;
+                                ON CONFLICT (season_id, player_id, game_id) DO NOTHING;
                             """
                             
                             cur.execute(sql_command, game_data)
                             
+                    refresh_player_vs_opponent([game_id], [season_id_for_game])
+                    refresh_player_season_stats([game_id], [season_id_for_game])
+                    notify_data_changed("player_game_stats", season_id_for_game)
+                    notify_data_changed("player_vs_opponent", season_id_for_game)
+                    notify_data_changed("player_season_stats", season_id_for_game)
+
                     # Commit after each game to save progress
                     connection.commit()
                     print(f'Successfully processed game {game_id}')
@@ -535,6 +796,7 @@ def load_player_game_stats():
 
 
 if __name__ == "__main__":
+    connect()
     try:
         load_players_data() 
         load_teams_data()
@@ -0,0 +1,344 @@
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from psycopg2.extras import execute_values
+
+from scripts import init_data_load as loader
+from scripts.init_data_load import DATA_CHANGED_CHANNEL, _get_env_float
+
+# Live in-game ingestion. Polls box scores of games in progress, diffs each one
+# against the last snapshot held in memory and upserts only the team/player rows
+# that changed, in one execute_values statement per table per poll, so live
+# projections can refresh every few seconds without rewriting whole games.
+#
+# In-progress rows go to live_games / live_player_game_stats. games and
+# player_game_stats only ever hold completed games (form features, training, the
+# aggregates all read them as such), so a game's rows move there when it goes final.
+#
+#   python -m scripts.live_ingest --interval 15                       # nba_api live feed
+#   python -m scripts.live_ingest --interval 15 --record polls.jsonl  # ...and record it
+#   python -m scripts.live_ingest --replay polls.jsonl --interval 0   # replay a recording
+#
+# A recording is JSON lines, one poll per line: {"games": [<live box score "game">, ...]}.
+
+# gameStatus in the live scoreboard/box score payloads
+SCHEDULED, LIVE, FINAL = 1, 2, 3
+
+GAME_COLUMNS = (
+    "season_id", "team_id", "game_id", "team_abbreviation", "game_date", "tipoff_datetime",
+    "matchup", "opponent_team_id", "is_home", "win_loss", "minutes", "points", "opponent_points",
+    "fgm", "fga", "fg_pct", "fg3m", "fg3a", "fg3_pct", "ftm", "fta", "ft_pct",
+    "oreb", "dreb", "reb", "ast", "stl", "blk", "tov", "pf", "plus_minus",
+)
+PLAYER_COLUMNS = (
+    "season_id", "player_id", "game_id", "game_date", "team_id", "minutes", "points",
+    "rebounds", "oreb", "dreb", "assists", "steals", "blocks", "turnovers",
+    "fgm", "fga", "fg_pct", "fg3m", "fg3a", "fg3_pct", "ftm", "fta", "ft_pct", "starter",
+)
+# Leading columns of each row form the table's primary key
+GAME_KEY_LENGTH, PLAYER_KEY_LENGTH = 3, 3
+
+# (column, key in the live "statistics" dict), shared by team and player rows
+SHOOTING_STATS = (
+    ("fgm", "fieldGoalsMade"), ("fga", "fieldGoalsAttempted"), ("fg_pct", "fieldGoalsPercentage"),
+    ("fg3m", "threePointersMade"), ("fg3a", "threePointersAttempted"), ("fg3_pct", "threePointersPercentage"),
+    ("ftm", "freeThrowsMade"), ("fta", "freeThrowsAttempted"), ("ft_pct", "freeThrowsPercentage"),
+)
+
+
+def _upsert_sql(table: str, columns: Tuple[str, ...], key_length: int) -> str:
+    updates = ",\n            ".join(f"{column} = EXCLUDED.{column}" for column in columns[key_length:])
+    return f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES %s
+        ON CONFLICT ({", ".join(columns[:key_length])}) DO UPDATE SET
+            {updates};
+    """
+
+
+LIVE_GAMES_UPSERT_SQL = _upsert_sql("live_games", GAME_COLUMNS, GAME_KEY_LENGTH)
+LIVE_PLAYER_GAME_STATS_UPSERT_SQL = _upsert_sql("live_player_game_stats", PLAYER_COLUMNS, PLAYER_KEY_LENGTH)
+GAMES_UPSERT_SQL = _upsert_sql("games", GAME_COLUMNS, GAME_KEY_LENGTH)
+PLAYER_GAME_STATS_UPSERT_SQL = _upsert_sql("player_game_stats", PLAYER_COLUMNS, PLAYER_KEY_LENGTH)
+
+
+def parse_clock_minutes(value: Optional[str]) -> float:
+    """Minutes from a live-feed ISO duration ("PT25M01.00S" -> 25.0167); 0 when missing."""
+    match = re.fullmatch(r"PT(?:(\d+)M)?(?:([\d.]+)S)?", str(value or ""))
+    if not match:
+        return 0.0
+    minutes, seconds = match.groups()
+    return round(int(minutes or 0) + float(seconds or 0) / 60, 4)
+
+
+def season_id_from_game_id(game_id: str) -> int:
+    """NBA game ids carry the season: "0022300014" -> 22023 (regular season 2023-24)."""
+    return int(game_id[2]) * 10000 + 2000 + int(game_id[3:5])
+
+
+def game_rows(game: dict) -> Dict[Tuple, Tuple]:
+    """games rows (one per team) for a live box score, keyed by primary key."""
+    season_id = season_id_from_game_id(game["gameId"])
+    game_date = str(game.get("gameEt") or game["gameTimeUTC"])[:10]
+    final = game.get("gameStatus") == FINAL
+    home, away = game["homeTeam"], game["awayTeam"]
+    rows = {}
+    for team, opponent, is_home in ((home, away, True), (away, home, False)):
+        stats = team.get("statistics") or {}
+        points, opponent_points = team.get("score"), opponent.get("score")
+        separator = "vs." if is_home else "@"
+        row = (
+            season_id, team["teamId"], game["gameId"], team["teamTricode"], game_date,
+            game.get("gameTimeUTC"), f"{team['teamTricode']} {separator} {opponent['teamTricode']}",
+            opponent["teamId"], is_home,
+            ("W" if points > opponent_points else "L") if final else None,
+            int(parse_clock_minutes(stats.get("minutes"))), points, opponent_points,
+            *(stats.get(key) for _, key in SHOOTING_STATS),
+            stats.get("reboundsOffensive"), stats.get("reboundsDefensive"), stats.get("reboundsTotal"),
+            stats.get("assists"), stats.get("steals"), stats.get("blocks"), stats.get("turnovers"),
+            stats.get("foulsPersonal"), points - opponent_points,
+        )
+        rows[row[:GAME_KEY_LENGTH]] = row
+    return rows
+
+
+def player_rows(game: dict, known_player_ids: Optional[Set[int]] = None) -> Dict[Tuple, Tuple]:
+    """player_game_stats rows for every listed player, keyed by primary key.
+
+    Players missing from known_player_ids (the players table) are skipped, as in
+    the batch loader, since their rows would fail the foreign key.
+    """
+    season_id = season_id_from_game_id(game["gameId"])
+    game_date = str(game.get("gameEt") or game["gameTimeUTC"])[:10]
+    rows = {}
+    for team in (game["homeTeam"], game["awayTeam"]):
+        for player in team.get("players", []):
+            player_id = int(player["personId"])
+            if known_player_ids is not None and player_id not in known_player_ids:
+                continue
+            stats = player.get("statistics") or {}
+            row = (
+                season_id, player_id, game["gameId"], game_date, team["teamId"],
+                parse_clock_minutes(stats.get("minutes")), stats.get("points", 0),
+                stats.get("reboundsTotal", 0), stats.get("reboundsOffensive", 0),
+                stats.get("reboundsDefensive", 0), stats.get("assists", 0), stats.get("steals", 0),
+                stats.get("blocks", 0), stats.get("turnovers", 0),
+                *(stats.get(key, 0) for _, key in SHOOTING_STATS),
+                str(player.get("starter", "0")) == "1",
+            )
+            rows[row[:PLAYER_KEY_LENGTH]] = row
+    return rows
+
+
+def changed_rows(snapshot: Dict[Tuple, Tuple], rows: Dict[Tuple, Tuple]) -> List[Tuple]:
+    """Rows that are new or differ from the snapshot."""
+    return [row for key, row in rows.items() if snapshot.get(key) != row]
+
+
+class NBALiveFeed:
+    """In-progress (and just-finished) box scores from nba_api's live endpoints."""
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+
+    def poll(self, finished: Set[str]) -> Optional[List[dict]]:
+        from nba_api.live.nba.endpoints import boxscore, scoreboard
+
+        games = scoreboard.ScoreBoard(timeout=self.timeout).games.get_dict()
+        box_scores = []
+        for game in games:
+            if game["gameStatus"] < LIVE or game["gameId"] in finished:
+                continue
+            try:
+                box_scores.append(boxscore.BoxScore(game["gameId"], timeout=self.timeout).get_dict()["game"])
+            except Exception as e:
+                # Box scores appear a little after tip-off; pick the game up next poll
+                print(f"No box score for {game['gameId']} yet: {e}")
+        return box_scores
+
+
+class ReplayFeed:
+    """Replays a recording, one poll per line; poll() returns None once it runs out."""
+
+    def __init__(self, polls: Iterable[List[dict]]):
+        self.polls = iter(polls)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ReplayFeed":
+        with open(path) as handle:
+            return cls([json.loads(line)["games"] for line in handle if line.strip()])
+
+    def poll(self, finished: Set[str]) -> Optional[List[dict]]:
+        games = next(self.polls, None)
+        if games is None:
+            return None
+        return [game for game in games if game["gameId"] not in finished]
+
+
+class RecordingFeed:
+    """Wraps a feed and appends every poll to a JSON lines file for later replay."""
+
+    def __init__(self, feed, path: str):
+        self.feed = feed
+        self.path = path
+
+    def poll(self, finished: Set[str]) -> Optional[List[dict]]:
+        games = self.feed.poll(finished)
+        if games is not None:
+            with open(self.path, "a") as handle:
+                handle.write(json.dumps({"games": games}) + "\n")
+        return games
+
+
+class LiveIngestor:
+    """Polls a feed and writes only the rows that changed since the previous poll.
+
+    Games in progress are staged in the live tables; a game that went final is
+    written in full to games / player_game_stats and dropped from them.
+    on_final(cur, game_ids) runs in that same transaction (e.g. to refresh
+    player_vs_opponent).
+    """
+
+    def __init__(self, conn, feed, known_player_ids: Optional[Set[int]] = None,
+                 on_final: Optional[Callable[[object, List[str]], None]] = None):
+        self.conn = conn
+        self.feed = feed
+        self.known_player_ids = known_player_ids
+        self.on_final = on_final
+        # Last rows written, by table primary key
+        self.games_snapshot: Dict[Tuple, Tuple] = {}
+        self.players_snapshot: Dict[Tuple, Tuple] = {}
+        self.finished: Set[str] = set()
+        self.seasons_with_partitions: Set[int] = set()
+
+    def poll_once(self) -> Optional[Dict[str, int]]:
+        """One poll and one write; None once the feed is exhausted."""
+        games = self.feed.poll(self.finished)
+        if games is None:
+            return None
+        team_rows, stat_rows = {}, {}
+        final_games, final_players, final_ids = [], [], []
+        for game in games:
+            if game.get("gameStatus", LIVE) < LIVE:
+                continue
+            if game.get("gameStatus") == FINAL:
+                final_games.extend(game_rows(game).values())
+                final_players.extend(player_rows(game, self.known_player_ids).values())
+                final_ids.append(game["gameId"])
+            else:
+                team_rows.update(game_rows(game))
+                stat_rows.update(player_rows(game, self.known_player_ids))
+        changed_games = changed_rows(self.games_snapshot, team_rows)
+        changed_players = changed_rows(self.players_snapshot, stat_rows)
+
+        if changed_games or changed_players or final_ids:
+            self.write(changed_games, changed_players, final_games, final_players, final_ids)
+        # Only after the commit, so a failed write is retried in full next poll
+        self.games_snapshot.update(team_rows)
+        self.players_snapshot.update(stat_rows)
+        for game_id in final_ids:
+            self.finished.add(game_id)
+            self.forget(game_id)
+        return {"games": len(games), "team_rows": len(changed_games) + len(final_games),
+                "player_rows": len(changed_players) + len(final_players), "final": len(final_ids)}
+
+    def write(self, changed_games: List[Tuple], changed_players: List[Tuple],
+              final_games: List[Tuple], final_players: List[Tuple], final_ids: List[str]):
+        cur = self.conn.cursor()
+        seasons = {row[0] for row in final_games}
+        try:
+            if changed_games:
+                execute_values(cur, LIVE_GAMES_UPSERT_SQL, changed_games, page_size=len(changed_games))
+            if changed_players:
+                execute_values(cur, LIVE_PLAYER_GAME_STATS_UPSERT_SQL, changed_players,
+                               page_size=len(changed_players))
+            if final_ids:
+                for season_id in sorted(seasons - self.seasons_with_partitions):
+                    cur.execute("SELECT ensure_season_partitions(%s)", (season_id % 10000,))
+                # games first: player rows reference them
+                if final_games:
+                    execute_values(cur, GAMES_UPSERT_SQL, final_games, page_size=len(final_games))
+                if final_players:
+                    execute_values(cur, PLAYER_GAME_STATS_UPSERT_SQL, final_players, page_size=len(final_players))
+                cur.execute("DELETE FROM live_player_game_stats WHERE game_id = ANY(%s)", (final_ids,))
+                cur.execute("DELETE FROM live_games WHERE game_id = ANY(%s)", (final_ids,))
+                if self.on_final is not None:
+                    self.on_final(cur, final_ids)
+            # The API caches only depend on completed games, so live writes notify nothing
+            for table in ("games", "player_game_stats"):
+                for season_id in sorted(seasons):
+                    payload = json.dumps({"table": table, "season_id": season_id})
+                    cur.execute("SELECT pg_notify(%s, %s)", (DATA_CHANGED_CHANNEL, payload))
+            self.conn.commit()
+            self.seasons_with_partitions |= seasons
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    def forget(self, game_id: str):
+        """Drop a finished game from the snapshots; it will not be polled again."""
+        for snapshot in (self.games_snapshot, self.players_snapshot):
+            for key in [key for key in snapshot if key[2] == game_id]:
+                del snapshot[key]
+
+    def run(self, interval: float, max_polls: Optional[int] = None):
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            started = time.perf_counter()
+            try:
+                result = self.poll_once()
+            except Exception as e:
+                print(f"Live poll failed: {e}")
+                result = {}
+            if result is None:
+                break
+            polls += 1
+            if result:
+                print(f"Poll {polls}: {result['games']} games, wrote {result['team_rows']} team and "
+                      f"{result['player_rows']} player rows ({time.perf_counter() - started:.2f}s)")
+            time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Poll in-progress box scores and upsert changed rows")
+    parser.add_argument("--interval", type=float, default=_get_env_float("LIVE_POLL_SECONDS", 15.0))
+    parser.add_argument("--replay", help="replay a recorded JSON lines file instead of the live feed")
+    parser.add_argument("--record", help="append every poll to this JSON lines file")
+    parser.add_argument("--max-polls", type=int)
+    args = parser.parse_args(argv)
+
+    # Shares the batch loader's connection and head-to-head refresh
+    loader.connect()
+    feed = ReplayFeed.from_file(args.replay) if args.replay else NBALiveFeed()
+    if args.record:
+        feed = RecordingFeed(feed, args.record)
+    loader.cur.execute("SELECT id FROM players")
+    known_player_ids = {row[0] for row in loader.cur.fetchall()}
+
+    def refresh_finished(cur, game_ids):
+        season_ids = sorted({season_id_from_game_id(game_id) for game_id in game_ids})
+        for sql in (loader.PLAYER_VS_OPPONENT_REFRESH_SQL, loader.PLAYER_SEASON_STATS_REFRESH_SQL,
+                    loader.TEAM_SEASON_STATS_REFRESH_SQL):
+            cur.execute(sql, {"game_ids": game_ids, "season_ids": season_ids})
+        for table in ("player_vs_opponent", "player_season_stats", "team_season_stats"):
+            payload = json.dumps({"table": table, "season_id": None})
+            cur.execute("SELECT pg_notify(%s, %s)", (DATA_CHANGED_CHANNEL, payload))
+
+    ingestor = LiveIngestor(loader.connection, feed, known_player_ids, on_final=refresh_finished)
+    try:
+        ingestor.run(args.interval, args.max_polls)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loader.connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
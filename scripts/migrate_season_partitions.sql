@@ -0,0 +1,54 @@
+-- Moves an existing database to the season-partitioned games/player_game_stats
+-- layout in backend/schema.sql. Run from the repository root:
+--   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f scripts/migrate_season_partitions.sql
+-- Everything happens in one transaction; the old tables are kept as *_unpartitioned
+-- until you drop them.
+
+BEGIN;
+
+ALTER TABLE player_game_stats RENAME TO player_game_stats_unpartitioned;
+ALTER TABLE games RENAME TO games_unpartitioned;
+-- Index names are schema-wide; free them for the partitioned indexes
+DROP INDEX IF EXISTS idx_games_team_date, idx_games_opp_date, idx_games_team_opp_date,
+    idx_pgs_player_date, idx_pgs_team_date;
+
+\i backend/schema.sql
+
+SELECT ensure_season_partitions(start_year)
+FROM (SELECT DISTINCT season_id % 10000 AS start_year FROM games_unpartitioned) AS seasons;
+
+INSERT INTO games (
+    season_id, team_id, team_abbreviation, game_id, game_date, matchup, opponent_team_id,
+    is_home, season_type, tipoff_datetime, win_loss, minutes, points, fgm, fga, fg_pct,
+    fg3m, fg3a, fg3_pct, ftm, fta, ft_pct, oreb, dreb, reb, ast, stl, blk, tov, pf, plus_minus
+)
+SELECT
+    season_id, team_id, team_abbreviation, game_id, game_date, matchup, opponent_team_id,
+    is_home, season_type, tipoff_datetime, win_loss, minutes, points, fgm, fga, fg_pct,
+    fg3m, fg3a, fg3_pct, ftm, fta, ft_pct, oreb, dreb, reb, ast, stl, blk, tov, pf, plus_minus
+FROM games_unpartitioned;
+
+UPDATE games g
+SET opponent_points = o.points
+FROM games o
+WHERE o.season_id = g.season_id AND o.game_id = g.game_id AND o.team_id = g.opponent_team_id;
+
+INSERT INTO player_game_stats (
+    id, season_id, game_date, player_id, game_id, team_id, minutes, points, rebounds, oreb,
+    dreb, assists, steals, blocks, turnovers, fgm, fga, fg_pct, fg3m, fg3a, fg3_pct,
+    ftm, fta, ft_pct, starter
+)
+SELECT
+    p.id, g.season_id, g.game_date, p.player_id, p.game_id, p.team_id, p.minutes, p.points,
+    p.rebounds, p.oreb, p.dreb, p.assists, p.steals, p.blocks, p.turnovers, p.fgm, p.fga,
+    p.fg_pct, p.fg3m, p.fg3a, p.fg3_pct, p.ftm, p.fta, p.ft_pct, p.starter
+FROM player_game_stats_unpartitioned p
+JOIN games_unpartitioned g ON p.game_id = g.game_id AND p.team_id = g.team_id;
+
+SELECT setval(pg_get_serial_sequence('player_game_stats', 'id'),
+              COALESCE((SELECT MAX(id) FROM player_game_stats), 1));
+
+ANALYZE games;
+ANALYZE player_game_stats;
+
+COMMIT;
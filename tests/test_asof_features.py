@@ -0,0 +1,68 @@
+import pandas as pd
+
+from backend.ml.asof_features import add_asof_features
+
+TEAM = 1
+OPP = 2
+
+
+def _frame():
+    # Two games for a three-player team; player 12 sits out game B
+    rows = []
+    for game_id, day in (("A", "2024-01-01"), ("B", "2024-01-03")):
+        for player_id in (10, 11, 12):
+            if game_id == "B" and player_id == 12:
+                continue
+            rows.append({
+                "player_id": player_id, "team_id": TEAM, "game_id": game_id, "season_id": 22023,
+                "game_date": pd.Timestamp(day), "tipoff_datetime": pd.Timestamp(f"{day} 23:30", tz="UTC"),
+                "is_home": True, "minutes": 30.0,
+            })
+    return pd.DataFrame(rows)
+
+
+def _injuries(rows):
+    df = pd.DataFrame(rows, columns=["player_id", "report_time", "status"])
+    df["report_time"] = pd.to_datetime(df["report_time"], utc=True)
+    df["severity"] = df["status"].map({"Out": 1.0, "Questionable": 0.5})
+    return df.sort_values("report_time").reset_index(drop=True)
+
+
+def _lines(rows):
+    df = pd.DataFrame(rows, columns=["game_id", "retrieved_at", "home_spread", "total"])
+    df["retrieved_at"] = pd.to_datetime(df["retrieved_at"], utc=True)
+    return df.sort_values("retrieved_at").reset_index(drop=True)
+
+
+def test_reports_after_tipoff_are_ignored():
+    injuries = _injuries([
+        (10, "2024-01-01 12:00", "Questionable"),
+        (10, "2024-01-02 00:00", "Out"),  # published after game A tipped off
+    ])
+    out = add_asof_features(_frame(), injuries, _lines([]))
+    game_a = out[(out["game_id"] == "A") & (out["player_id"] == 10)].iloc[0]
+    assert game_a["player_injury_severity"] == 0.5
+
+
+def test_teammates_out_excludes_self_and_weights_minutes():
+    injuries = _injuries([(12, "2024-01-03 17:00", "Out")])
+    out = add_asof_features(_frame(), injuries, _lines([]))
+    game_b = out[out["game_id"] == "B"].set_index("player_id")
+    assert game_b.loc[10, "teammates_out"] == 1
+    assert game_b.loc[10, "teammates_out_minutes"] == 30.0
+    game_a = out[out["game_id"] == "A"]
+    assert (game_a["teammates_out"] == 0).all()
+
+
+def test_latest_line_before_tipoff_from_team_perspective():
+    lines = _lines([
+        ("A", "2024-01-01 10:00", -3.0, 220.0),
+        ("A", "2024-01-01 22:00", -4.5, 221.5),
+        ("A", "2024-01-02 01:00", -9.0, 230.0),  # after tipoff
+    ])
+    out = add_asof_features(_frame(), _injuries([]), lines)
+    game_a = out[out["game_id"] == "A"].iloc[0]
+    assert game_a["team_spread"] == -4.5
+    assert game_a["game_total"] == 221.5
+    assert game_a["has_line"] == 1
+    assert (out[out["game_id"] == "B"]["has_line"] == 0).all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.ml.backtest import backtest, make_windows, proxy_lines
+from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+from backend.ml.train_model import create_training_dataframe, feature_engineering
+
+
+@pytest.fixture(scope="module")
+def raw_frame():
+    conn = load_into_sqlite(generate_league_tables(n_seasons=1, seed=4))
+    frame = create_training_dataframe(conn)
+    conn.close()
+    return frame
+
+
+def test_windows_cover_each_date_once_and_follow_their_history():
+    days = np.repeat(np.arange(10, 30), 3)
+    windows = make_windows(days, start_day=15, end_day=26, retrain_every=5)
+    assert windows[0][0] == np.searchsorted(days, 15)
+    assert windows[-1][1] == np.searchsorted(days, 26, side="right")
+    for (_, end), (next_start, _) in zip(windows, windows[1:]):
+        assert end == next_start
+    # No date straddles two windows
+    assert all(days[start - 1] < days[start] for start, _ in windows)
+
+
+def test_proxy_lines_sit_on_the_half_point_below_the_average():
+    frame = pd.DataFrame({"player_points_last_10": [20.0, 20.4, 20.6, np.nan]})
+    lines = proxy_lines(frame, ["player_points"])[:, 0]
+    assert lines[:3].tolist() == [19.5, 19.5, 20.5]
+    assert np.isnan(lines[3])
+
+
+def test_point_in_time_features_ignore_later_games(raw_frame):
+    cutoff = raw_frame["game_date"].sort_values().iloc[len(raw_frame) // 2]
+    full = feature_engineering(raw_frame.copy(), point_in_time=True)
+    truncated = feature_engineering(raw_frame[raw_frame["game_date"] <= cutoff].copy(), point_in_time=True)
+
+    columns = ["player_points_last_10", "opponent_avg_points_allowed_last_10", "opponent_def_rating_last_10"]
+    keys = ["player_id", "game_id"]
+    merged = truncated[keys + columns].merge(full[keys + columns], on=keys, suffixes=("", "_full"))
+    assert len(merged) == len(truncated)
+    for column in columns:
+        np.testing.assert_allclose(merged[column], merged[f"{column}_full"], equal_nan=True)
+
+
+def test_backtest_scores_every_date_after_warmup(raw_frame):
+    featured = feature_engineering(raw_frame.copy(), point_in_time=True)
+    result = backtest(featured, stats=("pts", "reb"), retrain_every=20, min_train_days=60,
+                      params={"n_estimators": 5, "max_depth": 6}, workers=2)
+
+    days = result["days"]
+    assert [record["date"] for record in days] == sorted({record["date"] for record in days})
+    assert days[0]["train_rows"] > 0
+    overall = result["summary"]["overall"]
+    assert overall["rows"] == sum(record["rows"] for record in days)
+    assert 0 < overall["mae"]["pts"] < 15
+    assert 0 <= overall["hit_rate"]["reb"] <= 1
+    assert set(result["summary"]["by_month"]) == {record["date"][:7] for record in days}
@@ -0,0 +1,54 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+from backend.ml.columnar import connect_duckdb, export_tables, read_sql_frame
+from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+from backend.ml.train_model import create_training_dataframe, feature_engineering
+
+
+@pytest.fixture(scope="module")
+def league():
+    tables = generate_league_tables(n_seasons=2, seed=3)
+    conn = load_into_sqlite(tables)
+    yield tables, conn
+    conn.close()
+
+
+def test_export_layout_and_incremental_refresh(league, tmp_path):
+    tables, conn = league
+    counts = export_tables(conn, str(tmp_path))
+
+    season_ids = sorted(tables["games"]["season_id"].unique())
+    assert sorted(os.listdir(tmp_path / "player_game_stats")) == [f"season_id={s}" for s in season_ids]
+    assert sum(counts["player_game_stats"].values()) == len(tables["player_game_stats"])
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert set(manifest) >= {"games", "player_game_stats", "players"}
+
+    # Refreshing one season rewrites only that partition
+    untouched = tmp_path / "games" / f"season_id={season_ids[0]}" / "part-0.parquet"
+    mtime = untouched.stat().st_mtime_ns
+    export_tables(conn, str(tmp_path), tables=["games"], seasons=[season_ids[-1]])
+    assert untouched.stat().st_mtime_ns == mtime
+
+    duck = connect_duckdb(str(tmp_path))
+    counts_by_season = read_sql_frame(
+        "SELECT season_id, COUNT(*) AS n FROM games GROUP BY season_id ORDER BY season_id", duck)
+    assert counts_by_season["n"].tolist() == tables["games"].groupby("season_id").size().tolist()
+
+
+def test_duckdb_training_frame_matches_sqlite(league, tmp_path):
+    _, conn = league
+    export_tables(conn, str(tmp_path))
+    duck = connect_duckdb(str(tmp_path))
+
+    expected = feature_engineering(create_training_dataframe(conn))
+    actual = feature_engineering(create_training_dataframe(duck))
+
+    numeric = [col for col in expected.columns if expected[col].dtype.kind in "fiub"]
+    pd.testing.assert_frame_equal(actual[numeric], expected[numeric], check_dtype=False)
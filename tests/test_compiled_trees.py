@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.multioutput import MultiOutputRegressor
+
+from backend.ml.compiled_trees import compile_ensemble
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(5)
+    X = rng.normal(size=(1500, 6)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[rng.random(len(X)) < 0.2, 2] = 0.0
+    signal = np.nan_to_num(X[:, :3])
+    Y = np.column_stack([signal @ [2.0, -1.0, 0.5], signal @ [0.3, 1.5, -2.0]]) + rng.normal(size=(len(X), 2))
+    return X, Y
+
+
+def test_random_forest_matches_predict(data):
+    X, Y = data
+    single = RandomForestRegressor(n_estimators=25, random_state=0).fit(X, Y[:, 0])
+    multi = RandomForestRegressor(n_estimators=15, random_state=0).fit(X, Y)
+
+    for model in (single, multi):
+        compiled = compile_ensemble(model)
+        expected = model.predict(X)
+        actual = compiled.predict(X, chunk_rows=256)
+        assert actual.shape == expected.shape
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+
+
+def test_multi_output_wrapper_keeps_target_order(data):
+    X, Y = data
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0)).fit(X, Y)
+    compiled = compile_ensemble(model)
+    assert compiled.n_outputs == 2
+    np.testing.assert_allclose(compiled.predict(X[:1]), model.predict(X[:1]), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("params", [{}, {"zero_as_missing": True}, {"use_missing": False}])
+def test_lightgbm_matches_predict(data, params):
+    lightgbm = pytest.importorskip("lightgbm")
+    X, Y = data
+    model = lightgbm.LGBMRegressor(n_estimators=60, num_leaves=15, verbose=-1, **params).fit(X, Y[:, 0])
+    np.testing.assert_allclose(compile_ensemble(model).predict(X), model.predict(X), rtol=0, atol=1e-9)
+
+
+def test_unsupported_estimator_raises(data):
+    X, Y = data
+    with pytest.raises(ValueError):
+        compile_ensemble(LinearRegression().fit(np.nan_to_num(X), Y[:, 0]))
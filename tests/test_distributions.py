@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from backend.ml.distributions import ResidualDistribution
+
+
+@pytest.fixture(scope="module")
+def distribution():
+    rng = np.random.default_rng(0)
+    preds = rng.uniform(5, 30, size=20000)
+    # Noise grows with the prediction, so cohorts should differ
+    actuals = preds + rng.normal(0, 1 + 0.2 * preds)
+    return ResidualDistribution.fit(preds, actuals, n_cohorts=5)
+
+
+def test_prob_over_is_vectorized_and_decreasing_in_line(distribution):
+    preds = np.array([10.0, 25.0])
+    probs = distribution.prob_over(preds, np.array([5.5, 10.0, 20.5, 30.5]))
+    assert probs.shape == (2, 4)
+    assert np.all(np.diff(probs, axis=1) <= 0)
+    assert probs[0, 1] == pytest.approx(0.5, abs=0.05)
+    assert probs[1, 2] > probs[0, 2]
+
+
+def test_prob_over_accepts_a_line_matrix_per_prediction(distribution):
+    preds = np.array([10.0, 25.0])
+    lines = np.array([[10.0, 12.0], [25.0, 30.0]])
+    probs = distribution.prob_over(preds, lines)
+    assert probs[:, 0] == pytest.approx([0.5, 0.5], abs=0.05)
+
+
+def test_cohorts_capture_wider_spread_for_high_predictions(distribution):
+    low = distribution.ppf(np.array([8.0]), np.array([0.9])) - distribution.ppf(np.array([8.0]), np.array([0.1]))
+    high = distribution.ppf(np.array([28.0]), np.array([0.9])) - distribution.ppf(np.array([28.0]), np.array([0.1]))
+    assert high[0] > low[0]
+
+
+def test_ppf_inverts_cdf(distribution):
+    preds = np.array([15.0, 15.0, 15.0])
+    levels = np.array([0.1, 0.5, 0.9])
+    values = distribution.ppf(preds, levels)
+    cdf = distribution.cdf(preds, values[:, None])[:, 0]
+    assert cdf == pytest.approx(levels, abs=0.01)
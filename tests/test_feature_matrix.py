@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from backend.ml.feature_matrix import FeatureMatrix, check_prediction_equivalence
+from backend.ml.online_features import player_form_features
+from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+from backend.ml.train_model import create_training_dataframe, feature_engineering, prepare_training_data
+
+
+@pytest.fixture(scope="module")
+def training_frame():
+    conn = load_into_sqlite(generate_league_tables(n_seasons=1, seed=11))
+    featured = feature_engineering(create_training_dataframe(conn))
+    conn.close()
+    return featured
+
+
+def test_from_rows_reorders_columns_and_maps_nulls():
+    matrix = FeatureMatrix.from_rows([(1, 2.5, None), (4, 5.0, 6)], ["a", "b", "c"], ["c", "a"])
+    assert matrix.columns == ("c", "a")
+    assert matrix.values.dtype == np.float32
+    assert matrix.values.flags["C_CONTIGUOUS"]
+    assert np.isnan(matrix.values[0, 0])
+    assert matrix.values[1].tolist() == [6.0, 4.0]
+
+
+def test_from_mappings_uses_default_for_missing_features():
+    matrix = FeatureMatrix.from_mappings(["x", "y"], [{"x": 1.0}], default=0.0)
+    assert matrix.values.tolist() == [[1.0, 0.0]]
+
+
+def test_matrix_predictions_match_dataframe_predictions(training_frame):
+    df_clean, features = prepare_training_data(training_frame)
+    model = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=0)
+    model.fit(FeatureMatrix.from_frame(df_clean, features).values, df_clean["player_points"].to_numpy())
+
+    result = check_prediction_equivalence(model, df_clean.tail(500), features)
+    assert result["equivalent"], result
+
+
+def test_online_player_features_match_training_features(training_frame):
+    player_games = training_frame[training_frame["player_id"] == training_frame["player_id"].iloc[0]]
+    row = player_games.iloc[20]
+    history = player_games.iloc[:20][::-1]  # newest first, as the API query returns it
+
+    online = player_form_features(
+        {"player_points": history["player_points"].tolist(), "player_rebounds": history["player_rebounds"].tolist()},
+        history["minutes"].tolist(),
+        [d.date() for d in history["game_date"]],
+        as_of=row["game_date"].date(),
+    )
+    for name in ("player_points_last_5", "player_points_last_10", "player_points_ewm_span_5",
+                 "ppm_last_10", "player_rebounds_ewm_span_10", "days_rest"):
+        assert online[name] == pytest.approx(row[name])
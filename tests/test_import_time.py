@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# API workers import backend.api on every cold start and test collection imports
+# the ingest/training modules, so importing them must do no I/O (no database
+# connection, no .env, no model file) and must not drag in the heavy stacks that
+# only some code paths need. Each module is imported in a fresh interpreter; the
+# wall-time budget is loose and can be tightened with IMPORT_TIME_BUDGET_SECONDS.
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Module -> packages that must still be absent from sys.modules after importing it
+MODULES = {
+    "backend.api": ("pandas", "sklearn", "scipy", "joblib", "nba_api", "dotenv"),
+    "scripts.init_data_load": ("pandas", "nba_api", "dotenv"),
+    "scripts.live_ingest": ("pandas", "nba_api", "dotenv"),
+    "backend.ml.train_model": ("sklearn", "joblib", "dotenv"),
+}
+
+PROBE = """
+import builtins, importlib, json, sys, time
+
+import psycopg2
+
+def refuse(*args, **kwargs):
+    raise AssertionError("connected to the database at import time")
+
+psycopg2.connect = refuse
+opened = []
+real_open = builtins.open
+
+def recording_open(file, *args, **kwargs):
+    opened.append(str(file))
+    return real_open(file, *args, **kwargs)
+
+builtins.open = recording_open
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - started
+builtins.open = real_open
+print(json.dumps({"seconds": seconds, "opened": opened,
+                  "loaded": sorted({name.split(".")[0] for name in sys.modules})}))
+"""
+
+
+def _slowest_imports(stderr: str, n: int = 8) -> str:
+    """The top cumulative entries of a -X importtime report."""
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return ", ".join(f"{name} {micros / 1e6:.2f}s" for micros, name in sorted(rows, reverse=True)[:n])
+
+
+@pytest.mark.parametrize("module", sorted(MODULES))
+def test_import_is_side_effect_free_and_light(module):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT), DB_HOST="unreachable.invalid")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, module],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    # Library internals may read system data files (e.g. tz data); project files are off limits
+    project_files = [path for path in report["opened"]
+                     if not os.path.isabs(path) or path.startswith(str(REPO_ROOT))]
+    assert project_files == []
+    unexpected = sorted(set(MODULES[module]) & set(report["loaded"]))
+    assert unexpected == [], f"{module} imports {unexpected}"
+    budget = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "3.0"))
+    assert report["seconds"] < budget, (
+        f"importing {module} took {report['seconds']:.2f}s; slowest: {_slowest_imports(completed.stderr)}")
@@ -0,0 +1,115 @@
+import json
+import os
+import time
+
+import pytest
+
+from backend.api import invalidation
+from backend.api.invalidation import TTLCache, parse_payload
+
+
+class _Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_cache_drops_entries_only_for_its_tables():
+    cache = TTLCache("test_games", ("games", "player_game_stats"), fallback_ttl=3600)
+    load = _Loader()
+    assert cache.get("a", load) == 1
+    assert cache.get("a", load) == 1
+
+    invalidation.dispatch("teams", 22023)
+    assert cache.get("a", load) == 1
+    invalidation.dispatch("player_game_stats", 22023)
+    assert cache.get("a", load) == 2
+    invalidation.invalidate_all()
+    assert cache.get("a", load) == 3
+
+
+def test_cache_uses_fallback_ttl_without_a_listener(monkeypatch):
+    assert not invalidation.listening()
+    cache = TTLCache("test_ttl", ("games",), ttl=3600, fallback_ttl=0)
+    load = _Loader()
+    cache.get("a", load)
+    assert cache.get("a", load) == 2
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = TTLCache("test_race", ("games",), fallback_ttl=3600)
+
+    def load():
+        # The loader commits while this value is being computed
+        invalidation.dispatch("games")
+        return "stale"
+
+    assert cache.get("a", load) == "stale"
+    assert len(cache) == 0
+
+
+def test_get_many_loads_misses_in_one_call():
+    cache = TTLCache("test_many", ("games",), fallback_ttl=3600, max_entries=2)
+    batches = []
+
+    def load_missing(keys):
+        batches.append(keys)
+        return [key * 10 for key in keys]
+
+    assert cache.get_many([1, 2, 1], load_missing) == [10, 20, 10]
+    assert cache.get_many([2, 3], load_missing) == [20, 30]
+    assert batches == [[1, 2], [3]]
+    # Bounded: the oldest entry made room for 3
+    assert len(cache) == 2
+    assert cache.get_many([1], load_missing) == [10]
+    assert batches[-1] == [1]
+
+
+def test_parse_payload():
+    assert parse_payload(json.dumps({"table": "games", "season_id": "22023"})) == ("games", 22023)
+    assert parse_payload(json.dumps({"table": "players", "season_id": None})) == ("players", None)
+    assert parse_payload("not json") == (None, None)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_listener_invalidates_on_committed_notify(monkeypatch):
+    psycopg2 = pytest.importorskip("psycopg2")
+    url = os.environ["TEST_DATABASE_URL"]
+    monkeypatch.setattr(invalidation, "_listener", None)
+    monkeypatch.setenv("CACHE_LISTEN_POLL_SECONDS", "0.2")
+    cache = TTLCache("test_listen", ("games",), ttl=3600, fallback_ttl=0)
+    load = _Loader()
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 10
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return condition()
+
+    listener = invalidation.start_listener(lambda: psycopg2.connect(url))
+    try:
+        assert wait_for(invalidation.listening)
+        assert cache.get("a", load) == 1
+        assert cache.get("a", load) == 1
+
+        conn = psycopg2.connect(url)
+        cur = conn.cursor()
+        payload = json.dumps({"table": "games", "season_id": 22023})
+        cur.execute("SELECT pg_notify(%s, %s)", (invalidation.DATA_CHANGED_CHANNEL, payload))
+        # Nothing is delivered until the loader's transaction commits
+        time.sleep(0.3)
+        assert len(cache) == 1
+        conn.commit()
+        conn.close()
+        assert wait_for(lambda: len(cache) == 0)
+
+        # A dropped connection reconnects and invalidates everything it may have missed
+        cache.get("a", load)
+        listener.conn.close()
+        assert wait_for(lambda: invalidation.listening() and len(cache) == 0)
+    finally:
+        invalidation.stop_listener()
+    assert not invalidation.listening()
@@ -0,0 +1,140 @@
+import os
+import threading
+
+import pytest
+
+from backend.api import limits
+from backend.api.utils import ConnectionPool, PoolTimeout
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    closed = 0
+
+    def __init__(self):
+        self.statements = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def test_pool_reuses_connections_and_sets_timeout_only_on_change():
+    opened = []
+    pool = ConnectionPool(lambda: opened.append(_Connection()) or opened[-1], 2, 0.1)
+
+    conn = pool.getconn(2000)
+    pool.putconn(conn)
+    assert pool.getconn(2000) is conn
+    pool.putconn(conn)
+    assert pool.getconn(5000) is conn
+    pool.putconn(conn)
+
+    assert len(opened) == 1
+    assert [params for _, params in conn.statements] == [(2000,), (5000,)]
+    assert conn.rollbacks == 3
+    assert pool.stats() == {"max_size": 2, "idle": 1, "checkouts": 3, "timeouts": 0}
+
+
+def test_pool_checkout_times_out_when_exhausted():
+    pool = ConnectionPool(_Connection, 1, 0.05)
+    held = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+    # A closed connection is dropped on return and its slot freed
+    held.close()
+    pool.putconn(held)
+    assert pool.getconn() is not held
+
+
+def test_saturated_endpoint_is_shed_with_retry_after(monkeypatch):
+    from flask import Flask
+
+    monkeypatch.setenv("TEST_SHED_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("RETRY_AFTER_SECONDS", "3")
+    monkeypatch.setitem(limits.ENDPOINT_BUDGETS, "test_shed", (8, 1000))
+    app = Flask(__name__)
+    entered, release = threading.Event(), threading.Event()
+
+    @app.route("/slow")
+    @limits.limited("test_shed")
+    def slow():
+        entered.set()
+        release.wait(5)
+        return "done"
+
+    client = app.test_client()
+    first = threading.Thread(target=lambda: client.get("/slow"))
+    first.start()
+    assert entered.wait(5)
+
+    shed = client.get("/slow")
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "3"
+    assert "error" in shed.get_json()
+
+    release.set()
+    first.join(5)
+    assert client.get("/slow").status_code == 200
+    stats = limits.stats()["test_shed"]
+    assert stats["limit"] == 1 and stats["rejected"] == 1 and stats["in_flight"] == 0
+
+
+def test_error_response_distinguishes_failures_from_empty_results():
+    from flask import Flask
+    from psycopg2 import errors as pg_errors
+
+    with Flask(__name__).app_context():
+        response = limits.error_response(PoolTimeout("busy"), "loading teams")
+        assert response.status_code == 503 and "Retry-After" in response.headers
+
+        response, status = limits.error_response(pg_errors.QueryCanceled("timeout"), "loading teams")
+        assert status == 504 and "Timed out" in response.get_json()["error"]
+
+        response, status = limits.error_response(RuntimeError("boom"), "loading teams")
+        assert status == 500 and response.get_json()["error"]
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_statement_timeout_cancels_slow_queries():
+    psycopg2 = pytest.importorskip("psycopg2")
+    pool = ConnectionPool(lambda: psycopg2.connect(os.environ["TEST_DATABASE_URL"]), 1, 1.0)
+
+    conn = pool.getconn(100)
+    try:
+        cur = conn.cursor()
+        with pytest.raises(psycopg2.errors.QueryCanceled):
+            cur.execute("SELECT pg_sleep(2)")
+    finally:
+        pool.putconn(conn)
+
+    # The connection is usable again after the cancelled statement is rolled back
+    conn = pool.getconn(100)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        assert cur.fetchone() == (1,)
+    finally:
+        pool.putconn(conn)
+        conn.close()
@@ -0,0 +1,218 @@
+import json
+import os
+import select
+import uuid
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from scripts.live_ingest import (
+    FINAL,
+    LIVE,
+    LiveIngestor,
+    ReplayFeed,
+    changed_rows,
+    game_rows,
+    parse_clock_minutes,
+    player_rows,
+    season_id_from_game_id,
+)
+
+GAME_ID = "0022500001"
+
+
+def _box_score(home_team_id, away_team_id, home_players, away_players, minute, status=LIVE):
+    """A live box score "game" payload after `minute` minutes; player k scores k points a quarter."""
+
+    def points(k):
+        # Bench players only check in after the first quarter
+        return k * (minute // 12) if k < 5 or minute > 12 else 0
+
+    def team(team_id, tricode, player_ids, score):
+        return {
+            "teamId": team_id,
+            "teamTricode": tricode,
+            "score": score,
+            "players": [
+                {
+                    "personId": player_id,
+                    "starter": "1" if k < 5 else "0",
+                    "statistics": {
+                        "minutes": f"PT{minute if k < 5 or minute > 12 else 0:02d}M00.00S",
+                        "points": points(k),
+                        "reboundsTotal": k % 3,
+                        "assists": 1 if minute >= 24 else 0,
+                    },
+                }
+                for k, player_id in enumerate(player_ids)
+            ],
+            "statistics": {"minutes": f"PT{minute * 5}M00.00S", "points": score, "fieldGoalsMade": score // 2},
+        }
+
+    home_points = sum(points(k) for k in range(len(home_players)))
+    away_points = sum(points(k) for k in range(len(away_players))) + 1
+    return {
+        "gameId": GAME_ID,
+        "gameStatus": status,
+        "gameEt": "2025-11-02T19:30:00-05:00",
+        "gameTimeUTC": "2025-11-03T00:30:00Z",
+        "homeTeam": team(home_team_id, "HOM", home_players, home_points),
+        "awayTeam": team(away_team_id, "AWY", away_players, away_points),
+    }
+
+
+def test_parsers():
+    assert parse_clock_minutes("PT25M30.00S") == 25.5
+    assert parse_clock_minutes("PT00M00.00S") == 0.0
+    assert parse_clock_minutes("") == 0.0
+    assert season_id_from_game_id("0022300014") == 22023
+    assert season_id_from_game_id("0042400101") == 42024
+
+
+def test_rows_and_diff_only_report_changes():
+    first = _box_score(1, 2, [10, 11, 12, 13, 14, 15], [20, 21, 22, 23, 24, 25], minute=6)
+    later = _box_score(1, 2, [10, 11, 12, 13, 14, 15], [20, 21, 22, 23, 24, 25], minute=12)
+
+    games = game_rows(first)
+    assert [row[:3] for row in games.values()] == [(22025, 1, GAME_ID), (22025, 2, GAME_ID)]
+    home = games[(22025, 1, GAME_ID)]
+    assert home[6] == "HOM vs. AWY" and home[9] is None and home[10] == 30
+
+    snapshot = player_rows(first, known_player_ids={10, 11, 20})
+    assert set(key[1] for key in snapshot) == {10, 11, 20}
+    assert changed_rows(snapshot, snapshot) == []
+    # Minutes move for every starter, points only for the players who score
+    changed = changed_rows(player_rows(first), player_rows(later))
+    assert sorted(row[1] for row in changed) == [10, 11, 12, 13, 14, 20, 21, 22, 23, 24]
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_replayed_game_upserts_changed_rows_and_finalizes(tmp_path):
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(os.environ["TEST_DATABASE_URL"])
+    schema = f"live_test_{uuid.uuid4().hex[:8]}"
+    cur = conn.cursor()
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path TO {schema}")
+    cur.execute((Path(__file__).resolve().parents[1] / "backend" / "schema.sql").read_text())
+    cur.execute("INSERT INTO teams (id, full_name, abbreviation) VALUES (1, 'Home', 'HOM'), (2, 'Away', 'AWY')")
+    player_ids = list(range(10, 16)) + list(range(20, 26))
+    cur.executemany("INSERT INTO players (id, full_name) VALUES (%s, %s)", [(p, f"P{p}") for p in player_ids])
+    conn.commit()
+
+    try:
+        home, away = player_ids[:6], player_ids[6:]
+        recording = tmp_path / "polls.jsonl"
+        with open(recording, "w") as handle:
+            for minute, status in ((6, LIVE), (6, LIVE), (12, LIVE), (48, FINAL), (48, FINAL)):
+                handle.write(json.dumps({"games": [_box_score(1, 2, home, away, minute, status)]}) + "\n")
+
+        finals = []
+        ingestor = LiveIngestor(conn, ReplayFeed.from_file(str(recording)), set(player_ids),
+                                on_final=lambda cur, game_ids: finals.append(game_ids))
+        results = []
+        while True:
+            result = ingestor.poll_once()
+            if result is None:
+                break
+            results.append(result)
+
+        # First poll writes everything, an identical poll writes nothing, and a
+        # finished game is no longer polled
+        assert results[0] == {"games": 1, "team_rows": 2, "player_rows": 12, "final": 0}
+        assert results[1] == {"games": 1, "team_rows": 0, "player_rows": 0, "final": 0}
+        assert results[2]["player_rows"] == 10
+        assert results[3]["final"] == 1
+        assert results[4] == {"games": 0, "team_rows": 0, "player_rows": 0, "final": 0}
+        assert finals == [[GAME_ID]]
+        assert ingestor.games_snapshot == {} and GAME_ID in ingestor.finished
+
+        cur.execute("SELECT team_id, points, opponent_points, win_loss FROM games ORDER BY team_id")
+        assert cur.fetchall() == [(1, 60, 61, "L"), (2, 61, 60, "W")]
+        cur.execute("SELECT points, minutes, starter FROM player_game_stats WHERE player_id = 15")
+        assert cur.fetchall() == [(20, 48.0, False)]
+        cur.execute("SELECT (SELECT COUNT(*) FROM live_games) + (SELECT COUNT(*) FROM live_player_game_stats)")
+        assert cur.fetchone()[0] == 0
+    finally:
+        conn.rollback()
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_mid_game_poll_leaves_completed_game_readers_alone():
+    psycopg2 = pytest.importorskip("psycopg2")
+    from backend.api.predictor import fetch_feature_mapping
+    from backend.ml.synthetic_data import (
+        FIRST_PLAYER_ID, FIRST_TEAM_ID, PLAYERS_PER_TEAM, generate_league_tables, load_into_postgres)
+    from scripts.init_data_load import (
+        DATA_CHANGED_CHANNEL, PLAYER_SEASON_STATS_REFRESH_SQL, PLAYER_VS_OPPONENT_REFRESH_SQL)
+
+    url = os.environ["TEST_DATABASE_URL"]
+    conn = psycopg2.connect(url)
+    schema = f"live_test_{uuid.uuid4().hex[:8]}"
+    cur = conn.cursor()
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path TO {schema}")
+    cur.execute((Path(__file__).resolve().parents[1] / "backend" / "schema.sql").read_text())
+    load_into_postgres(generate_league_tables(n_seasons=1, seed=5), conn)
+    cur.execute("ANALYZE")
+    conn.commit()
+    listener = psycopg2.connect(url)
+    listener.autocommit = True
+    listener.cursor().execute(f"LISTEN {DATA_CHANGED_CHANNEL}")
+
+    home_team, away_team = FIRST_TEAM_ID, FIRST_TEAM_ID + 1
+    home = [FIRST_PLAYER_ID + k for k in range(12)]
+    away = [FIRST_PLAYER_ID + PLAYERS_PER_TEAM + k for k in range(12)]
+
+    def completed_state():
+        # Even a full aggregate rebuild must not pick up the game in progress
+        for sql in (PLAYER_SEASON_STATS_REFRESH_SQL, PLAYER_VS_OPPONENT_REFRESH_SQL):
+            cur.execute(sql, {"game_ids": None, "season_ids": None})
+        cur.execute("SELECT player_id, season_id, games, points, minutes FROM player_season_stats ORDER BY 1, 2")
+        season_stats = cur.fetchall()
+        cur.execute("SELECT player_id, opponent_team_id, games, points FROM player_vs_opponent ORDER BY 1, 2")
+        head_to_head = cur.fetchall()
+        features = fetch_feature_mapping(cur, home[0], away_team, as_of=date(2025, 11, 2))
+        conn.commit()
+        return features, season_stats, head_to_head
+
+    def notifications(timeout):
+        select.select([listener], [], [], timeout)
+        listener.poll()
+        payloads = sorted((n.payload for n in listener.notifies), key=str)
+        listener.notifies.clear()
+        return payloads
+
+    try:
+        before = completed_state()
+        notifications(0.2)
+        polls = [[_box_score(home_team, away_team, home, away, 12)],
+                 [_box_score(home_team, away_team, home, away, 48, status=FINAL)]]
+        ingestor = LiveIngestor(conn, ReplayFeed(polls), set(home + away))
+
+        assert ingestor.poll_once()["player_rows"] == 24
+        cur.execute("SELECT COUNT(*) FROM live_player_game_stats")
+        assert cur.fetchone()[0] == 24
+        assert notifications(0.5) == []
+        assert completed_state() == before
+
+        assert ingestor.poll_once()["final"] == 1
+        cur.execute("SELECT COUNT(*) FROM player_game_stats WHERE game_id = %s", (GAME_ID,))
+        assert cur.fetchone()[0] == 24
+        cur.execute("SELECT COUNT(*) FROM live_player_game_stats")
+        assert cur.fetchone()[0] == 0
+        assert [json.loads(p) for p in notifications(5)] == [
+            {"table": "games", "season_id": 22025}, {"table": "player_game_stats", "season_id": 22025}]
+        after = completed_state()
+        assert after[0]["player_points_last_5"] != before[0]["player_points_last_5"]
+        assert after[1] != before[1]
+    finally:
+        listener.close()
+        conn.rollback()
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
@@ -0,0 +1,145 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from backend.api import player_search
+from backend.api.player_search import PlayerSearchIndex, bounded_edit_distance, normalize_name
+
+ROWS = [
+    (2544, "LeBron James", "LeBron", "James", True),
+    (203999, "Nikola Jokić", "Nikola", "Jokić", True),
+    (201939, "Stephen Curry", "Stephen", "Curry", True),
+    (1626162, "Kelly Oubre Jr.", "Kelly", "Oubre Jr.", True),
+    (977, "Kobe Bryant", "Kobe", "Bryant", False),
+    (1629029, "Luka Dončić", "Luka", "Dončić", True),
+    (203076, "Anthony Davis", "Anthony", "Davis", True),
+    (1628983, "Shai Gilgeous-Alexander", "Shai", "Gilgeous-Alexander", True),
+]
+
+
+def _names(results):
+    return [r["full_name"] for r in results]
+
+
+def test_normalize_and_edit_distance():
+    assert normalize_name("  Nikola  Jokić ") == "nikola jokic"
+    assert normalize_name("Gilgeous-Alexander") == "gilgeous alexander"
+    assert bounded_edit_distance("jokc", "joki", 1) == 1
+    assert bounded_edit_distance("curry", "james", 1) == 2
+
+
+def test_prefix_token_and_accent_matching():
+    index = PlayerSearchIndex(ROWS)
+    assert _names(index.search("lebron james")) == ["LeBron James"]
+    assert _names(index.search("ste"))[0] == "Stephen Curry"
+    # Last name, any word order, accents folded
+    assert _names(index.search("jokic")) == ["Nikola Jokić"]
+    assert _names(index.search("doncic luka")) == ["Luka Dončić"]
+    assert _names(index.search("alexander")) == ["Shai Gilgeous-Alexander"]
+    assert index.search("") == []
+    assert set(index.search("kobe")[0]) == {"id", "full_name", "is_active"}
+
+
+def test_fuzzy_matching_and_ranking():
+    index = PlayerSearchIndex(ROWS)
+    assert _names(index.search("lebrn"))[0] == "LeBron James"
+    assert _names(index.search("steph cury")) == ["Stephen Curry"]
+    assert index.search("lebrn", fuzzy=False) == []
+    # Prefix hits outrank fuzzy ones, active players outrank inactive ones
+    results = _names(index.search("k", limit=3))
+    assert results.index("Kelly Oubre Jr.") < results.index("Kobe Bryant")
+    assert len(index.search("a", limit=2)) == 2
+
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        self.db.queries.append(sql)
+        self.last = sql
+
+    def fetchone(self):
+        return self.db.signature
+
+    def fetchall(self):
+        return self.db.rows
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return _Cursor(self.db)
+
+    def close(self):
+        pass
+
+
+class _Database:
+    def __init__(self, rows):
+        self.rows = rows
+        self.signature = (len(rows), "a")
+        self.queries = []
+        self.error = None
+        self.checking = threading.Event()
+        self.release = None
+
+    @contextmanager
+    def connect(self):
+        if self.release is not None:
+            self.checking.set()
+            self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        yield _Connection(self)
+
+
+def test_index_rebuilds_only_when_players_change(monkeypatch):
+    monkeypatch.setattr(player_search, "_index", None)
+    monkeypatch.setenv("PLAYER_INDEX_REFRESH_SECONDS", "0")
+    db = _Database(ROWS[:2])
+
+    first = player_search.get_index(db.connect)
+    assert len(first) == 2
+    assert player_search.get_index(db.connect) is first
+    builds = [q for q in db.queries if q is player_search.PLAYER_INDEX_ROWS_QUERY]
+    assert len(builds) == 1
+
+    db.rows, db.signature = ROWS, (len(ROWS), "b")
+    assert len(player_search.get_index(db.connect)) == len(ROWS)
+
+    # Within the refresh interval the cached index is served without a connection
+    monkeypatch.setenv("PLAYER_INDEX_REFRESH_SECONDS", "3600")
+    db.queries.clear()
+    player_search.get_index(db.connect)
+    assert db.queries == []
+
+
+def test_due_check_serves_the_current_index_while_refreshing_or_failing(monkeypatch):
+    monkeypatch.setattr(player_search, "_index", None)
+    monkeypatch.setenv("PLAYER_INDEX_REFRESH_SECONDS", "0")
+    db = _Database(ROWS)
+    first = player_search.get_index(db.connect)
+
+    # A caller arriving while another one is checking does not wait for it
+    db.release = threading.Event()
+    checker = threading.Thread(target=player_search.get_index, args=(db.connect,))
+    checker.start()
+    assert db.checking.wait(5)
+    db.queries.clear()
+    assert player_search.get_index(db.connect) is first
+    assert db.queries == []
+    db.release.set()
+    checker.join(5)
+
+    db.release, db.error = None, TimeoutError("pool exhausted")
+    assert player_search.get_index(db.connect) is first
+    monkeypatch.setattr(player_search, "_index", None)
+    with pytest.raises(TimeoutError):
+        player_search.get_index(db.connect)
@@ -0,0 +1,131 @@
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from backend.ml.synthetic_data import generate_league_tables, load_into_postgres
+
+# EXPLAINs every hot serve-time query against a seeded PostgreSQL database and
+# fails if any of them reads a fact table with a sequential scan. Needs a
+# scratch database: TEST_DATABASE_URL=postgresql://... pytest tests/test_query_plans.py
+
+psycopg2 = pytest.importorskip("psycopg2")
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+SCHEMA_SQL = Path(__file__).resolve().parents[1] / "backend" / "schema.sql"
+# team_season_stats is left out: ~30 rows per season, where a seq scan is the right plan
+FACT_TABLES = ("games", "player_game_stats", "injury_reports", "game_lines", "player_vs_opponent",
+               "player_season_stats")
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """A throwaway schema holding backend/schema.sql and two synthetic seasons."""
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    schema = f"plan_test_{uuid.uuid4().hex[:8]}"
+    cur = conn.cursor()
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path TO {schema}")
+    cur.execute(SCHEMA_SQL.read_text())
+    tables = generate_league_tables(n_seasons=2, seed=7)
+    load_into_postgres(tables, conn)
+    cur.execute("""
+        INSERT INTO player_vs_opponent (player_id, opponent_team_id, games, minutes, points)
+        SELECT pgs.player_id, g.opponent_team_id, COUNT(*), SUM(pgs.minutes), SUM(pgs.points)
+        FROM player_game_stats pgs
+        JOIN games g ON pgs.season_id = g.season_id AND pgs.game_id = g.game_id AND pgs.team_id = g.team_id
+        GROUP BY pgs.player_id, g.opponent_team_id
+    """)
+    from scripts.init_data_load import PLAYER_SEASON_STATS_REFRESH_SQL, TEAM_SEASON_STATS_REFRESH_SQL
+    for refresh_sql in (PLAYER_SEASON_STATS_REFRESH_SQL, TEAM_SEASON_STATS_REFRESH_SQL):
+        cur.execute(refresh_sql, {"game_ids": None, "season_ids": None})
+    cur.execute("ANALYZE")
+    conn.commit()
+
+    # A rotation player, a team they have faced and a time inside the last season
+    pgs = tables["player_game_stats"]
+    games = tables["games"]
+    row = pgs[pgs["minutes"] > 0].iloc[-1]
+    game = games[(games["game_id"] == row["game_id"]) & (games["team_id"] == row["team_id"])].iloc[0]
+    ids = {
+        "player_id": int(row["player_id"]),
+        "team_id": int(row["team_id"]),
+        "opponent_team_id": int(game["opponent_team_id"]),
+        "season_id": int(game["season_id"]),
+        "as_of": datetime.combine(game["game_date"], datetime.min.time(), tzinfo=timezone.utc),
+    }
+    try:
+        yield conn, ids
+    finally:
+        conn.rollback()
+        cur = conn.cursor()
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _seq_scanned_tables(conn, sql, params):
+    cur = conn.cursor()
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cur.fetchone()[0][0]["Plan"]
+    scanned = [
+        node["Relation Name"] for node in _plan_nodes(plan)
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name", "").startswith(FACT_TABLES)
+    ]
+    if scanned:
+        # Seq scans of empty partitions (future seasons, DEFAULT) cost nothing
+        cur.execute(
+            "SELECT relname FROM pg_class WHERE relname = ANY(%s) "
+            "AND relnamespace = current_schema()::regnamespace AND reltuples > 0",
+            (scanned,),
+        )
+        populated = {row[0] for row in cur.fetchall()}
+        scanned = [relation for relation in scanned if relation in populated]
+    cur.close()
+    return scanned
+
+
+def _hot_queries():
+    from backend.api.queries import HOT_QUERIES
+    return HOT_QUERIES
+
+
+@pytest.mark.parametrize("name", sorted(_hot_queries()))
+def test_hot_query_uses_indexes(seeded, name):
+    conn, ids = seeded
+    sql, make_params = _hot_queries()[name]
+    assert _seq_scanned_tables(conn, sql, make_params(ids)) == []
+
+
+def test_player_history_prunes_to_index_scans_per_partition(seeded):
+    conn, ids = seeded
+    from backend.api.queries import PLAYER_RECENT_GAMES_QUERY
+    cur = conn.cursor()
+    cur.execute("EXPLAIN (FORMAT JSON) " + PLAYER_RECENT_GAMES_QUERY, (ids["player_id"],))
+    plan = cur.fetchone()[0][0]["Plan"]
+    node_types = {node["Node Type"] for node in _plan_nodes(plan)}
+    # Newest-first merge of per-season index scans rather than a sort of all rows
+    assert "Sort" not in node_types
+    assert node_types & {"Index Only Scan", "Index Scan"}
+
+
+def test_player_vs_opponent_refresh_scans_only_the_game_season(seeded):
+    conn, ids = seeded
+    from scripts.init_data_load import PLAYER_VS_OPPONENT_REFRESH_SQL
+    cur = conn.cursor()
+    cur.execute("SELECT game_id FROM player_game_stats WHERE player_id = %s AND season_id = %s LIMIT 1",
+                (ids["player_id"], ids["season_id"]))
+    params = {"game_ids": [cur.fetchone()[0]], "season_ids": [ids["season_id"]]}
+    start_year = ids["season_id"] % 10000
+    # Other seasons are only reached through the player_id index for the career totals
+    assert set(_seq_scanned_tables(conn, PLAYER_VS_OPPONENT_REFRESH_SQL, params)) <= {
+        f"games_{start_year}", f"player_game_stats_{start_year}"}
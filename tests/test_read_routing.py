@@ -0,0 +1,172 @@
+import os
+import time
+
+import pytest
+
+from backend.api.utils import REPLICA_LAG_QUERY, ConnectionPool, NoHealthyReader, ReaderRouter, parse_hosts
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.cluster.lag.get(self.conn.host) is None:
+            raise RuntimeError("server closed the connection unexpectedly")
+
+    def fetchone(self):
+        return True, self.conn.cluster.lag[self.conn.host]
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, cluster, host):
+        self.cluster = cluster
+        self.host = host
+        self.closed = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class _Cluster:
+    """Fake primary plus replicas; lag[host] is the replay lag, None means down."""
+
+    def __init__(self, **lag):
+        self.lag = lag
+
+    def connect_reader(self, host, port):
+        if self.lag.get(host) is None:
+            raise RuntimeError(f"could not connect to server {host}")
+        return _Connection(self, host)
+
+    def connect_primary(self):
+        return _Connection(self, "primary")
+
+    def router(self, **kwargs):
+        readers = [(host, "5432") for host in sorted(self.lag)]
+        kwargs.setdefault("max_lag_seconds", 5.0)
+        kwargs.setdefault("check_seconds", 60.0)
+        return ReaderRouter(readers, self.connect_reader, self.connect_primary, **kwargs)
+
+
+def test_parse_hosts():
+    assert parse_hosts("replica1:5433, replica2,/var/run/postgresql") == [
+        ("replica1", "5433"), ("replica2", None), ("/var/run/postgresql", None)]
+    assert parse_hosts("") == [] and parse_hosts(None) == []
+
+
+def test_round_robin_skips_lagging_and_unreachable_readers():
+    cluster = _Cluster(a=0.0, b=0.5, c=30.0)
+    router = cluster.router()
+    hosts = [router.connect().host for _ in range(4)]
+    assert sorted(set(hosts)) == ["a", "b"]
+    assert hosts[0] != hosts[1]
+
+    cluster.lag["a"] = None
+    assert {router.connect().host for _ in range(3)} == {"b"}
+    readers = router.stats()["readers"]
+    assert readers["a:5432"]["healthy"] is False and readers["c:5432"]["healthy"] is False
+    assert readers["c:5432"]["lag_seconds"] == 30.0
+
+
+def test_falls_back_to_primary_or_refuses_when_no_reader_is_healthy():
+    cluster = _Cluster(a=None, b=60.0)
+    assert cluster.router().connect().host == "primary"
+    with pytest.raises(NoHealthyReader):
+        cluster.router(fallback_to_primary=False).connect()
+
+
+def test_down_reader_is_retried_after_check_interval():
+    cluster = _Cluster(a=None)
+    router = cluster.router(check_seconds=0.05)
+    assert router.connect().host == "primary"
+    cluster.lag["a"] = 0.0
+    # Still inside the interval: not retried yet
+    assert router.connect().host == "primary"
+    time.sleep(0.06)
+    assert router.connect().host == "a"
+
+
+def test_pool_drops_connections_to_readers_that_fall_behind():
+    cluster = _Cluster(a=0.0, b=0.0)
+    router = cluster.router(check_seconds=0.05)
+    pool = ConnectionPool(router.connect, 1, 0.1, check=router.check)
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    pool.putconn(conn)
+
+    cluster.lag[conn.host] = 60.0
+    time.sleep(0.06)
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+    assert replacement.host != conn.host
+    pool.putconn(replacement)
+
+    # Fallback connections to the primary are retired so readers get retried
+    cluster.lag.update(a=60.0, b=60.0)
+    time.sleep(0.06)
+    primary = pool.getconn()
+    assert primary.host == "primary"
+    pool.putconn(primary)
+    cluster.lag.update(a=0.0, b=0.0)
+    time.sleep(0.06)
+    assert pool.getconn().host in ("a", "b")
+
+
+@pytest.mark.skipif(not (os.getenv("TEST_DATABASE_URL") and os.getenv("TEST_REPLICA_URL")),
+                    reason="TEST_DATABASE_URL and TEST_REPLICA_URL (a streaming replica of it) not set")
+def test_routes_reads_to_replica_and_falls_back_while_replay_lags():
+    psycopg2 = pytest.importorskip("psycopg2")
+    primary_url, replica_url = os.environ["TEST_DATABASE_URL"], os.environ["TEST_REPLICA_URL"]
+    primary = psycopg2.connect(primary_url)
+    primary.autocommit = True
+    replica_admin = psycopg2.connect(replica_url)
+    replica_admin.autocommit = True
+    router = ReaderRouter([("replica", None)], lambda host, port: psycopg2.connect(replica_url),
+                          lambda: psycopg2.connect(primary_url), max_lag_seconds=0.5, check_seconds=0.0)
+
+    def replica_lag():
+        cur = replica_admin.cursor()
+        cur.execute(REPLICA_LAG_QUERY)
+        return cur.fetchone()[1]
+
+    def recovery_flag(conn):
+        cur = conn.cursor()
+        cur.execute("SELECT pg_is_in_recovery()")
+        in_recovery = cur.fetchone()[0]
+        conn.close()
+        return in_recovery
+
+    try:
+        cur = primary.cursor()
+        cur.execute("CREATE TABLE IF NOT EXISTS read_routing_probe (id int)")
+        # Let the replica catch up with the DDL
+        deadline = time.monotonic() + 10
+        while replica_lag() > 0.5 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert recovery_flag(router.connect()) is True
+
+        replica_admin.cursor().execute("SELECT pg_wal_replay_pause()")
+        cur.execute("INSERT INTO read_routing_probe VALUES (1)")
+        time.sleep(1.0)
+        assert recovery_flag(router.connect()) is False
+        assert router.stats()["readers"]["replica"]["lag_seconds"] > 0.5
+    finally:
+        replica_admin.cursor().execute("SELECT pg_wal_replay_resume()")
+        primary.cursor().execute("DROP TABLE IF EXISTS read_routing_probe")
+        primary.close()
+        replica_admin.close()
@@ -0,0 +1,175 @@
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+from backend.api import queries
+
+SCHEMA_SQL = Path(__file__).resolve().parents[1] / "backend" / "schema.sql"
+
+
+def test_leader_values_are_whitelisted():
+    assert queries.leader_value_sql("points", "game") == "s.points::float8 / s.games"
+    assert "36.0" in queries.leader_value_sql("assists", "36")
+    # Percentages are made / attempted whatever per says
+    assert queries.leader_value_sql("fg3_pct", "total") == queries.leader_value_sql("fg3_pct", "game")
+    assert queries.leaders_query("points; DROP TABLE players", "game") is None
+    assert queries.leaders_query("points", "48") is None
+
+
+def test_team_summary_derives_exact_rates_from_sums():
+    from backend.api.routes import _team_season_summary
+
+    totals = {
+        "team_id": 1, "full_name": "Team", "abbreviation": "TM", "season_id": 22023,
+        "games": 2, "wins": 1, "losses": 1, "minutes": 505, "points": 230, "opponent_points": 220,
+        "fgm": 84, "fga": 180, "fg3m": 24, "fg3a": 70, "ftm": 38, "fta": 50, "oreb": 20,
+        "dreb": 70, "reb": 90, "ast": 50, "stl": 15, "blk": 10, "tov": 28, "plus_minus": 10,
+        "first_game_date": None, "last_game_date": None,
+    }
+    summary = _team_season_summary(totals)
+    possessions = 180 - 20 + 28 + 0.44 * 50
+    assert summary["per_game"]["points"] == 115.0
+    assert summary["per_game"]["possessions"] == round(possessions / 2, 2)
+    assert summary["pace"] == round(240.0 * possessions / 505, 2)
+    assert summary["off_rating"] == round(100.0 * 230 / possessions, 2)
+    assert summary["def_rating"] == round(100.0 * 220 / possessions, 2)
+    assert summary["fg3_pct"] == round(24 / 70, 3) and summary["win_pct"] == 0.5
+
+
+@pytest.fixture(scope="module")
+def league():
+    """A throwaway schema with two synthetic seasons and fully refreshed aggregates."""
+    if not os.getenv("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    from backend.ml.synthetic_data import generate_league_tables, load_into_postgres
+    from scripts.init_data_load import PLAYER_SEASON_STATS_REFRESH_SQL, TEAM_SEASON_STATS_REFRESH_SQL
+
+    url = os.environ["TEST_DATABASE_URL"]
+    schema = f"season_test_{uuid.uuid4().hex[:8]}"
+    conn = psycopg2.connect(url)
+    cur = conn.cursor()
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path TO {schema}")
+    cur.execute(SCHEMA_SQL.read_text())
+    tables = generate_league_tables(n_seasons=2, seed=11)
+    load_into_postgres(tables, conn)
+    for sql in (PLAYER_SEASON_STATS_REFRESH_SQL, TEAM_SEASON_STATS_REFRESH_SQL):
+        cur.execute(sql, {"game_ids": None, "season_ids": None})
+    conn.commit()
+
+    def connect():
+        return psycopg2.connect(url, options=f"-c search_path={schema}")
+
+    try:
+        yield conn, tables, connect
+    finally:
+        conn.rollback()
+        cur = conn.cursor()
+        cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+def _rows(cur, sql, params=None):
+    cur.execute(sql, params)
+    columns = [desc[0] for desc in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def test_aggregates_match_the_fact_tables(league):
+    conn, tables, _ = league
+    pgs = tables["player_game_stats"]
+    played = pgs[pgs["minutes"] > 0]
+    expected = played.groupby(["player_id", "season_id"]).agg(
+        games=("game_id", "size"), points=("points", "sum"), minutes=("minutes", "sum"))
+    cur = conn.cursor()
+    stored = {(row["player_id"], row["season_id"]): row for row in
+              _rows(cur, "SELECT player_id, season_id, games, points, minutes FROM player_season_stats")}
+    assert len(stored) == len(expected)
+    for (player_id, season_id), row in expected.iterrows():
+        got = stored[(player_id, season_id)]
+        assert got["games"] == row["games"] and got["points"] == row["points"]
+        assert got["minutes"] == pytest.approx(row["minutes"])
+
+    games = tables["games"]
+    expected_teams = games.groupby(["team_id", "season_id"]).agg(
+        games=("game_id", "size"), wins=("win_loss", lambda wl: int((wl == "W").sum())), points=("points", "sum"))
+    stored_teams = {(row["team_id"], row["season_id"]): row for row in
+                    _rows(cur, "SELECT team_id, season_id, games, wins, points FROM team_season_stats")}
+    assert len(stored_teams) == len(expected_teams)
+    for key, row in expected_teams.iterrows():
+        assert (stored_teams[key]["games"], stored_teams[key]["wins"], stored_teams[key]["points"]) == (
+            row["games"], row["wins"], row["points"])
+
+
+def test_refresh_touches_only_the_keys_of_the_given_games(league):
+    conn, tables, _ = league
+    from scripts.init_data_load import PLAYER_SEASON_STATS_REFRESH_SQL, TEAM_SEASON_STATS_REFRESH_SQL
+
+    cur = conn.cursor()
+    game = tables["player_game_stats"].iloc[-1]
+    game_id, season_id = str(game["game_id"]), int(game["season_id"])
+    try:
+        cur.execute("UPDATE player_game_stats SET points = points + 10 WHERE game_id = %s AND minutes > 0", (game_id,))
+        changed_players = cur.rowcount
+        cur.execute("UPDATE games SET points = points + 1 WHERE game_id = %s", (game_id,))
+        cur.execute("SELECT now()")
+        refreshed_at = cur.fetchone()[0]
+        cur.execute(PLAYER_SEASON_STATS_REFRESH_SQL, {"game_ids": [game_id], "season_ids": [season_id]})
+        cur.execute(TEAM_SEASON_STATS_REFRESH_SQL, {"game_ids": [game_id], "season_ids": [season_id]})
+
+        cur.execute("SELECT COUNT(*) FROM team_season_stats WHERE updated_at >= %s", (refreshed_at,))
+        assert cur.fetchone()[0] == 2
+        cur.execute("SELECT COUNT(*) FROM player_season_stats WHERE updated_at >= %s", (refreshed_at,))
+        assert cur.fetchone()[0] == changed_players
+
+        # The incremental result equals a recomputation of that key from scratch
+        cur.execute("""
+            SELECT s.points, SUM(pgs.points)
+            FROM player_season_stats s
+            JOIN player_game_stats pgs ON pgs.player_id = s.player_id AND pgs.season_id = s.season_id
+            WHERE s.season_id = %s AND pgs.minutes > 0 AND s.player_id IN (
+                SELECT player_id FROM player_game_stats WHERE game_id = %s AND minutes > 0)
+            GROUP BY s.player_id, s.points
+        """, (season_id, game_id))
+        assert all(stored == recomputed for stored, recomputed in cur.fetchall())
+    finally:
+        conn.rollback()
+
+
+def test_leaders_and_team_season_endpoints(league, monkeypatch):
+    conn, tables, connect = league
+    monkeypatch.setenv("CACHE_LISTEN", "0")
+    from backend.api import app, routes, utils
+
+    monkeypatch.setattr(utils, "_pool", utils.ConnectionPool(connect, 2, 1.0))
+    routes.leaders_cache.clear()
+    routes.team_season_cache.clear()
+    client = app.test_client()
+    latest_season = int(tables["games"]["season_id"].max())
+
+    response = client.get("/api/v1/leaders?stat=points&per=game&limit=5&min_games=5")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["season_id"] == latest_season and len(body["leaders"]) == 5
+    values = [leader["value"] for leader in body["leaders"]]
+    assert values == sorted(values, reverse=True)
+    top = body["leaders"][0]
+    pgs = tables["player_game_stats"]
+    played = pgs[(pgs["player_id"] == top["player_id"]) & (pgs["season_id"] == latest_season) & (pgs["minutes"] > 0)]
+    assert top["value"] == round(played["points"].sum() / len(played), 3) and top["rank"] == 1
+
+    assert client.get("/api/v1/leaders?stat=fg3_pct").get_json()["per"] is None
+    assert client.get("/api/v1/leaders?stat=salary").status_code == 400
+
+    team_id = int(tables["games"]["team_id"].iloc[0])
+    season = client.get(f"/api/v1/teams/{team_id}/season").get_json()
+    games = tables["games"]
+    team_games = games[(games["team_id"] == team_id) & (games["season_id"] == latest_season)]
+    assert season["season_id"] == latest_season and season["games"] == len(team_games)
+    assert season["per_game"]["points"] == round(team_games["points"].sum() / len(team_games), 2)
+    assert season["pace"] > 0 and season["def_rating"] > 0
+    assert client.get("/api/v1/teams/1/season").status_code == 404
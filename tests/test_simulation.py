@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.ml.distributions import ResidualDistribution
+from backend.ml.simulation import SlateCopula, normal_scores, simulate_slate
+
+
+def _scores_with_shared_factors(n_games=3000, players=8, teammate=0.3, opponent=-0.1, seed=0):
+    """Two stats per player; teams share a factor, and the two teams' factors are correlated."""
+    rng = np.random.default_rng(seed)
+    factor_corr = np.array([[1.0, opponent / teammate], [opponent / teammate, 1.0]])
+    factors = rng.multivariate_normal([0.0, 0.0], factor_corr, size=n_games)
+    rows = []
+    for game in range(n_games):
+        for side in range(2):
+            for _ in range(players):
+                z = np.sqrt(teammate) * factors[game, side] + np.sqrt(1 - teammate) * rng.normal(size=2)
+                rows.append((game, side, z[0], z[1]))
+    return pd.DataFrame(rows, columns=["game_id", "team_id", "pts", "reb"])
+
+
+def test_fit_recovers_teammate_and_opponent_correlation():
+    copula = SlateCopula.fit(_scores_with_shared_factors(), ["pts", "reb"])
+    assert np.allclose(np.diag(copula.self_corr), 1.0)
+    assert copula.teammate_corr == pytest.approx(np.full((2, 2), 0.3), abs=0.03)
+    assert copula.opponent_corr == pytest.approx(np.full((2, 2), -0.1), abs=0.03)
+
+
+def test_correlation_is_repaired_to_positive_definite():
+    stats = ["pts", "reb"]
+    copula = SlateCopula(stats, np.eye(2), np.full((2, 2), -0.4), np.zeros((2, 2)))
+    matrix = copula.correlation(12, 12)
+    assert np.allclose(np.diag(matrix), 1.0)
+    assert np.linalg.eigvalsh(matrix).min() > 0
+    np.linalg.cholesky(matrix)
+
+
+@pytest.fixture(scope="module")
+def distributions():
+    rng = np.random.default_rng(1)
+    fitted = {}
+    for stat, scale in (("pts", 20.0), ("reb", 6.0)):
+        preds = rng.uniform(0.3, 1.7, 20000) * scale
+        fitted[stat] = ResidualDistribution.fit(preds, rng.poisson(preds))
+    return fitted
+
+
+def test_normal_scores_are_standard_normal(distributions):
+    rng = np.random.default_rng(2)
+    preds = rng.uniform(6, 34, 20000)
+    z = normal_scores(distributions["pts"], preds, rng.poisson(preds))
+    assert abs(z.mean()) < 0.05
+    assert z.std() == pytest.approx(1.0, abs=0.05)
+
+
+def test_simulation_is_seeded_and_keeps_marginals(distributions):
+    games = [([1, 2, 3], [4, 5, 6]), ([7, 8], [9, 10])]
+    preds = {"pts": np.linspace(8, 28, 10), "reb": np.linspace(3, 10, 10)}
+    copula = SlateCopula(["pts", "reb"], np.array([[1.0, 0.3], [0.3, 1.0]]),
+                         np.full((2, 2), 0.2), np.full((2, 2), -0.05))
+
+    first = simulate_slate(games, preds, distributions, copula, derived={"pr": ("pts", "reb")},
+                           n_sims=20000, seed=7)
+    again = simulate_slate(games, preds, distributions, copula, derived={"pr": ("pts", "reb")},
+                           n_sims=20000, seed=7)
+    assert first.player_ids == list(range(1, 11))
+    np.testing.assert_array_equal(first.samples["pts"], again.samples["pts"])
+    np.testing.assert_allclose(first.samples["pr"], first.samples["pts"] + first.samples["reb"])
+
+    # Each player's draws follow the marginal distribution around the prediction
+    median = np.median(first.samples["pts"], axis=0)
+    expected = distributions["pts"].ppf(preds["pts"], np.full(10, 0.5))
+    assert median == pytest.approx(expected, abs=0.5)
+
+
+def test_parlay_of_teammates_beats_independent_price(distributions):
+    games = [([1, 2], [3, 4])]
+    preds = {"pts": np.full(4, 20.0), "reb": np.full(4, 6.0)}
+    copula = SlateCopula(["pts", "reb"], np.eye(2), np.full((2, 2), 0.5), np.zeros((2, 2)))
+    simulation = simulate_slate(games, preds, distributions, copula, n_sims=40000, seed=0)
+
+    teammates = simulation.price_parlay([
+        {"player_id": 1, "stat": "pts", "line": 19.5}, {"player_id": 2, "stat": "pts", "line": 19.5}])
+    opponents = simulation.price_parlay([
+        {"player_id": 1, "stat": "pts", "line": 19.5}, {"player_id": 3, "stat": "pts", "line": 19.5}])
+    assert teammates["prob"] > teammates["independent_prob"] + 0.05
+    assert opponents["prob"] == pytest.approx(opponents["independent_prob"], abs=0.01)
+    with pytest.raises(ValueError):
+        simulation.leg_hits(1, "pts", 19.5, side="sideways")
@@ -0,0 +1,138 @@
+import threading
+import time
+
+from backend.api.singleflight import SingleFlight
+
+
+def _run_concurrently(n, target):
+    results, errors = [None] * n, [None] * n
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results, errors
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test_share")
+    n = 8
+    executions = []
+
+    def compute():
+        executions.append(1)
+        # Hold the call open until every other caller has joined it
+        _wait_for(lambda: flight.stats()["coalesced"] == n - 1)
+        return {"value": 42}
+
+    results, errors = _run_concurrently(n, lambda: flight.do(("player", 1), compute))
+    assert errors == [None] * n
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    stats = flight.stats()
+    assert stats["calls"] == n and stats["executions"] == 1 and stats["coalesced"] == n - 1
+    assert stats["in_flight"] == 0
+
+    # Finished calls are not cached: the next call runs again
+    assert flight.do(("player", 1), lambda: "fresh") == "fresh"
+    assert flight.stats()["executions"] == 2
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flight = SingleFlight("test_errors")
+    n = 4
+
+    def fail():
+        _wait_for(lambda: flight.stats()["coalesced"] == n - 1)
+        raise RuntimeError("db down")
+
+    results, errors = _run_concurrently(n, lambda: flight.do("key", fail))
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flight.stats()["errors"] == 1
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight("test_keys")
+    keys = iter(range(3))
+
+    def call():
+        key = next(keys)
+        return flight.do(key, lambda: key)
+
+    results, _ = _run_concurrently(3, call)
+    assert sorted(results) == [0, 1, 2]
+    assert flight.stats()["executions"] == 3 and flight.stats()["coalesced"] == 0
+
+
+class _Cursor:
+    description = [("game_id",), ("points",)]
+
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=None):
+        if sql.startswith("SET statement_timeout"):
+            return
+        self.db.queries += 1
+        # Keep the query running until the other requests have piled up behind it
+        _wait_for(lambda: self.db.flight.stats()["coalesced"] >= self.db.expected_waiters)
+
+    def fetchall(self):
+        return [("0022300001", 30)]
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    closed = 0
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return _Cursor(self.db)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_player_stats_route_coalesces_identical_requests(monkeypatch):
+    monkeypatch.setenv("CACHE_LISTEN", "0")
+    from backend.api import app, routes, utils
+
+    class _Database:
+        queries = 0
+        flight = routes.player_stats_flight
+        expected_waiters = routes.player_stats_flight.stats()["coalesced"] + 5
+
+    db = _Database()
+    monkeypatch.setattr(utils, "_pool", utils.ConnectionPool(lambda: _Connection(db), 10, 1.0))
+    client = app.test_client()
+
+    results, errors = _run_concurrently(6, lambda: client.get("/api/v1/players/7/stats").get_json())
+    assert errors == [None] * 6
+    assert results == [[{"game_id": "0022300001", "points": 30}]] * 6
+    assert db.queries == 1
+    metrics = client.get("/api/v1/metrics").get_json()["singleflight"]
+    assert metrics["player_stats"]["coalesced"] >= 5
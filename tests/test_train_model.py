@@ -0,0 +1,45 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+from backend.ml.train_model import create_training_dataframe, feature_engineering, train_model
+
+
+@pytest.fixture(scope="module")
+def featured_frame():
+    conn = load_into_sqlite(generate_league_tables(n_seasons=1, seed=5))
+    featured = feature_engineering(create_training_dataframe(conn))
+    conn.close()
+    return featured
+
+
+def test_feature_engineering_builds_form_features_for_every_stat(featured_frame):
+    for column in ("player_points", "player_rebounds", "player_assists", "player_fg3m"):
+        assert f"{column}_last_5" in featured_frame.columns
+        assert f"{column}_ewm_span_10" in featured_frame.columns
+    first_games = featured_frame.groupby("player_id").head(1)
+    assert first_games["player_rebounds_last_5"].isna().all()
+
+
+def test_train_model_fits_several_stats_in_one_model(featured_frame, tmp_path):
+    path = tmp_path / "stats.pkl"
+    model = train_model(
+        featured_frame,
+        model_filename=str(path),
+        estimator=RandomForestRegressor(n_estimators=5, max_depth=4, random_state=0),
+        stats=("pts", "reb", "ast"),
+    )
+    artifact = joblib.load(path)
+    assert artifact["stats"] == ["pts", "reb", "ast"]
+    assert "player_rebounds_last_10" in artifact["features"]
+    assert artifact["copula"].stats == ("pts", "reb", "ast")
+
+    X = np.zeros((2, len(artifact["features"])), dtype=np.float32)
+    assert model.predict(X).shape == (2, 3)
+
+
+def test_train_model_rejects_unknown_stats(featured_frame):
+    with pytest.raises(ValueError):
+        train_model(featured_frame, stats=("dunks",))
@@ -0,0 +1,32 @@
+from backend.ml.benchmark import compare_reports, run_stage
+from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+from backend.ml.train_model import create_training_dataframe, feature_engineering
+
+
+def test_synthetic_league_runs_through_feature_pipeline():
+    tables = generate_league_tables(n_seasons=1, seed=7)
+    conn = load_into_sqlite(tables)
+    raw_df = create_training_dataframe(conn)
+    conn.close()
+
+    assert len(raw_df) > 0
+    featured = feature_engineering(raw_df)
+    assert featured["opponent_avg_points_allowed_last_10"].notna().all()
+    assert featured["opponent_def_rating_last_10"].notna().all()
+
+
+def test_run_stage_reports_time_memory_and_throughput():
+    result, stats = run_stage("sum", lambda: sum(range(10000)), rows=10000)
+    assert result == sum(range(10000))
+    assert stats["rows"] == 10000
+    assert stats["seconds"] >= 0
+    assert stats["peak_mb"] >= 0
+
+
+def test_compare_reports_flags_regressions_only():
+    baseline = {"runs": [{"seasons": 1, "stages": {"train_model": {"seconds": 10.0, "peak_mb": 100.0}}}]}
+    current = {"runs": [{"seasons": 1, "stages": {"train_model": {"seconds": 14.0, "peak_mb": 101.0}}}]}
+    regressions = compare_reports(baseline, current, threshold=0.25)
+    assert len(regressions) == 1
+    assert "train_model seconds" in regressions[0]
+    assert compare_reports(baseline, baseline) == []
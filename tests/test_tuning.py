@@ -0,0 +1,49 @@
+import os
+
+from backend.ml.synthetic_data import generate_league_tables, load_into_sqlite
+from backend.ml.train_model import create_training_dataframe, feature_engineering
+from backend.ml.tuning import make_configs, refit_best, tune, walk_forward_folds
+
+
+def test_walk_forward_folds_only_train_on_the_past():
+    folds = walk_forward_folds(100, n_splits=4)
+    assert len(folds) == 4
+    for train_end, test_start, test_end in folds:
+        assert train_end <= test_start < test_end <= 100
+    assert folds[-1][2] == 100
+
+
+def test_make_configs_random_search_draws_n_iter():
+    configs = make_configs(["random_forest"], n_iter=3, seed=0)
+    assert len(configs) == 3
+    assert all(c["kind"] == "random_forest" for c in configs)
+
+
+def test_tune_ranks_configs_by_mean_mae():
+    conn = load_into_sqlite(generate_league_tables(n_seasons=1, seed=3))
+    featured = feature_engineering(create_training_dataframe(conn))
+    conn.close()
+
+    configs = [
+        {"kind": "random_forest", "params": {"n_estimators": 5, "max_depth": 2}},
+        {"kind": "random_forest", "params": {"n_estimators": 5, "max_depth": 6, "min_samples_leaf": 20}},
+    ]
+    leaderboard = tune(featured, configs, n_splits=3, workers=2)
+
+    assert [row["rank"] for row in leaderboard] == [1, 2]
+    assert leaderboard[0]["mean_mae"] <= leaderboard[1]["mean_mae"]
+    assert all(len(row["fold_mae"]) == 3 for row in leaderboard)
+
+
+def test_refit_saves_every_stat_to_the_artifact_the_api_prefers(tmp_path):
+    import joblib
+    from backend.api.predictor import MODEL_PATHS
+    from backend.ml.train_model import STAT_TARGETS
+
+    conn = load_into_sqlite(generate_league_tables(n_seasons=1, seed=3))
+    featured = feature_engineering(create_training_dataframe(conn))
+    conn.close()
+
+    path = tmp_path / os.path.basename(MODEL_PATHS[0])
+    refit_best(featured, {"kind": "random_forest", "params": {"n_estimators": 5, "max_depth": 3}}, str(path))
+    assert joblib.load(path)["stats"] == list(STAT_TARGETS)